@@ -3,18 +3,30 @@ Main Flask application for the Preventive Healthcare Chatbot API.
 """
 import os
 import json
+import math
 import logging
+import time
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 from src.core.config import load_config
+from src.core.singleflight import SingleFlight, chat_request_key
+from src.models.loader import get_model_registry
 from src.models.retrieval import retrieve_documents
 from src.models.generation import generate_response
+from src.models.extractive_qa import is_factual_question, format_extractive_answer
+from src.models.generation_policy import GenerationPolicySelector
+from src.pipeline.query_processing import QueryProcessor
 from src.pipeline.safety_validation import validate_input, validate_output
 from src.security.auth import validate_api_key
+from src.security.pii_redaction import redact_pii
 from src.db.user_profiles import get_user_profile
-from src.monitoring.logging import setup_logging
+from src.db.feedback_store import get_feedback_store
+from src.db.conversation_store import get_conversation_store, bound_history, session_owner, SessionNotFoundError
+from src.monitoring.logging import setup_logging, set_request_id, get_request_id
+from src.monitoring.metrics import track_stage, observe_stage, count_request, count_coalesced, count_generation_policy, render_prometheus, get_metrics_summary
+from src.monitoring.interaction_log import get_interaction_logger
 
 # Load environment variables and configurations
 load_dotenv()
@@ -25,20 +37,110 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all domains on all routes
 
+# Load models off the import path (background warm-up by default)
+models = get_model_registry(app_config)
+models.start()
+
+# Concurrent identical chat requests are answered by one pipeline run
+coalesce_requests = app_config.get('api', {}).get('coalesce_identical_requests', True)
+chat_flight = SingleFlight()
+query_processor = QueryProcessor()
+generation_policies = GenerationPolicySelector(app_config.get('generation'))
+
+# Chat history is kept server-side per session and bounded before prompting
+conversation_config = app_config.get('conversation', {})
+
+def log_interaction(**fields):
+    """Queue a chat interaction for the columnar interaction log."""
+    feedback_config = app_config.get('feedback', {})
+    if feedback_config.get('store_interactions', False):
+        fields['request_id'] = get_request_id()
+        get_interaction_logger(feedback_config.get('interaction_log')).log(fields)
+
+@app.before_request
+def assign_request_id():
+    """Tag log records of this request with the caller's or a fresh request id."""
+    set_request_id(request.headers.get('X-Request-ID'))
+
+@app.after_request
+def add_request_id_header(response):
+    """Echo the request id so clients can correlate responses with logs."""
+    response.headers['X-Request-ID'] = get_request_id()
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
     return jsonify({
         "status": "ok",
+        "models": models.status(),
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once models are warmed up, 503 before."""
+    if models.state == "failed":
+        models.start_warmup()
+    status = models.status()
+    return jsonify(status), (200 if models.is_ready() else 503)
+
+def answer_query(user_message, cleaned_query, intent, chat_history, user_profile, filters):
+    """Retrieve, generate and validate the answer to a (validated) query."""
+    timings = {}
+    
+    # 1. Retrieve relevant documents
+    with track_stage("retrieve_documents", timings):
+        retrieved_docs = retrieve_documents(
+            user_message,
+            top_k=app_config.get('retrieval', {}).get('top_k', 3),
+            retriever=models.retriever,
+            filters=filters
+        )
+    
+    # 2. Answer factual questions with a confident span from the retrieved chunks
+    response = None
+    if models.answerer is not None and retrieved_docs:
+        if is_factual_question(cleaned_query, intent):
+            with track_stage("extract_answer", timings):
+                extracted = models.answerer.answer(user_message, retrieved_docs)
+            if extracted and extracted["score"] >= models.answerer.min_score:
+                response = format_extractive_answer(extracted, retrieved_docs[extracted["document"]])
+    
+    # 3. Otherwise generate a free-text response, bounded by the query's policy
+    if response is None:
+        categories = query_processor._categorize_query(cleaned_query)
+        policy = generation_policies.select(cleaned_query, intent, categories)
+        count_generation_policy(policy.name)
+        logger.info("Generation policy %s (intent: %s, categories: %s)", policy.describe(), intent, categories)
+        with track_stage("generate_response", timings):
+            response = generate_response(
+                user_message=user_message,
+                retrieved_documents=retrieved_docs,
+                chat_history=chat_history,
+                user_profile=user_profile,
+                generator=models.generator,
+                policy=policy
+            )
+    
+    # 4. Validate output for safety
+    with track_stage("validate_output", timings):
+        output_validation = validate_output(response)
+    
+    return {
+        "retrieved_docs": retrieved_docs,
+        "response": response,
+        "output_validation": output_validation,
+        "timings": timings
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint that processes user queries and returns AI responses."""
+    request_start = time.perf_counter()
     try:
         # Check authentication
-        api_key = request.headers.get('')
+        api_key = request.headers.get('X-API-Key')
         if not validate_api_key(api_key):
             return jsonify({"error": "Invalid or missing API key"}), 401
         
@@ -47,52 +149,135 @@ def chat():
         if not data or 'message' not in data:
             return jsonify({"error": "Message is required"}), 400
             
+        # Gate on model readiness instead of blocking the worker during warm-up
+        if not models.is_ready():
+            retrying = models.start_warmup()
+            count_request("chat", 503)
+            if models.state == "failed" and not retrying:
+                response = jsonify({"error": "Models failed to load", "models": models.status()})
+                response.headers['Retry-After'] = str(max(1, math.ceil(models.retry_in())))
+            else:
+                response = jsonify({"error": "Models are warming up", "models": models.status()})
+                response.headers['Retry-After'] = '5'
+            return response, 503
+        
         user_message = data['message']
         user_id = data.get('user_id', 'anonymous')
-        chat_history = data.get('chat_history', [])
+        session_id = data.get('session_id')
+        if session_id is not None and (not isinstance(session_id, str) or not 0 < len(session_id) <= 64):
+            count_request("chat", 400)
+            return jsonify({"error": "session_id must be a non-empty string"}), 400
+        filters = data.get('filters')
+        if filters is not None and not isinstance(filters, dict):
+            count_request("chat", 400)
+            return jsonify({"error": "filters must be an object"}), 400
+        
+        timings = {}
+        
+        # Strip identifiers before the message reaches retrieval, generation or logs
+        if app_config.get('safety', {}).get('pii_redaction_enabled', False):
+            with track_stage("redact_input", timings):
+                user_message = redact_pii(user_message)
         
         # Validate input for safety
-        input_validation = validate_input(user_message)
+        with track_stage("validate_input", timings):
+            input_validation = validate_input(user_message)
         if not input_validation['valid']:
+            count_request("chat", 400)
+            log_interaction(
+                user_id=user_id, status=400, query=user_message, filters=filters,
+                stage_ms=timings, input_valid=False, validation_reason=input_validation['reason']
+            )
             return jsonify({
                 "error": "Input validation failed",
                 "reason": input_validation['reason']
             }), 400
         
         # Get user profile for personalized responses (if available)
-        user_profile = get_user_profile(user_id) if user_id != 'anonymous' else None
-        
-        # Process the query through the pipeline
-        # 1. Retrieve relevant documents
-        retrieved_docs = retrieve_documents(user_message, top_k=3)
-        
-        # 2. Generate response
-        response = generate_response(
-            user_message=user_message,
-            retrieved_documents=retrieved_docs,
-            chat_history=chat_history,
-            user_profile=user_profile
-        )
+        with track_stage("get_user_profile", timings):
+            user_profile = get_user_profile(user_id) if user_id != 'anonymous' else None
         
-        # 3. Validate output for safety
-        output_validation = validate_output(response)
+        # Load the stored history; clients without a session may still send
+        # theirs, and are issued a session when the answer is stored
+        owner = session_owner(api_key, user_id)
+        with track_stage("load_history", timings):
+            conversations = get_conversation_store(conversation_config)
+            if session_id:
+                try:
+                    chat_history = conversations.get_history(session_id, owner)
+                except SessionNotFoundError:
+                    count_request("chat", 404)
+                    return jsonify({"error": "Unknown or expired session_id"}), 404
+            else:
+                chat_history = bound_history(
+                    data.get('chat_history') or [],
+                    conversation_config.get('history_token_budget', 256),
+                    conversations.token_counter
+                )
+        
+        # The intent chooses the answer path and generation policy
+        cleaned_query = query_processor._clean_query(user_message)
+        intent = query_processor._detect_intent(cleaned_query, chat_history)
+        
+        # Identical concurrent questions share one retrieval and generation run
+        pipeline_start = time.perf_counter()
+        query_args = (user_message, cleaned_query, intent, chat_history, user_profile, filters)
+        if coalesce_requests:
+            key = chat_request_key(user_message, user_profile, filters, chat_history, intent)
+            result, shared = chat_flight.do(key, answer_query, *query_args)
+        else:
+            result, shared = answer_query(*query_args), False
+        retrieved_docs = result["retrieved_docs"]
+        response = result["response"]
+        output_validation = result["output_validation"]
+        if shared:
+            count_coalesced("chat")
+            timings["coalesced_wait"] = round((time.perf_counter() - pipeline_start) * 1000.0, 3)
+        else:
+            timings.update(result["timings"])
+        
+        retrieved_ids = [doc["id"] for doc in retrieved_docs]
+        retrieved_scores = [doc["metadata"]["score"] for doc in retrieved_docs]
         if not output_validation['valid']:
-            logger.warning(f"Output validation failed: {output_validation['reason']}")
+            logger.warning("Output validation failed: %s", output_validation['reason'])
+            count_request("chat", 400)
+            log_interaction(
+                user_id=user_id, status=400, query=user_message, filters=filters,
+                retrieved_ids=retrieved_ids, retrieved_scores=retrieved_scores, stage_ms=timings,
+                response_chars=len(response), input_valid=True, output_valid=False,
+                validation_reason=output_validation['reason']
+            )
             return jsonify({
                 "error": "Output validation failed",
                 "reason": output_validation['reason']
             }), 400
         
+        with track_stage("store_history", timings):
+            if session_id is None:
+                session_id = conversations.create_session(owner)
+            conversations.append_turn(session_id, owner, user_message, response)
+        
         # Log the interaction
-        logger.info(f"Chat interaction - User: {user_id}, Message: {user_message[:50]}...")
+        logger.info("Chat interaction - User: %s, Message: %.50s..., Timings (ms): %s", user_id, user_message, timings)
         
+        total_seconds = time.perf_counter() - request_start
+        observe_stage("chat_total", total_seconds)
+        count_request("chat", 200)
+        log_interaction(
+            user_id=user_id, status=200, query=user_message, filters=filters,
+            retrieved_ids=retrieved_ids, retrieved_scores=retrieved_scores, stage_ms=timings,
+            total_ms=round(total_seconds * 1000.0, 3), response_chars=len(response),
+            input_valid=True, output_valid=True
+        )
         return jsonify({
             "response": response,
-            "sources": [doc["metadata"] for doc in retrieved_docs]
+            "sources": [doc["metadata"] for doc in retrieved_docs],
+            "session_id": session_id
         })
         
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
+        count_request("chat", 500)
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/feedback', methods=['POST'])
@@ -108,11 +293,18 @@ def submit_feedback():
         if not data:
             return jsonify({"error": "No feedback data provided"}), 400
             
-        # Log the feedback for analysis
-        logger.info(f"Feedback received: {json.dumps(data)}")
-        
-        # Here you would typically store the feedback in a database
-        # For now, we'll just acknowledge receipt
+        # Buffered in memory and written to the database in batches
+        try:
+            get_feedback_store().add(
+                query=data.get('query'),
+                rating=data.get('rating'),
+                answer=data.get('answer'),
+                comments=data.get('comments'),
+                sources=data.get('sources'),
+                user_id=data.get('user_id')
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "status": "success",
@@ -123,6 +315,21 @@ def submit_feedback():
         logger.error(f"Error in feedback endpoint: {str(e)}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/api/feedback/summary', methods=['GET'])
+def feedback_summary():
+    """Aggregated feedback statistics for the dashboard."""
+    return jsonify(get_feedback_store().summary())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose pipeline metrics in the Prometheus text format."""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/summary', methods=['GET'])
+def metrics_summary():
+    """JSON summary of pipeline metrics for the dashboard."""
+    return jsonify(get_metrics_summary())
+
 @app.route('/api/auth/token', methods=['POST'])
 def get_token():
     """Simple authentication endpoint to get an API token."""
@@ -0,0 +1,8 @@
+"""
+Benchmark and load-testing tools for the chatbot pipeline.
+
+Run from the repository root, for example:
+
+    python -m benchmarks.micro_benchmarks --output reports/micro.json
+    python -m benchmarks.load_test --url http://localhost:5000 --concurrency 16
+"""
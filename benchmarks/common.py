@@ -0,0 +1,150 @@
+"""
+Shared helpers for the benchmark and load-testing tools.
+
+Every tool writes a JSON report with the same layout so that reports from two
+commits can be compared with ``compare_reports``.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+from typing import Dict, List, Any, Optional
+
+from src.monitoring.metrics import percentile
+
+# Metrics where a higher value is better; everything else is a latency
+HIGHER_IS_BETTER = {"throughput_per_s", "items_per_s"}
+
+
+def summarize_latencies(
+    latencies: List[float],
+    wall_seconds: float,
+    items_per_call: int = 1
+) -> Dict[str, Any]:
+    """
+    Summarise per-call latencies into throughput and percentile statistics.
+
+    Args:
+        latencies: Per-call latencies in seconds
+        wall_seconds: Wall-clock duration of the measured run
+        items_per_call: Items processed per call (e.g. batch size)
+
+    Returns:
+        Dict with call count, throughput and latency percentiles in milliseconds
+    """
+    ordered = sorted(latencies)
+    calls = len(ordered)
+    summary = {
+        "calls": calls,
+        "throughput_per_s": round(calls / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "mean_ms": round(1000.0 * sum(ordered) / calls, 3) if calls else 0.0,
+        "p50_ms": round(1000.0 * percentile(ordered, 50), 3),
+        "p95_ms": round(1000.0 * percentile(ordered, 95), 3),
+        "p99_ms": round(1000.0 * percentile(ordered, 99), 3),
+        "max_ms": round(1000.0 * ordered[-1], 3) if calls else 0.0
+    }
+    if items_per_call != 1:
+        summary["items_per_s"] = round(calls * items_per_call / wall_seconds, 3) if wall_seconds > 0 else 0.0
+    return summary
+
+
+def _git_commit() -> Optional[str]:
+    """Return the current git commit hash, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def build_report(kind: str, results: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Wrap benchmark results with metadata identifying the run.
+
+    Args:
+        kind: Report type, e.g. "micro" or "load"
+        results: Mapping of benchmark name to summary statistics
+        settings: Parameters the run was invoked with
+
+    Returns:
+        Dict: The full report
+    """
+    return {
+        "kind": kind,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+        "results": results
+    }
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    """
+    Write a report to disk as stable, diff-friendly JSON.
+
+    Args:
+        report: The report to write
+        path: Output file path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote report to {path}")
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression_pct: float = 10.0
+) -> List[str]:
+    """
+    Print a comparison of two reports and list regressions.
+
+    Args:
+        baseline: Report from the reference commit
+        current: Report from the commit under test
+        max_regression_pct: Allowed slowdown before a metric counts as a regression
+
+    Returns:
+        List of human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>9}")
+
+    for name, current_stats in sorted(current.get("results", {}).items()):
+        baseline_stats = baseline.get("results", {}).get(name)
+        if not baseline_stats:
+            continue
+
+        for metric in ("throughput_per_s", "items_per_s", "total_ms", "p50_ms", "p95_ms", "p99_ms"):
+            if metric not in current_stats or metric not in baseline_stats:
+                continue
+            old, new = baseline_stats[metric], current_stats[metric]
+            if not old:
+                continue
+
+            change = 100.0 * (new - old) / old
+            print(f"{name:<40} {metric:<18} {old:>12.3f} {new:>12.3f} {change:>8.1f}%")
+
+            slowdown = -change if metric in HIGHER_IS_BETTER else change
+            if slowdown > max_regression_pct:
+                regressions.append(f"{name} {metric}: {old:.3f} -> {new:.3f} ({change:+.1f}%)")
+
+    return regressions
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """Load a report previously written by ``write_report``."""
+    with open(path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,130 @@
+"""
+Import-time profile of the API entry points.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter with
+model warm-up disabled, reports the slowest imports, and fails when a heavy
+library (torch, transformers, faiss, ...) is imported eagerly or the total
+import time exceeds a budget. Meant to run in CI next to the benchmarks.
+
+Example:
+
+    python -m benchmarks.import_time --module app --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Any, Optional
+
+from benchmarks.common import build_report, write_report, load_report, compare_reports
+
+# Libraries that must only be imported when models are loaded
+HEAVY_MODULES = ["torch", "transformers", "faiss", "huggingface_hub", "tokenizers", "safetensors"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(module: str, cwd: str) -> List[Dict[str, Any]]:
+    """
+    Import a module in a fresh interpreter and parse ``-X importtime`` output.
+
+    Args:
+        module: Module to import
+        cwd: Working directory for the child interpreter
+
+    Returns:
+        List of entries with self/cumulative time in microseconds and nesting depth
+    """
+    env = dict(os.environ, MODEL_WARMUP="none", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": (len(match.group(3)) - 1) // 2
+            })
+    return entries
+
+
+def eager_heavy_modules(entries: List[Dict[str, Any]]) -> List[str]:
+    """
+    Heavy libraries that were imported.
+
+    Args:
+        entries: Output of ``profile_imports``
+
+    Returns:
+        Sorted top-level names from HEAVY_MODULES found among the imports
+    """
+    return sorted({entry["module"].split(".")[0] for entry in entries} & set(HEAVY_MODULES))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile import time of an entry point")
+    parser.add_argument("--module", default="app", help="Module to import (e.g. app, src.api.main)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to print")
+    parser.add_argument("--allow-heavy", action="store_true", help="Do not fail on eager heavy imports")
+    parser.add_argument("--output", default="reports/import_time.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entries = profile_imports(args.module, repo_root)
+
+    # The target module is the last top-level entry; its children are direct imports
+    target = [entry for entry in entries if entry["depth"] == 0 and entry["module"] == args.module]
+    total_ms = target[-1]["cumulative_us"] / 1000.0 if target else 0.0
+    direct = [entry for entry in entries if entry["depth"] == 1]
+    slowest = sorted(direct, key=lambda e: e["cumulative_us"], reverse=True)[:args.top]
+    heavy_roots = eager_heavy_modules(entries)
+
+    print(f"Total import time for {args.module}: {total_ms:.1f} ms ({len(entries)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for entry in slowest:
+        print(f"{entry['cumulative_us'] / 1000.0:>14.1f} {entry['self_us'] / 1000.0:>9.1f}  {entry['module']}")
+
+    results = {
+        f"import.{args.module}": {
+            "total_ms": round(total_ms, 3),
+            "modules": len(entries),
+            "heavy_modules": heavy_roots,
+            "slowest": [
+                {"module": entry["module"], "cumulative_ms": round(entry["cumulative_us"] / 1000.0, 3)}
+                for entry in slowest
+            ]
+        }
+    }
+    report = build_report("import_time", results, vars(args))
+    write_report(report, args.output)
+
+    failures = []
+    if heavy_roots and not args.allow_heavy:
+        failures.append(f"Heavy modules imported eagerly: {', '.join(heavy_roots)}")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"Import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+    if args.baseline:
+        failures.extend(compare_reports(load_report(args.baseline), report, args.max_regression))
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Replay a file of chat requests against a running API at fixed concurrency.
+
+The request file is JSONL with a "message" (or "query") field and an optional
+"user_id" per line; plain-text lines are treated as messages. Both the Flask
+app (``app.py``, POST /api/chat) and the FastAPI app (``src/api/main.py``,
+POST /chat/) are supported. Start the API with LLM_PROVIDER=mock and
+EMBEDDING_PROVIDER=mock to measure the serving stack without model inference.
+
+Example:
+
+    python -m benchmarks.load_test --url http://localhost:5000 \\
+        --requests-file benchmarks/sample_requests.jsonl \\
+        --concurrency 16 --total 500 --output reports/load.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from benchmarks.common import summarize_latencies, build_report, write_report, load_report, compare_reports
+
+DEFAULT_REQUESTS_FILE = os.path.join(os.path.dirname(__file__), "sample_requests.jsonl")
+
+# Endpoint path and request body builder per target application
+TARGETS = {
+    "flask": {
+        "path": "/api/chat",
+        "body": lambda item: {
+            "message": item["message"],
+            "user_id": item.get("user_id", "anonymous"),
+            "chat_history": item.get("chat_history", [])
+        }
+    },
+    "fastapi": {
+        "path": "/chat/",
+        "body": lambda item: {"query": item["message"]}
+    }
+}
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """
+    Load a request file.
+
+    Args:
+        path: Path to a JSONL or plain-text request file
+
+    Returns:
+        List of request items with at least a "message" key
+    """
+    items = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = line
+
+            if isinstance(record, str):
+                items.append({"message": record})
+            elif isinstance(record, dict):
+                message = record.get("message") or record.get("query")
+                if message:
+                    items.append(dict(record, message=message))
+
+    if not items:
+        raise ValueError(f"No requests found in {path}")
+    return items
+
+
+class LoadTester:
+    """Sends requests from a pool of worker threads and records outcomes."""
+
+    def __init__(
+        self,
+        base_url: str,
+        target: str = "flask",
+        api_key: Optional[str] = None,
+        timeout: float = 60.0
+    ):
+        """
+        Initialize the load tester.
+
+        Args:
+            base_url: Base URL of the running API
+            target: Target application, "flask" or "fastapi"
+            api_key: API key sent in the X-API-Key header
+            timeout: Per-request timeout in seconds
+        """
+        self.url = base_url.rstrip("/") + TARGETS[target]["path"]
+        self.build_body = TARGETS[target]["body"]
+        self.headers = {"X-API-Key": api_key} if api_key else {}
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def _session(self) -> requests.Session:
+        """Return the keep-alive session owned by the calling worker thread."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, item: Dict[str, Any], record: bool = True) -> None:
+        """
+        Send one request and record its latency and outcome.
+
+        Args:
+            item: Request item from the request file
+            record: Whether to include the result in the statistics
+        """
+        start = time.perf_counter()
+        try:
+            response = self._session().post(
+                self.url,
+                json=self.build_body(item),
+                headers=self.headers,
+                timeout=self.timeout
+            )
+            outcome = str(response.status_code)
+            error = None
+        except requests.RequestException as e:
+            outcome = "error"
+            error = type(e).__name__
+        elapsed = time.perf_counter() - start
+
+        if not record:
+            return
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.statuses[outcome] += 1
+            if error:
+                self.errors[error] += 1
+
+    def run(
+        self,
+        items: List[Dict[str, Any]],
+        concurrency: int,
+        total: Optional[int] = None,
+        duration: Optional[float] = None,
+        warmup: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Replay requests until ``total`` are sent or ``duration`` elapses.
+
+        Args:
+            items: Request items, cycled if fewer than needed
+            concurrency: Number of concurrent worker threads
+            total: Number of measured requests to send
+            duration: Maximum measured run time in seconds
+            warmup: Number of unmeasured requests sent first
+
+        Returns:
+            Dict with throughput, latency percentiles and status counts
+        """
+        source = itertools.cycle(items)
+        source_lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda item: self.send(item, record=False), itertools.islice(source, warmup)))
+
+        sent = 0
+        deadline = time.perf_counter() + duration if duration else None
+
+        def next_item() -> Optional[Dict[str, Any]]:
+            nonlocal sent
+            with source_lock:
+                if total is not None and sent >= total:
+                    return None
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return None
+                sent += 1
+                return next(source)
+
+        def worker() -> None:
+            while True:
+                item = next_item()
+                if item is None:
+                    return
+                self.send(item)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        summary = summarize_latencies(self.latencies, wall)
+        summary["wall_seconds"] = round(wall, 3)
+        summary["status_counts"] = dict(self.statuses)
+        summary["error_counts"] = dict(self.errors)
+        ok = self.statuses.get("200", 0)
+        summary["success_rate"] = round(ok / len(self.latencies), 4) if self.latencies else 0.0
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay chat requests against a running API")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the API")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="flask", help="Application under test")
+    parser.add_argument("--requests-file", default=DEFAULT_REQUESTS_FILE, help="JSONL or text file of requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--total", type=int, default=None, help="Number of measured requests")
+    parser.add_argument("--duration", type=float, default=None, help="Measured run time in seconds")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests sent first")
+    parser.add_argument("--api-key", default=os.getenv("DEFAULT_API_KEY", "demo-api-key-123456"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="reports/load_test.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    if args.total is None and args.duration is None:
+        args.total = 200
+
+    items = load_requests(args.requests_file)
+    tester = LoadTester(args.url, target=args.target, api_key=args.api_key, timeout=args.timeout)
+    summary = tester.run(
+        items,
+        concurrency=args.concurrency,
+        total=args.total,
+        duration=args.duration,
+        warmup=args.warmup
+    )
+
+    name = f"{args.target}_chat_c{args.concurrency}"
+    report = build_report("load", {name: summary}, vars(args))
+    print(json.dumps(summary, indent=2))
+    write_report(report, args.output)
+
+    if args.baseline:
+        regressions = compare_reports(load_report(args.baseline), report, args.max_regression)
+        if regressions:
+            print("Regressions detected:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Micro-benchmarks for the chat pipeline components.
+
+Models are replaced with small, randomly initialised local stand-ins so the
+benchmarks run offline and measure the code paths (tokenisation, batching,
+FAISS search, regex processing) rather than download speed. Numbers are only
+comparable between runs with the same settings on the same host.
+
+Example:
+
+    python -m benchmarks.micro_benchmarks --output reports/micro.json
+    python -m benchmarks.micro_benchmarks --baseline reports/micro_main.json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.common import summarize_latencies, build_report, write_report, load_report, compare_reports
+from benchmarks.load_test import DEFAULT_REQUESTS_FILE, load_requests
+
+SAMPLE_RESPONSE = (
+    "Adults aged 50 to 74 at average risk should be screened for colorectal cancer. "
+    "Options include a colonoscopy every 10 years or a stool-based test every year. "
+    "People with a family history of colorectal cancer may need to start earlier. "
+    "Regular physical activity, a diet rich in fibre and avoiding tobacco also lower your risk.\n\n"
+    "Note: This information is not a substitute for professional medical advice. "
+    "Always consult with your healthcare provider."
+)
+
+
+def build_stand_in_tokenizer(texts: List[str]):
+    """
+    Build a small WordPiece tokenizer whose vocabulary covers the given texts.
+
+    Args:
+        texts: Texts whose words are added to the vocabulary
+
+    Returns:
+        PreTrainedTokenizerFast: A BERT-style tokenizer
+    """
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    characters = [chr(c) for c in range(ord("a"), ord("z") + 1)] + list("0123456789.,?!-'")
+    words = sorted({word for text in texts for word in re.findall(r"[a-z]+", text.lower())})
+    vocab_list = special + characters + [f"##{c}" for c in characters] + words
+    vocab = {token: i for i, token in enumerate(dict.fromkeys(vocab_list))}
+
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])]
+    )
+
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        unk_token="[UNK]",
+        pad_token="[PAD]",
+        cls_token="[CLS]",
+        sep_token="[SEP]",
+        mask_token="[MASK]"
+    )
+
+
+def build_stand_in_embedding_model(texts: List[str], hidden_size: int, layers: int):
+    """
+    Create an ``EmbeddingModel`` backed by a small random BERT.
+
+    Args:
+        texts: Texts used to build the tokenizer vocabulary
+        hidden_size: Hidden size (and embedding dimension) of the stand-in
+        layers: Number of transformer layers
+
+    Returns:
+        EmbeddingModel: The stand-in embedding model
+    """
+    from transformers import BertConfig, BertModel
+    from src.models.embedding import EmbeddingModel
+
+    class StandInEmbeddingModel(EmbeddingModel):
+        def __init__(self):
+            # Skip loading pretrained weights from the hub
+            self.tokenizer = build_stand_in_tokenizer(texts)
+            config = BertConfig(
+                vocab_size=len(self.tokenizer),
+                hidden_size=hidden_size,
+                num_hidden_layers=layers,
+                num_attention_heads=max(1, hidden_size // 64),
+                intermediate_size=hidden_size * 4,
+                max_position_embeddings=512
+            )
+            self.model = BertModel(config).eval()
+
+    return StandInEmbeddingModel()
+
+
+def build_stand_in_retriever(embedding_model, corpus_size: int, dimension: int, seed: int, shards: int = 1):
+    """
+    Create a ``DocumentRetriever`` over a random in-memory FAISS index.
+
+    Args:
+        embedding_model: Model used to embed queries
+        corpus_size: Number of vectors in the index
+        dimension: Vector dimension
+        seed: Random seed for the synthetic corpus
+        shards: Number of shards (1 uses a single flat index)
+
+    Returns:
+        DocumentRetriever: The stand-in retriever
+    """
+    import faiss
+    from src.models.retrieval import DocumentRetriever
+
+    retriever = DocumentRetriever(
+        embedding_model,
+        index_path="",
+        id_map_path="",
+        content_path="",
+        metadata_path=""
+    )
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((corpus_size, dimension)).astype("float32")
+    retriever.id_map = [f"chunk_{i}" for i in range(corpus_size)]
+    if shards > 1:
+        from src.db.vector_db import ShardedIndex
+
+        retriever.index = ShardedIndex(dimension, num_shards=shards)
+        retriever.index.add(vectors, np.arange(corpus_size), retriever.id_map)
+    else:
+        retriever.index = faiss.IndexFlatL2(dimension)
+        retriever.index.add(vectors)
+    retriever.document_content = {
+        doc_id: {"content": SAMPLE_RESPONSE, "source": "synthetic.pdf", "date": "2025-01-01"}
+        for doc_id in retriever.id_map
+    }
+    return retriever
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: List[Any], iterations: int, warmup: int) -> Tuple[List[float], float]:
+    """
+    Time repeated calls of ``fn`` over a cycle of inputs.
+
+    Args:
+        fn: Function to benchmark, called with one input at a time
+        inputs: Inputs cycled through by the calls
+        iterations: Number of measured calls
+        warmup: Number of unmeasured calls made first
+
+    Returns:
+        Tuple of per-call latencies and total wall-clock time, in seconds
+    """
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        latencies.append(time.perf_counter() - call_start)
+    wall = time.perf_counter() - start
+
+    return latencies, wall
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the selected micro-benchmarks.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Dict mapping benchmark name to summary statistics
+    """
+    import torch
+
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    queries = [item["message"] for item in load_requests(args.requests_file)]
+    selected = set(args.only) if args.only else None
+    results = {}
+
+    def enabled(name: str) -> bool:
+        return selected is None or name in selected
+
+    if enabled("query_processing"):
+        from src.pipeline.query_processing import QueryProcessor
+
+        processor = QueryProcessor()
+        latencies, wall = time_calls(processor.process_query, queries, args.iterations * 10, args.warmup)
+        results["query_processing.process_query"] = summarize_latencies(latencies, wall)
+
+    if enabled("validation"):
+        from src.pipeline.safety_validation import validate_output
+
+        responses = [SAMPLE_RESPONSE, SAMPLE_RESPONSE * 4, SAMPLE_RESPONSE[:180]]
+        latencies, wall = time_calls(validate_output, responses, args.iterations * 10, args.warmup)
+        results["safety_validation.validate_output"] = summarize_latencies(latencies, wall)
+
+    if enabled("embedding") or enabled("retrieval"):
+        embedding_model = build_stand_in_embedding_model(
+            queries + [SAMPLE_RESPONSE], args.hidden_size, args.layers
+        )
+
+        if enabled("embedding"):
+            passages = [SAMPLE_RESPONSE] * args.batch_size
+            latencies, wall = time_calls(embedding_model.embed_batch, [passages], args.iterations, args.warmup)
+            results[f"embedding.embed_batch.b{args.batch_size}"] = summarize_latencies(
+                latencies, wall, items_per_call=args.batch_size
+            )
+
+        if enabled("retrieval"):
+            retriever = build_stand_in_retriever(
+                embedding_model, args.corpus_size, args.hidden_size, args.seed, args.shards
+            )
+            latencies, wall = time_calls(
+                lambda query: retriever.retrieve_documents(query, top_k=args.top_k),
+                queries,
+                args.iterations,
+                args.warmup
+            )
+            shard_suffix = f".s{args.shards}" if args.shards > 1 else ""
+            results[f"retrieval.retrieve_documents.n{args.corpus_size}{shard_suffix}"] = summarize_latencies(
+                latencies, wall
+            )
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run pipeline micro-benchmarks with local stand-in models")
+    parser.add_argument("--only", nargs="*", choices=["query_processing", "validation", "embedding", "retrieval"],
+                        help="Run only these benchmarks")
+    parser.add_argument("--requests-file", default=DEFAULT_REQUESTS_FILE, help="Queries used as inputs")
+    parser.add_argument("--iterations", type=int, default=50, help="Measured calls per model benchmark")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured calls per benchmark")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size for embed_batch")
+    parser.add_argument("--hidden-size", type=int, default=256, help="Hidden size of the stand-in encoder")
+    parser.add_argument("--layers", type=int, default=2, help="Layers of the stand-in encoder")
+    parser.add_argument("--corpus-size", type=int, default=20000, help="Vectors in the stand-in index")
+    parser.add_argument("--shards", type=int, default=1, help="Shards in the stand-in index")
+    parser.add_argument("--top-k", type=int, default=3, help="Documents retrieved per query")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="reports/micro_benchmarks.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    report = build_report("micro", results, vars(args))
+    print(json.dumps(results, indent=2))
+    write_report(report, args.output)
+
+    if args.baseline:
+        regressions = compare_reports(load_report(args.baseline), report, args.max_regression)
+        if regressions:
+            print("Regressions detected:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
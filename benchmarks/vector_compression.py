@@ -0,0 +1,156 @@
+"""
+Recall, latency and memory of compressed vector index configurations.
+
+Every combination of projection (none, PCA, OPQ) and storage precision
+(float32, float16, int8) is built from the same corpus and compared against
+exact search over the full-dimension float32 vectors. Use it to choose the
+``vector_db.compression`` settings in config/db_config.yaml.
+
+Example:
+
+    python -m benchmarks.vector_compression --embeddings data/embeddings/embeddings.emb
+    python -m benchmarks.vector_compression --corpus-size 50000 --dimension 768 --output reports/compression.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.common import summarize_latencies, build_report, write_report
+
+PROJECTIONS = ["none", "pca", "opq"]
+STORAGES = ["float32", "float16", "int8"]
+
+
+def synthetic_corpus(size: int, dimension: int, seed: int) -> np.ndarray:
+    """
+    Generate vectors whose variance is concentrated in a few directions.
+
+    Real sentence embeddings are strongly anisotropic, which is what makes a
+    projection worthwhile; isotropic random vectors would understate recall.
+
+    Args:
+        size: Number of vectors
+        dimension: Vector dimension
+        seed: Random seed
+
+    Returns:
+        numpy.ndarray: float32 array of shape (size, dimension)
+    """
+    rng = np.random.RandomState(seed)
+    scales = 1.0 / np.sqrt(np.arange(1, dimension + 1))
+    rotation, _ = np.linalg.qr(rng.randn(dimension, dimension))
+    return ((rng.randn(size, dimension) * scales) @ rotation).astype("float32")
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the exact top-k neighbours that were retrieved."""
+    hits = sum(len(np.intersect1d(f[f >= 0], t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def build_configuration(
+    corpus: np.ndarray,
+    sample: np.ndarray,
+    projection: str,
+    storage: str,
+    dimensions: int
+) -> Tuple[Any, Any, float]:
+    """
+    Build one compressed index the way scripts/update_knowledge_base.py does.
+
+    Returns:
+        Tuple of (projection transform or None, index, build seconds)
+    """
+    from src.models.projection import train_projection, apply_projection
+    from src.db.vector_db import build_storage_index
+
+    start = time.perf_counter()
+    transform = train_projection(sample, projection, dimensions)
+    index = build_storage_index(dimensions if transform is not None else corpus.shape[1], storage)
+    if not index.is_trained:
+        index.train(apply_projection(transform, sample))
+    index.add(apply_projection(transform, corpus))
+    return transform, index, time.perf_counter() - start
+
+
+def run_comparison(args: argparse.Namespace) -> Dict[str, Any]:
+    import faiss
+    from src.models.embedding import open_embeddings
+    from src.models.projection import apply_projection
+
+    if args.embeddings:
+        corpus = np.asarray(open_embeddings(args.embeddings).vectors, dtype="float32")
+    else:
+        corpus = synthetic_corpus(args.corpus_size, args.dimension, args.seed)
+
+    rng = np.random.RandomState(args.seed)
+    queries = corpus[rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)]
+    # Perturb the queries so they are not exact copies of stored vectors
+    queries = queries + rng.randn(*queries.shape).astype("float32") * queries.std() * 0.1
+    sample = corpus[rng.choice(len(corpus), size=min(args.training_sample, len(corpus)), replace=False)]
+    dimensions = min(args.projected_dimension, corpus.shape[1])
+
+    exact = faiss.IndexFlatL2(corpus.shape[1])
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.top_k)
+
+    results = {}
+    for projection in args.projections:
+        for storage in args.storages:
+            name = f"{projection}_{storage}"
+            transform, index, build_seconds = build_configuration(corpus, sample, projection, storage, dimensions)
+
+            found = np.empty_like(truth)
+            latencies = []
+            start = time.perf_counter()
+            for q in range(len(queries)):
+                call_start = time.perf_counter()
+                # Queries pay for the projection too, as in EmbeddingModel
+                _, found[q:q + 1] = index.search(apply_projection(transform, queries[q:q + 1]), args.top_k)
+                latencies.append(time.perf_counter() - call_start)
+            wall = time.perf_counter() - start
+
+            stats = summarize_latencies(latencies, wall)
+            stats.update({
+                "dimension": index.d,
+                "recall_at_k": round(recall_at_k(found, truth), 4),
+                "bytes_per_vector": round(len(faiss.serialize_index(index)) / index.ntotal, 1),
+                "build_s": round(build_seconds, 3)
+            })
+            results[name] = stats
+            print(f"{name:<16} recall@{args.top_k}={stats['recall_at_k']:.3f} "
+                  f"bytes/vector={stats['bytes_per_vector']:<8} p50={stats['p50_ms']:.3f}ms")
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare compressed vector index configurations")
+    parser.add_argument("--embeddings", default=None, help="Embedding file to use instead of a synthetic corpus")
+    parser.add_argument("--corpus-size", type=int, default=20000, help="Vectors in the synthetic corpus")
+    parser.add_argument("--dimension", type=int, default=768, help="Dimension of the synthetic corpus")
+    parser.add_argument("--projected-dimension", type=int, default=384, help="Output dimension of PCA/OPQ")
+    parser.add_argument("--projections", nargs="*", choices=PROJECTIONS, default=PROJECTIONS,
+                        help="Projections to compare")
+    parser.add_argument("--storages", nargs="*", choices=STORAGES, default=STORAGES,
+                        help="Storage precisions to compare")
+    parser.add_argument("--training-sample", type=int, default=100000, help="Vectors used for training")
+    parser.add_argument("--queries", type=int, default=200, help="Measured queries per configuration")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours compared for recall")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="reports/vector_compression.json", help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    results = run_comparison(args)
+    report = build_report("vector_compression", results, vars(args))
+    print(json.dumps(results, indent=2))
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
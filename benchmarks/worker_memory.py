@@ -0,0 +1,96 @@
+"""
+Per-process memory report for a multi-worker server.
+
+Reads ``/proc/<pid>/smaps_rollup`` (Linux) for a gunicorn/uvicorn master and
+its workers and reports, per process:
+
+- RSS: resident memory, counting shared pages in full
+- PSS: proportional share, shared pages divided among the processes using them
+- USS: unique memory (private pages), i.e. what killing the process would free
+
+With memory-mapped or copy-on-write shared weights, worker USS should be far
+below the model size while the summed PSS stays close to one model copy.
+
+Example:
+
+    python -m benchmarks.worker_memory --pid $(pgrep -o gunicorn)
+"""
+import argparse
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+from benchmarks.common import build_report, write_report
+
+SMAPS_FIELD = re.compile(r"^(\w+):\s+(\d+) kB", re.MULTILINE)
+
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """
+    Read memory statistics of a process.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        Dict with rss, pss, uss, shared and swap in MiB
+    """
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        fields = {name: int(value) for name, value in SMAPS_FIELD.findall(f.read())}
+
+    def mib(*names: str) -> float:
+        return round(sum(fields.get(name, 0) for name in names) / 1024.0, 1)
+
+    return {
+        "rss_mib": mib("Rss"),
+        "pss_mib": mib("Pss"),
+        "uss_mib": mib("Private_Clean", "Private_Dirty"),
+        "shared_mib": mib("Shared_Clean", "Shared_Dirty"),
+        "swap_mib": mib("Swap")
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Return the direct children of a process."""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    for task in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, task, "children"), "r") as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return sorted(set(children))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report per-worker unique memory")
+    parser.add_argument("--pid", type=int, required=True, help="Master process id")
+    parser.add_argument("--output", default="reports/worker_memory.json", help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    processes = {"master": args.pid}
+    for i, child in enumerate(child_pids(args.pid)):
+        processes[f"worker_{i}"] = child
+
+    results = {}
+    print(f"{'process':<12} {'pid':>8} {'RSS MiB':>10} {'PSS MiB':>10} {'USS MiB':>10} {'shared MiB':>11}")
+    for name, pid in processes.items():
+        stats = read_memory(pid)
+        stats["pid"] = pid
+        results[name] = stats
+        print(f"{name:<12} {pid:>8} {stats['rss_mib']:>10.1f} {stats['pss_mib']:>10.1f} "
+              f"{stats['uss_mib']:>10.1f} {stats['shared_mib']:>11.1f}")
+
+    total_rss = sum(stats["rss_mib"] for stats in results.values())
+    total_pss = sum(stats["pss_mib"] for stats in results.values())
+    print(f"Sum of RSS: {total_rss:.1f} MiB, sum of PSS (actual host usage): {total_pss:.1f} MiB")
+
+    results["total"] = {"rss_mib": round(total_rss, 1), "pss_mib": round(total_pss, 1)}
+    write_report(build_report("worker_memory", results, vars(args)), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
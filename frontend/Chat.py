@@ -6,9 +6,14 @@ backend_url = st.secrets.get("BACKEND_URL", "http://localhost:5000")
 
 st.title("Chat with the Preventive Healthcare Assistant")
 
+# Messages kept for display; the backend keeps the history used for answers
+MAX_DISPLAYED_MESSAGES = 50
+
 # Initialize chat history
 if "history" not in st.session_state:
     st.session_state.history = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
 
 # Display chat history
 for msg in st.session_state.history:
@@ -32,13 +37,15 @@ if user_input:
             try:
                 resp = requests.post(
                     f"{backend_url}/chat/", 
-                    json={"query": user_input}, 
+                    json={"query": user_input, "session_id": st.session_state.session_id}, 
                     timeout=60
                 )
                 
                 if resp.status_code == 200:
                     try:
-                        answer = resp.json().get("answer", "Sorry, something went wrong.")
+                        payload = resp.json()
+                        answer = payload.get("answer", "Sorry, something went wrong.")
+                        st.session_state.session_id = payload.get("session_id", st.session_state.session_id)
                     except Exception as e:
                         st.error(f"Error parsing JSON: {e}")
                         answer = "Sorry, couldn't parse the server response."
@@ -51,6 +58,7 @@ if user_input:
                 
                 # Add assistant message to history
                 st.session_state.history.append({"role": "assistant", "content": answer})
+                del st.session_state.history[:-MAX_DISPLAYED_MESSAGES]
                 
             except requests.exceptions.Timeout:
                 st.error("Request timed out. The server took too long to respond.")
@@ -52,15 +52,31 @@ with st.form("feedback_form"):
             except Exception as e:
                 st.error(f"Error submitting feedback: {e}")
 
-# Display recent feedback summary
+# Display live feedback summary
 st.header("Feedback Summary")
-st.info("This section will show aggregated feedback metrics once the backend endpoint is fully implemented.")
 
-# Placeholder for feedback metrics
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.metric("Average Rating", "4.3/5")
-with col2:  
-    st.metric("Total Feedback Count", "283")
-with col3:
-    st.metric("Top Area for Improvement", "Response Speed")
+try:
+    summary_res = requests.get(f"{backend_url}/feedback/summary", timeout=5)
+    summary = summary_res.json() if summary_res.status_code == 200 else None
+except Exception:
+    summary = None
+
+if summary:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        average = summary["average_rating"]
+        st.metric("Average Rating", f"{average:.1f}/5" if average is not None else "n/a")
+    with col2:
+        st.metric("Total Feedback Count", summary["total"])
+    with col3:
+        st.metric("Low-Rated Answers", sum(summary["rating_counts"].get(r, 0) for r in ("1", "2")))
+
+    if summary["per_day"]:
+        st.subheader("Feedback per Day")
+        st.bar_chart(summary["per_day"], x="day", y="count")
+
+    if summary["low_rated"]:
+        st.subheader("Recent Low-Rated Queries")
+        st.dataframe(summary["low_rated"], use_container_width=True)
+else:
+    st.info("Feedback metrics are unavailable. Check that the backend server is running.")
@@ -4,41 +4,98 @@ import requests
 # Set consistent backend URL from secrets
 backend_url = st.secrets.get("BACKEND_URL", "http://localhost:5000")
 
+# Pipeline stages in the order they run for a chat request
+PIPELINE_STAGES = [
+    "redact_input",
+    "validate_input",
+    "get_user_profile",
+    "load_history",
+    "retrieve_documents",
+    "retrieve_embed",
+    "retrieve_search",
+    "retrieve_rerank",
+    "extract_answer",
+    "generate_response",
+    "generate_prefill",
+    "generate_decode",
+    "validate_output",
+    "store_history",
+]
+
+
+def fetch_metrics_summary():
+    """Fetch the live metrics summary from the backend, or None if unavailable."""
+    try:
+        resp = requests.get(f"{backend_url}/api/metrics/summary", timeout=5)
+        if resp.status_code == 200:
+            return resp.json()
+        st.error(f"Failed to fetch metrics. Status code: {resp.status_code}")
+    except Exception as e:
+        st.error(f"Error fetching metrics: {e}")
+    return None
+
+
 st.title("System Metrics Dashboard")
 
+if st.button("Refresh Metrics"):
+    st.rerun()
+
+summary = fetch_metrics_summary()
+
 # Add metrics visualization
 st.header("System Performance")
-col1, col2 = st.columns(2)
 
-with col1:
-    st.metric(label="Response Time", value="1.2s", delta="-0.3s")
-    st.metric(label="Daily Active Users", value="328", delta="12")
+if summary:
+    stages = summary.get("histograms", {}).get("stage_duration_seconds", {})
+    requests_served = summary.get("counters", {}).get("requests_total", {})
+    throughput_series = summary.get("histograms", {}).get("generation_tokens_per_second", {})
+    # Series are labelled by decoding mode; show the busiest one
+    throughput = max(throughput_series.values(), key=lambda stats: stats["count"], default={})
+    acceptance = summary.get("histograms", {}).get("draft_acceptance_rate", {}).get("_", {})
 
-with col2:
-    st.metric(label="Query Success Rate", value="96.8%", delta="0.2%")
-    st.metric(label="Average Rating", value="4.7", delta="0.1")
+    total = stages.get("stage=chat_total", {})
+    chat_requests = {
+        key: value for key, value in requests_served.items() if "endpoint=chat" in key
+    }
+    chat_count = sum(chat_requests.values())
+    chat_ok = sum(value for key, value in chat_requests.items() if "status=200" in key)
 
-# Add daily request chart
-st.header("Daily Requests")
-chart_data = {
-    "Date": ["2023-05-12", "2023-05-13", "2023-05-14", "2023-05-15", "2023-05-16", "2023-05-17", "2023-05-18", "2023-05-19"],
-    "Requests": [132, 145, 158, 187, 139, 166, 152, 143]
-}
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(label="Response Time (p50)", value=f"{total.get('p50', 0.0):.2f}s")
+        st.metric(label="Response Time (p95)", value=f"{total.get('p95', 0.0):.2f}s")
+    with col2:
+        success_rate = f"{100.0 * chat_ok / chat_count:.1f}%" if chat_count else "n/a"
+        st.metric(label="Query Success Rate", value=success_rate)
+        st.metric(label="Decode Throughput (p50)", value=f"{throughput.get('p50', 0.0):.1f} tok/s")
+        if acceptance:
+            st.metric(label="Draft Acceptance Rate (mean)", value=f"{100.0 * acceptance['mean']:.1f}%")
 
-st.bar_chart(chart_data, x="Date", y="Requests")
+    st.caption(f"{int(chat_count)} chat requests since startup ({summary.get('uptime_seconds', 0):.0f}s uptime)")
 
-# Add detailed metrics section
-st.header("Detailed Metrics")
-st.info("Metrics endpoint integration coming soon. The dashboard currently displays placeholder data.")
+    # Per-stage latency breakdown
+    st.header("Pipeline Stage Latency")
+    rows = []
+    for stage in PIPELINE_STAGES:
+        stats = stages.get(f"stage={stage}")
+        if not stats:
+            continue
+        rows.append({
+            "Stage": stage,
+            "Count": stats["count"],
+            "Mean (ms)": round(stats["mean"] * 1000, 1),
+            "p50 (ms)": round(stats["p50"] * 1000, 1),
+            "p95 (ms)": round(stats["p95"] * 1000, 1),
+            "p99 (ms)": round(stats["p99"] * 1000, 1),
+        })
 
-if st.button("Refresh Metrics"):
-    try:
-        resp = requests.get(f"{backend_url}/metrics/")
-        if resp.status_code == 200:
-            metrics = resp.json()
-            st.success("Metrics refreshed successfully!")
-            st.json(metrics)
-        else:
-            st.error(f"Failed to fetch metrics. Status code: {resp.status_code}")
-    except Exception as e:
-        st.error(f"Error fetching metrics: {e}")
+    if rows:
+        st.dataframe(rows, use_container_width=True)
+        st.bar_chart(rows, x="Stage", y="p50 (ms)")
+    else:
+        st.info("No chat requests have been served yet.")
+
+    with st.expander("Raw metrics"):
+        st.json(summary)
+else:
+    st.info("Live metrics are unavailable. Check that the backend server is running.")
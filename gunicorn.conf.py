@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for serving app.py with several workers per host.
+
+Models are loaded once in the master (``preload_app`` with blocking warm-up)
+and inherited by forked workers copy-on-write. Together with memory-mapped
+shared weights (see src/models/shared_weights.py) the model weights count once
+towards host memory instead of once per worker. Run
+``python -m benchmarks.worker_memory --pid <master pid>`` to see per-worker
+unique memory.
+
+Every worker keeps its own metrics; they are shared through snapshot files in
+METRICS_MULTIPROC_DIR (a fresh temporary directory by default) so /metrics and
+/api/metrics/summary report the whole server whichever worker answers.
+
+    gunicorn app:app
+"""
+import gc
+import os
+import glob
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 120
+
+# Load models in the master before forking; a background warm-up thread would
+# not survive the fork
+preload_app = True
+os.environ.setdefault("MODEL_WARMUP", "blocking")
+
+def on_starting(server):
+    # Snapshots of a previous run would be added to this run's totals
+    directory = os.environ.setdefault("METRICS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="healthbridge-metrics-"))
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics-*.json*")):
+        os.remove(path)
+
+def pre_fork(server, worker):
+    # Move objects created during preload out of the collector's generations so
+    # garbage collection in workers does not touch (and copy) their pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # The logging listener thread does not survive the fork; start a new one
+    from src.monitoring.logging import setup_logging
+    setup_logging()
+
+    # Drop series recorded during preload and share this worker's metrics
+    from src.monitoring.metrics import enable_multiprocess
+    enable_multiprocess(os.environ.get("METRICS_MULTIPROC_DIR"))
+
+    # Split CPU cores between workers instead of every worker using all of them
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    except ImportError:
+        pass
+
+def child_exit(server, worker):
+    # Keep the exited worker's totals, but not its samples in the percentiles
+    from src.monitoring.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
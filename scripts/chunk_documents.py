@@ -1,21 +1,30 @@
-# Placeholder chunk script
+# Split raw documents into token-sized chunks written as JSON lines
 import os
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline.chunking import (
+    DocumentChunker, TokenCounter, write_chunks, SUPPORTED_EXTENSIONS, DEFAULT_TOKENIZER
+)
 
 INPUT_DIR = "data/raw/"
 OUTPUT_DIR = "data/processed/"
+TOKENIZER_NAME = DEFAULT_TOKENIZER  # Must match the embedding model
+MAX_TOKENS = 256
+OVERLAP_TOKENS = 32
 
 def chunk_docs():
-    splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=64)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    chunker = DocumentChunker(TokenCounter.from_pretrained(TOKENIZER_NAME), MAX_TOKENS, OVERLAP_TOKENS)
 
-    for file_name in os.listdir(INPUT_DIR):
-        with open(os.path.join(INPUT_DIR, file_name), "r") as f:
-            text = f.read()
-        chunks = splitter.split_text(text)
-        out_file = os.path.join(OUTPUT_DIR, file_name.replace(".txt", "_chunks.txt"))
-        with open(out_file, "w") as f:
-            f.write("\n---\n".join(chunks))
-        print(f"Chunked {file_name}")
+    for file_name in sorted(os.listdir(INPUT_DIR)):
+        if not file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        stem = os.path.splitext(file_name)[0]
+        out_file = os.path.join(OUTPUT_DIR, f"{stem}.chunks.jsonl")
+        count = write_chunks(chunker.chunk_file(os.path.join(INPUT_DIR, file_name)), out_file)
+        print(f"Chunked {file_name} into {count} chunks")
 
 if __name__ == "__main__":
     chunk_docs()
@@ -0,0 +1,31 @@
+# Turn stored feedback ratings into per-chunk retrieval priors
+import os
+import sys
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import load_config
+from src.db.feedback_store import DEFAULT_CONNECTION_STRING, sqlite_path
+from src.pipeline.feedback_loop import (
+    DEFAULT_PRIORS_PATH, PRIOR_STRENGTH, iter_feedback_citations, compute_chunk_priors, save_priors
+)
+
+DB_CONFIG_FILE = "config/db_config.yaml"
+ID_MAP_FILE = "data/embeddings/id_map.json"
+PRIORS_FILE = DEFAULT_PRIORS_PATH
+
+def update_priors():
+    settings = (load_config(DB_CONFIG_FILE) or {}).get("relational_db", {})
+    db_path = sqlite_path(settings.get("connection_string", DEFAULT_CONNECTION_STRING))
+    with open(ID_MAP_FILE, "r") as f:
+        id_map = json.load(f)
+
+    priors = compute_chunk_priors(iter_feedback_citations(db_path), id_map, PRIOR_STRENGTH)
+    save_priors(priors, id_map, PRIORS_FILE)
+    print(f"Priors updated for {len(priors)} chunks "
+          f"({int(np.count_nonzero(priors > 0))} boosted, {int(np.count_nonzero(priors < 0))} demoted)")
+
+if __name__ == "__main__":
+    update_priors()
@@ -0,0 +1,42 @@
+# Remove near-duplicate chunks across documents before embedding
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline.chunking import read_chunks, write_chunks
+from src.pipeline.deduplication import deduplicate_chunks
+
+INPUT_DIR = "data/processed/"
+OUTPUT_DIR = "data/deduplicated/"
+REPORT_FILE = "data/deduplicated/dedup_report.json"
+THRESHOLD = 0.8
+NUM_PERM = 128
+
+def deduplicate_all():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    files = sorted(f for f in os.listdir(INPUT_DIR) if f.endswith(".chunks.jsonl"))
+
+    def all_chunks():
+        for file_name in files:
+            for chunk in read_chunks(os.path.join(INPUT_DIR, file_name)):
+                chunk["file"] = file_name
+                yield chunk
+
+    kept, report = deduplicate_chunks(all_chunks(), threshold=THRESHOLD, num_perm=NUM_PERM)
+
+    # Canonical chunks stay in the file of the document they came from
+    by_file = {file_name: [] for file_name in files}
+    for chunk in kept:
+        by_file[chunk.pop("file")].append(chunk)
+    for file_name, chunks in by_file.items():
+        write_chunks(chunks, os.path.join(OUTPUT_DIR, file_name))
+
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Kept {report['chunks_out']} of {report['chunks_in']} chunks "
+          f"({100.0 * report['dedup_ratio']:.1f}% near-duplicates removed)")
+
+if __name__ == "__main__":
+    deduplicate_all()
@@ -0,0 +1,23 @@
+# Export model weights for memory-mapped loading shared across workers
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.embedding import EmbeddingModel
+from src.models.generation import ResponseGenerator
+from src.models.shared_weights import export_shared_weights
+
+WEIGHTS_DIR = "data/weights/"
+
+def export_all():
+    embedding = EmbeddingModel()
+    export_shared_weights(embedding.model, embedding.tokenizer, os.path.join(WEIGHTS_DIR, "embedding"))
+    print("Exported embedding model weights")
+
+    generator = ResponseGenerator()
+    export_shared_weights(generator.model, generator.tokenizer, os.path.join(WEIGHTS_DIR, "generator"))
+    print("Exported generator model weights")
+
+if __name__ == "__main__":
+    export_all()
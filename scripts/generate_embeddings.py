@@ -1,32 +1,56 @@
-# Placeholder embeddings generation script
-from transformers import AutoTokenizer, AutoModel
-import torch
+# Embed the deduplicated chunks with the configured embedding provider
 import os
+import sys
+from contextlib import ExitStack
 
-MODEL_NAME = "path/to/your/finetuned/pubmedbert"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModel.from_pretrained(MODEL_NAME)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-PROCESSED_DIR = "data/processed/"
-EMBEDDINGS_OUTPUT = "data/synthetic/embeddings.pt"
+from src.core.config import load_config
+from src.pipeline.chunking import read_chunks
+from src.models.embedding import EmbeddingWriter
+from src.models.providers import create_embedding_model
 
-def get_embedding(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    return outputs.last_hidden_state[:, 0, :].squeeze()
+APP_CONFIG_FILE = "config/app_config.yaml"
+PROCESSED_DIR = "data/deduplicated/"
+EMBEDDINGS_OUTPUT = "data/embeddings/embeddings.emb"
+EMBEDDINGS_DTYPE = "float32"  # or "float16" to halve the file
+BATCH_SIZE = 32
+
+def load_embedding_model():
+    # The same provider (EMBEDDING_PROVIDER overrides the config) must embed
+    # queries at serving time. Vectors are written unprojected; the projection
+    # is trained from them by update_knowledge_base.py
+    settings = (load_config(APP_CONFIG_FILE) or {}).get("models", {}).get("embedding")
+    return create_embedding_model(settings, projection_path=None)
 
 def generate_all_embeddings():
-    embeddings = {}
-    for fname in os.listdir(PROCESSED_DIR):
-        with open(os.path.join(PROCESSED_DIR, fname), "r") as f:
-            text = f.read()
-        chunks = text.split("\n---\n")
-        for i, chunk in enumerate(chunks):
-            emb = get_embedding(chunk)
-            embeddings[f"{fname}_{i}"] = emb
-    torch.save(embeddings, EMBEDDINGS_OUTPUT)
-    print(f"Saved embeddings to {EMBEDDINGS_OUTPUT}")
+    model = load_embedding_model()
+    writer = None
+    count = 0
+
+    def write(batch):
+        # The file is opened with the dimension of the first batch
+        nonlocal writer, count
+        vectors = model.embed_batch([c["text"] for c in batch])
+        if writer is None:
+            writer = stack.enter_context(EmbeddingWriter(EMBEDDINGS_OUTPUT, vectors.shape[1], EMBEDDINGS_DTYPE))
+        writer.append([c["id"] for c in batch], vectors)
+        count += len(batch)
+
+    # Vectors are appended to the file batch by batch instead of held in memory
+    with ExitStack() as stack:
+        for fname in sorted(os.listdir(PROCESSED_DIR)):
+            if not fname.endswith(".chunks.jsonl"):
+                continue
+            batch = []
+            for chunk in read_chunks(os.path.join(PROCESSED_DIR, fname)):
+                batch.append(chunk)
+                if len(batch) == BATCH_SIZE:
+                    write(batch)
+                    batch = []
+            if batch:
+                write(batch)
+    print(f"Saved {count} embeddings to {EMBEDDINGS_OUTPUT}")
 
 if __name__ == "__main__":
     generate_all_embeddings()
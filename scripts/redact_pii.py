@@ -1,23 +1,25 @@
-# Placeholder PII redaction script
-import re
+# Redact PII from chunked documents before they are embedded
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.security.pii_redaction import redact_files
 
 INPUT_DIR = "data/processed/"
 OUTPUT_DIR = "data/processed/"
+WORKERS = None  # One process per CPU
+AGGRESSIVE_NAMES = True  # Documents rarely need capitalised word pairs kept
 
-def redact_text(text):
-    text = re.sub(r"\b[A-Z][a-z]+\s[A-Z][a-z]+\b", "[REDACTED_NAME]", text)
-    text = re.sub(r"\b[\w.-]+@[\w.-]+\.\w+\b", "[REDACTED_EMAIL]", text)
-    return text
-
-def redact_files():
-    for file_name in os.listdir(INPUT_DIR):
-        with open(os.path.join(INPUT_DIR, file_name), "r") as f:
-            text = f.read()
-        redacted = redact_text(text)
-        with open(os.path.join(OUTPUT_DIR, file_name), "w") as f:
-            f.write(redacted)
-        print(f"Redacted {file_name}")
+def redact_all():
+    jobs = [
+        (os.path.join(INPUT_DIR, file_name), os.path.join(OUTPUT_DIR, file_name))
+        for file_name in sorted(os.listdir(INPUT_DIR))
+        if file_name.endswith((".jsonl", ".txt"))
+    ]
+    results = redact_files(jobs, workers=WORKERS, aggressive_names=AGGRESSIVE_NAMES)
+    for path, counts in results.items():
+        print(f"Redacted {os.path.basename(path)}: {counts}")
 
 if __name__ == "__main__":
-    redact_files()
+    redact_all()
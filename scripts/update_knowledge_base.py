@@ -1,25 +1,96 @@
-# Placeholder KB update script
-import torch
+# Build the FAISS index used by the retriever from the embedding file
 import os
+import sys
+import json
 import faiss
+import numpy as np
 
-EMBEDDING_FILE = "data/synthetic/embeddings.pt"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import load_config
+from src.models.embedding import open_embeddings
+from src.models.projection import DEFAULT_PROJECTION_PATH, train_projection, apply_projection, save_projection
+from src.db.vector_db import ShardedIndex, build_storage_index
+from src.db.metadata_store import MetadataStore
+from src.pipeline.chunking import read_chunks
+
+EMBEDDING_FILE = "data/embeddings/embeddings.emb"
+INDEX_FILE = "data/embeddings/faiss_index.index"
+ID_MAP_FILE = "data/embeddings/id_map.json"
+SHARD_DIR = "data/embeddings/shards"
+CHUNKS_DIR = "data/deduplicated/"
+CONTENT_FILE = "data/processed/document_content.json"
+METADATA_FILE = "data/embeddings/metadata.npz"
+NUM_SHARDS = 1  # More than one builds a sharded index searched in parallel
+SHARD_BY = "hash"  # or "source" to keep each document in one shard
+PROJECTION_FILE = DEFAULT_PROJECTION_PATH
+DB_CONFIG_FILE = "config/db_config.yaml"
+BATCH_SIZE = 65536
+
+def training_sample(embeddings, size):
+    # Evenly spaced rows, so the sample covers every source in the file
+    rows = np.linspace(0, len(embeddings.ids) - 1, num=min(size, len(embeddings.ids)), dtype="int64")
+    return np.asarray(embeddings.vectors[np.unique(rows)], dtype="float32")
 
 def update_vector_store():
-    embeddings = torch.load(EMBEDDING_FILE)
-    dim = next(iter(embeddings.values())).shape[0]
-    index = faiss.IndexFlatL2(dim)
-
-    id_map = []
-    for i, (k, emb) in enumerate(embeddings.items()):
-        index.add(emb.unsqueeze(0).numpy())
-        id_map.append(k)
-
-    faiss.write_index(index, "data/synthetic/knowledge_base.index")
-    with open("data/synthetic/id_map.txt", "w") as f:
-        for id in id_map:
-            f.write(id + "\n")
-    print("Knowledge base updated")
+    embeddings = open_embeddings(EMBEDDING_FILE)
+    compression = (load_config(DB_CONFIG_FILE) or {}).get("vector_db", {}).get("compression", {})
+    method = compression.get("projection", "none")
+    storage = compression.get("storage", "float32")
+    sample = training_sample(embeddings, compression.get("training_sample", 100000))
+
+    # The same projection is applied to queries by EmbeddingModel
+    dimensions = min(compression.get("dimensions", embeddings.dimension), embeddings.dimension)
+    projection = train_projection(sample, method, dimensions)
+    save_projection(projection, PROJECTION_FILE)
+    dimension = dimensions if projection is not None else embeddings.dimension
+
+    if NUM_SHARDS > 1:
+        index = ShardedIndex(dimension, num_shards=NUM_SHARDS, shard_by=SHARD_BY, storage=storage)
+    else:
+        index = build_storage_index(dimension, storage)
+    if not index.is_trained:
+        index.train(apply_projection(projection, sample))
+
+    # Add the mapped matrix in large blocks rather than one vector at a time
+    start = 0
+    for batch in embeddings.iter_batches(BATCH_SIZE):
+        batch = apply_projection(projection, batch)
+        if NUM_SHARDS > 1:
+            rows = np.arange(start, start + len(batch))
+            index.add(batch, rows, embeddings.ids[start:start + len(batch)])
+        else:
+            index.add(batch)
+        start += len(batch)
+
+    if NUM_SHARDS > 1:
+        index.save(SHARD_DIR)
+    else:
+        faiss.write_index(index, INDEX_FILE)
+    with open(ID_MAP_FILE, "w") as f:
+        json.dump(embeddings.ids, f)
+    update_document_store(embeddings.ids)
+    print(f"Knowledge base updated with {index.ntotal} {dimension}-d {storage} vectors ({method} projection)")
+
+def update_document_store(ids):
+    # Content and filterable metadata, aligned with the index rows
+    content = {}
+    for file_name in sorted(os.listdir(CHUNKS_DIR)):
+        if file_name.endswith(".chunks.jsonl"):
+            for chunk in read_chunks(os.path.join(CHUNKS_DIR, file_name)):
+                content[chunk["id"]] = {
+                    "content": chunk["text"],
+                    "source": chunk["source"],
+                    "date": chunk.get("date", ""),
+                    "section": chunk.get("section"),
+                    "page_start": chunk.get("page_start"),
+                    "page_end": chunk.get("page_end")
+                }
+
+    with open(CONTENT_FILE, "w") as f:
+        json.dump(content, f)
+    MetadataStore.from_records([content.get(doc_id, {}) for doc_id in ids]).save(METADATA_FILE)
+    print(f"Document store updated with {len(content)} chunks")
 
 if __name__ == "__main__":
     update_vector_store()
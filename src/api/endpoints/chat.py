@@ -1,16 +1,21 @@
-
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
+from src.db.conversation_store import ConversationStore
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     query: str
+    session_id: str | None = None  # history is kept server-side per session
 
 class ChatResponse(BaseModel):
     answer: str
+    session_id: str
 
 @router.post("/", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
-    # TODO: connect to retrieval + generation pipeline
-    return ChatResponse(answer="(demo) I am still learning.")
+    # TODO: connect to retrieval + generation pipeline and keep the turns in the
+    # conversation store as app.py does; demo answers are not stored
+    session_id = req.session_id or ConversationStore.new_session_id()
+    answer = "(demo) I am still learning."
+    return ChatResponse(answer=answer, session_id=session_id)
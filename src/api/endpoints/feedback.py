@@ -1,6 +1,8 @@
 
-from fastapi import APIRouter, Body
+from typing import Any, List
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from src.db.feedback_store import get_feedback_store
 
 router = APIRouter()
 
@@ -9,8 +11,25 @@ class FeedbackRequest(BaseModel):
     answer: str
     rating: int  # 1-5
     comments: str | None = None
+    sources: List[Any] | None = None
+    user_id: str | None = None
 
 @router.post("/")
 async def feedback_endpoint(data: FeedbackRequest):
-    # TODO: save feedback to DB or logs
+    # Buffered in memory and written to the database in batches
+    try:
+        get_feedback_store().add(
+            query=data.query,
+            rating=data.rating,
+            answer=data.answer,
+            comments=data.comments,
+            sources=data.sources,
+            user_id=data.user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"status": "received"}
+
+@router.get("/summary")
+async def feedback_summary():
+    return get_feedback_store().summary()
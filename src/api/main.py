@@ -1,6 +1,9 @@
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from src.monitoring.metrics import render_prometheus, get_metrics_summary
+from src.monitoring.logging import set_request_id
 from .endpoints.chat import router as chat_router
 from .endpoints.feedback import router as feedback_router
 
@@ -14,9 +17,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    request_id = set_request_id(request.headers.get("X-Request-ID"))
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 app.include_router(chat_router, prefix="/chat", tags=["Chat"])
 app.include_router(feedback_router, prefix="/feedback", tags=["Feedback"])
 
 @app.get("/")
 async def root():
     return {"message": "Preventive Healthcare Chatbot is running"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/summary")
+async def metrics_summary():
+    return get_metrics_summary()
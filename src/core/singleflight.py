@@ -0,0 +1,119 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+The first caller for a key runs the function; callers that arrive with the
+same key while it is still running wait for it and receive the same result
+(or exception) instead of repeating the work. Nothing is cached: once the
+call finishes, the next caller starts a new one.
+"""
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Profile fields that change the generated prompt
+PROMPT_PROFILE_FIELDS = ("age", "gender", "medical_conditions")
+
+class _Call:
+    """A call in flight and the outcome its waiters will receive."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Shares one execution among concurrent calls with the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the call
+            fn: Function to run
+            *args, **kwargs: Arguments for ``fn``
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's call)
+
+        Raises:
+            Whatever ``fn`` raised, in the caller that ran it and in all waiters
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info("Coalesced %d requests into one call", call.waiters + 1)
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and drop whitespace and trailing punctuation differences."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+def chat_request_key(
+    query: str,
+    user_profile: Optional[Dict[str, Any]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    intent: Optional[str] = None
+) -> str:
+    """
+    Identify chat requests that would produce the same prompt.
+
+    Args:
+        query: The (redacted) user query
+        user_profile: User profile; only fields used in the prompt count
+        filters: Retrieval filters
+        chat_history: Previous messages included in the prompt
+        intent: Detected intent, which selects the answer path and generation
+            policy; it depends on punctuation ``normalize_query`` drops
+
+    Returns:
+        str: Hex digest shared by equivalent requests
+    """
+    profile = {field: (user_profile or {}).get(field) for field in PROMPT_PROFILE_FIELDS}
+    identity = {
+        "query": normalize_query(query),
+        "profile": profile,
+        "filters": filters or {},
+        "history": chat_history or [],
+        "intent": intent
+    }
+    encoded = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,307 @@
+"""
+Server-side conversation state with a bounded prompt history.
+
+Each session keeps its most recent messages verbatim and folds older turns
+into a short extractive summary as the conversation grows. The history
+handed to the model is therefore capped by a token budget no matter how
+long the conversation gets, and clients send only a session id instead of
+their whole history. State lives in the relational database so every
+worker process sees the same sessions.
+
+Session ids are issued by the server, and every session is bound to the
+caller that created it (``session_owner``); reads and writes by anyone else
+fail as if the session did not exist.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+from src.db.feedback_store import DEFAULT_CONNECTION_STRING, sqlite_path
+from src.pipeline.chunking import TokenCounter, split_sentences
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ROLE = "summary"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    session_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    recent TEXT NOT NULL DEFAULT '[]',
+    turns INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated_at);
+"""
+
+# Words of a message kept in its summary line
+SUMMARY_WORDS = 30
+
+class SessionNotFoundError(LookupError):
+    """Raised for unknown or expired sessions and for sessions of another owner."""
+
+def session_owner(api_key: str, user_id: str) -> str:
+    """
+    Identify the owner of a session without storing the credentials.
+
+    Args:
+        api_key: API key the request was authenticated with
+        user_id: User id given with the request
+
+    Returns:
+        str: Hex digest of the key and user id
+    """
+    return hashlib.sha256(f"{api_key}\0{user_id}".encode("utf-8")).hexdigest()
+
+def summarize_message(message: Dict[str, str]) -> str:
+    """
+    Reduce a message to one short line for the conversation summary.
+
+    Args:
+        message: Message with "role" and "content"
+
+    Returns:
+        str: The first sentence of the message, truncated to SUMMARY_WORDS words
+    """
+    # Answers end with a standard disclaimer that carries no context
+    content = message.get("content", "").split("\n\nNote:", 1)[0]
+    sentences = split_sentences(" ".join(content.split()))
+    words = (sentences[0] if sentences else "").split()
+    text = " ".join(words[:SUMMARY_WORDS]) + (" ..." if len(words) > SUMMARY_WORDS else "")
+    role = "User asked" if message.get("role") == "user" else "Assistant said"
+    return f"{role}: {text}"
+
+def bound_history(
+    messages: List[Dict[str, str]],
+    token_budget: int,
+    token_counter: Optional[TokenCounter] = None
+) -> List[Dict[str, str]]:
+    """
+    Keep the most recent messages that fit in a token budget.
+
+    Args:
+        messages: Messages, oldest first
+        token_budget: Maximum total tokens
+        token_counter: Counter used to measure messages
+
+    Returns:
+        The newest messages whose total size fits the budget, oldest first
+    """
+    token_counter = token_counter or TokenCounter()
+    kept, used = [], 0
+    for message, tokens in zip(reversed(messages), reversed(token_counter.count_batch([m.get("content", "") for m in messages]))):
+        if used + tokens > token_budget:
+            break
+        kept.append(message)
+        used += tokens
+    return list(reversed(kept))
+
+class ConversationStore:
+    """Per-session chat history: recent messages verbatim, older ones summarized."""
+
+    def __init__(
+        self,
+        db_path: str,
+        history_token_budget: int = 256,
+        summary_token_budget: int = 128,
+        ttl: float = 7 * 24 * 3600,
+        token_counter: Optional[TokenCounter] = None
+    ):
+        """
+        Open (or create) the conversation table.
+
+        Args:
+            db_path: SQLite database file
+            history_token_budget: Tokens of verbatim recent messages kept
+            summary_token_budget: Tokens of summary kept; the oldest summary
+                lines are dropped beyond it
+            ttl: Seconds of inactivity after which a session is removed
+            token_counter: Counter used to measure messages (estimates by default)
+        """
+        self.db_path = db_path
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.ttl = ttl
+        self.token_counter = token_counter or TokenCounter()
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(conversations)")]
+        if "owner" not in columns:
+            # Sessions created before owners were recorded belong to nobody
+            connection.execute("ALTER TABLE conversations ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        removed = self.purge_expired()
+        if removed:
+            logger.info(f"Removed {removed} expired conversations")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite serialises writers itself."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate an unguessable session id."""
+        return uuid.uuid4().hex
+
+    def create_session(self, owner: str) -> str:
+        """
+        Start an empty session.
+
+        Args:
+            owner: Owner of the session (see ``session_owner``)
+
+        Returns:
+            str: The new session id
+        """
+        session_id = self.new_session_id()
+        self._connection().execute(
+            "INSERT INTO conversations (session_id, owner, updated_at) VALUES (?, ?, ?)",
+            (session_id, owner, time.time())
+        )
+        return session_id
+
+    def _is_live(self, row: Optional[tuple], owner: str) -> bool:
+        """Whether a (owner, updated_at) row is an unexpired session of the owner."""
+        return row is not None and bool(owner) and row[0] == owner and time.time() - row[1] <= self.ttl
+
+    def get_history(self, session_id: str, owner: str) -> List[Dict[str, str]]:
+        """
+        Return the bounded history to include in the next prompt.
+
+        Args:
+            session_id: Session id
+            owner: Owner of the session (see ``session_owner``)
+
+        Returns:
+            List of messages, starting with a "summary" message when older
+            turns have been summarized
+
+        Raises:
+            SessionNotFoundError: If the session is unknown, expired or owned
+                by someone else
+        """
+        row = self._connection().execute(
+            "SELECT owner, updated_at, summary, recent FROM conversations WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if not self._is_live(row, owner):
+            raise SessionNotFoundError(session_id)
+
+        _, _, summary, recent = row
+        history = [{"role": SUMMARY_ROLE, "content": summary}] if summary else []
+        history.extend({"role": m["role"], "content": m["content"]} for m in json.loads(recent))
+        return history
+
+    def append_turn(self, session_id: str, owner: str, user_message: str, assistant_message: str) -> None:
+        """
+        Record one question and answer, summarizing turns that no longer fit.
+
+        Args:
+            session_id: Session id
+            owner: Owner of the session (see ``session_owner``)
+            user_message: The user's message
+            assistant_message: The answer given
+
+        Raises:
+            SessionNotFoundError: If the session is unknown, expired or owned
+                by someone else
+        """
+        new_messages = [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message}
+        ]
+        for message, tokens in zip(new_messages, self.token_counter.count_batch([user_message, assistant_message])):
+            message["tokens"] = tokens
+
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front, so concurrent turns of one
+        # session are applied one after the other
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT owner, updated_at, summary, recent, turns FROM conversations WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if not self._is_live(row, owner):
+                raise SessionNotFoundError(session_id)
+            summary, recent, turns = row[2], json.loads(row[3]), row[4]
+            recent.extend(new_messages)
+
+            # Fold the oldest messages into the summary until the rest fit
+            summary_lines = [line for line in summary.split("\n") if line]
+            while recent and sum(m["tokens"] for m in recent) > self.history_token_budget:
+                summary_lines.append(summarize_message(recent.pop(0)))
+            while summary_lines and self.token_counter.count("\n".join(summary_lines)) > self.summary_token_budget:
+                summary_lines.pop(0)
+
+            connection.execute(
+                "UPDATE conversations SET summary = ?, recent = ?, turns = ?, updated_at = ? WHERE session_id = ?",
+                ("\n".join(summary_lines), json.dumps(recent), turns + 1, time.time(), session_id)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id: str) -> None:
+        """Forget a session."""
+        self._connection().execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        """
+        Remove sessions inactive for longer than the TTL.
+
+        Returns:
+            int: Number of sessions removed
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl,)
+        )
+        return cursor.rowcount
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+def get_conversation_store(
+    settings: Optional[Dict[str, Any]] = None,
+    config_path: str = "config/db_config.yaml"
+) -> ConversationStore:
+    """
+    Return the process-wide conversation store in the ``relational_db`` database.
+
+    Args:
+        settings: Optional keyword arguments for ``ConversationStore``
+        config_path: Path to the database configuration
+
+    Returns:
+        ConversationStore: The shared store
+    """
+    global _conversation_store
+
+    with _conversation_store_lock:
+        if _conversation_store is None:
+            from src.core.config import load_config
+
+            db_settings = (load_config(config_path) or {}).get("relational_db", {})
+            connection_string = db_settings.get("connection_string", DEFAULT_CONNECTION_STRING)
+            if db_settings.get("provider", "sqlite") != "sqlite":
+                connection_string = DEFAULT_CONNECTION_STRING
+
+            _conversation_store = ConversationStore(sqlite_path(connection_string), **(settings or {}))
+        return _conversation_store
@@ -0,0 +1,325 @@
+"""
+Persistent store for user feedback on chatbot answers.
+
+Feedback is accepted into an in-memory buffer and written to SQLite by a
+background thread in batched transactions, so the request path never waits
+on the disk. Per-day aggregates (count, rating sum, rating histogram) are
+updated in the same transaction as the feedback rows, and the dashboard
+summary is read from that table, so it never scans the feedback table and
+every worker process reports the same figures.
+"""
+import os
+import json
+import atexit
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECTION_STRING = "sqlite:///data/app.db"
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    query TEXT NOT NULL,
+    answer TEXT,
+    rating INTEGER NOT NULL,
+    comments TEXT,
+    sources TEXT,
+    user_id TEXT
+);
+CREATE INDEX IF NOT EXISTS feedback_low_rated ON feedback (rating, id);
+CREATE TABLE IF NOT EXISTS feedback_daily (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    rating_1 INTEGER NOT NULL DEFAULT 0,
+    rating_2 INTEGER NOT NULL DEFAULT 0,
+    rating_3 INTEGER NOT NULL DEFAULT 0,
+    rating_4 INTEGER NOT NULL DEFAULT 0,
+    rating_5 INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+RATING_COLUMNS = [f"rating_{rating}" for rating in range(MIN_RATING, MAX_RATING + 1)]
+
+def sqlite_path(connection_string: str) -> str:
+    """
+    Extract the database file path from a ``sqlite:///`` connection string.
+
+    Args:
+        connection_string: SQLAlchemy-style connection string
+
+    Returns:
+        str: Database file path
+    """
+    prefix = "sqlite:///"
+    if not connection_string.startswith(prefix):
+        raise ValueError(f"Not a SQLite connection string: {connection_string}")
+    return connection_string[len(prefix):]
+
+class FeedbackStore:
+    """Buffered SQLite feedback storage with incrementally maintained aggregates."""
+
+    def __init__(
+        self,
+        db_path: str,
+        flush_size: int = 100,
+        flush_interval: float = 2.0,
+        low_rating_threshold: int = 2,
+        low_rated_limit: int = 20
+    ):
+        """
+        Open (or create) the database and start the background writer.
+
+        Args:
+            db_path: SQLite database file
+            flush_size: Buffered entries that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+            low_rating_threshold: Ratings at or below this count as low
+            low_rated_limit: Recent low-rated queries listed in the summary
+        """
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.low_rating_threshold = low_rating_threshold
+        self.low_rated_limit = low_rated_limit
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+        self._lock = threading.Lock()  # Guards the buffer
+        self._write_lock = threading.Lock()  # Serialises flushes
+        self._buffer: List[Dict[str, Any]] = []
+        self._readers = threading.local()  # Per-thread read connection and cached summary
+
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._flush_loop, name="feedback-flush", daemon=True)
+        self._thread.start()
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's read-only connection, opening it on first use."""
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._readers.connection = connection
+            self._readers.cached = None
+        return connection
+
+    def add(
+        self,
+        query: str,
+        rating: int,
+        answer: Optional[str] = None,
+        comments: Optional[str] = None,
+        sources: Optional[List[Any]] = None,
+        user_id: Optional[str] = None
+    ) -> None:
+        """
+        Accept one feedback entry; it is written to the database shortly after.
+
+        Args:
+            query: The question that was answered
+            rating: Rating from 1 to 5
+            answer: The answer that was rated
+            comments: Free-text comments
+            sources: Sources cited with the answer
+            user_id: Submitting user
+
+        Raises:
+            ValueError: If the query is empty or the rating is out of range
+        """
+        if not query:
+            raise ValueError("Feedback requires the original query")
+        if isinstance(rating, bool) or not isinstance(rating, int) or not MIN_RATING <= rating <= MAX_RATING:
+            raise ValueError(f"Rating must be an integer from {MIN_RATING} to {MAX_RATING}")
+
+        now = datetime.now()
+        entry = {
+            "created_at": now.isoformat(timespec="seconds"),
+            "day": now.date().isoformat(),
+            "query": query,
+            "answer": answer,
+            "rating": rating,
+            "comments": comments,
+            "sources": json.dumps(sources) if sources is not None else None,
+            "user_id": user_id
+        }
+
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Write all buffered feedback in one transaction.
+
+        Returns:
+            int: Number of entries written
+        """
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            per_day: Dict[str, List[int]] = {}
+            for entry in batch:
+                daily = per_day.setdefault(entry["day"], [0] * (2 + len(RATING_COLUMNS)))
+                daily[0] += 1
+                daily[1] += entry["rating"]
+                daily[1 + entry["rating"]] += 1
+
+            updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in ["count", "rating_sum"] + RATING_COLUMNS)
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT INTO feedback (created_at, day, query, answer, rating, comments, sources, user_id) "
+                        "VALUES (:created_at, :day, :query, :answer, :rating, :comments, :sources, :user_id)",
+                        batch
+                    )
+                    self._connection.executemany(
+                        f"INSERT INTO feedback_daily (day, count, rating_sum, {', '.join(RATING_COLUMNS)}) "
+                        f"VALUES ({', '.join(['?'] * (3 + len(RATING_COLUMNS)))}) "
+                        f"ON CONFLICT(day) DO UPDATE SET {updates}",
+                        [[day] + values for day, values in per_day.items()]
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error writing {len(batch)} feedback entries: {str(e)}")
+                # Keep the entries for the next attempt
+                with self._lock:
+                    self._buffer[:0] = batch
+                return 0
+            return len(batch)
+
+    def _flush_loop(self) -> None:
+        """Flush the buffer periodically, or as soon as it is full."""
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background thread and write any remaining feedback."""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self._connection.close()
+
+    def summary(self, days: int = 30) -> Dict[str, Any]:
+        """
+        Summarise all feedback written so far, by any process.
+
+        Totals and per-day counts come from the per-day aggregate table and
+        low-rated queries from the ``feedback_low_rated`` index, so the cost
+        depends only on ``days`` and ``low_rated_limit``, not on the number of
+        feedback entries. The result is reused until another connection
+        commits (``PRAGMA data_version``). Entries still buffered in this
+        process are reported as ``pending_writes``.
+
+        Args:
+            days: Number of most recent days included in the per-day counts
+
+        Returns:
+            Dict with totals, average rating, rating histogram, per-day
+            counts and recent low-rated queries
+        """
+        with self._lock:
+            pending = len(self._buffer)
+
+        connection = self._reader()
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        today = datetime.now().date().isoformat()
+        cached = self._readers.cached
+        if cached is None or cached[0] != (version, days, today):
+            cached = ((version, days, today), self._read_summary(connection, days))
+            self._readers.cached = cached
+
+        summary = dict(cached[1])
+        summary["pending_writes"] = pending
+        return summary
+
+    def _read_summary(self, connection: sqlite3.Connection, days: int) -> Dict[str, Any]:
+        """Read the summary figures from the database."""
+        columns = ["count", "rating_sum"] + RATING_COLUMNS
+        totals = connection.execute(
+            f"SELECT {', '.join(f'COALESCE(SUM({column}), 0)' for column in columns)} FROM feedback_daily"
+        ).fetchone()
+
+        first_day = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+        per_day = [
+            {"day": day, "count": count, "average_rating": round(rating_sum / count, 3)}
+            for day, count, rating_sum in connection.execute(
+                "SELECT day, count, rating_sum FROM feedback_daily WHERE day >= ? AND count > 0 ORDER BY day",
+                (first_day,)
+            )
+        ]
+
+        # One equality lookup per low rating walks the (rating, id) index
+        # newest-first and stops at the limit; a range on rating would scan
+        rows = []
+        for rating in range(MIN_RATING, self.low_rating_threshold + 1):
+            rows.extend(connection.execute(
+                "SELECT id, created_at, query, rating, comments FROM feedback WHERE rating = ? ORDER BY id DESC LIMIT ?",
+                (rating, self.low_rated_limit)
+            ))
+        rows.sort(reverse=True)
+        low_rated = [
+            {"created_at": created_at, "query": query, "rating": rating, "comments": comments}
+            for _, created_at, query, rating, comments in rows[:self.low_rated_limit]
+        ]
+
+        count, rating_sum = totals[0], totals[1]
+        return {
+            "total": count,
+            "average_rating": round(rating_sum / count, 3) if count else None,
+            "rating_counts": {str(rating): totals[1 + rating] for rating in range(MIN_RATING, MAX_RATING + 1)},
+            "per_day": per_day,
+            "low_rated": low_rated
+        }
+
+_feedback_store = None
+_feedback_store_lock = threading.Lock()
+
+def get_feedback_store(config_path: str = "config/db_config.yaml") -> FeedbackStore:
+    """
+    Return the process-wide feedback store configured by ``relational_db``.
+
+    Args:
+        config_path: Path to the database configuration
+
+    Returns:
+        FeedbackStore: The shared store
+    """
+    global _feedback_store
+
+    with _feedback_store_lock:
+        if _feedback_store is None:
+            from src.core.config import load_config
+
+            settings = (load_config(config_path) or {}).get("relational_db", {})
+            connection_string = settings.get("connection_string", DEFAULT_CONNECTION_STRING)
+            if settings.get("provider", "sqlite") != "sqlite":
+                logger.warning(f"Feedback store only supports sqlite; using {DEFAULT_CONNECTION_STRING}")
+                connection_string = DEFAULT_CONNECTION_STRING
+
+            _feedback_store = FeedbackStore(sqlite_path(connection_string))
+            atexit.register(_feedback_store.close)
+        return _feedback_store
@@ -1 +1,209 @@
-# metadata store client
+"""
+Compact chunk metadata index for filtered vector search.
+
+Metadata is kept as NumPy arrays aligned with the retriever's row ids: a
+source code, a date as a YYYYMMDD integer, and a bitmask of preventive-care
+categories per chunk. A filter is evaluated as one vectorized mask over these
+arrays and handed to FAISS as an ID selector, so the index only scores chunks
+that pass the filter instead of over-fetching and discarding results.
+"""
+import os
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Masks selecting at most this fraction of rows use an explicit id list
+# rather than a bitmap over all rows
+SPARSE_SELECTION_FRACTION = 0.01
+
+def parse_date(value: Optional[str]) -> int:
+    """
+    Convert an ISO date (YYYY-MM-DD, or a longer timestamp) to a YYYYMMDD integer.
+
+    Args:
+        value: Date string
+
+    Returns:
+        int: The date as YYYYMMDD, or 0 if missing or invalid
+    """
+    if not value:
+        return 0
+    digits = value[:10].replace("-", "")
+    return int(digits) if len(digits) == 8 and digits.isdigit() else 0
+
+def categorize_text(text: str, processor: Any = None) -> List[str]:
+    """
+    Categorize a chunk with the same rules used for queries.
+
+    Args:
+        text: Chunk text
+        processor: Optional QueryProcessor to reuse
+
+    Returns:
+        List of preventive-care categories
+    """
+    if processor is None:
+        from src.pipeline.query_processing import QueryProcessor
+        processor = QueryProcessor()
+    return processor._categorize_query(processor._clean_query(text))
+
+class MetadataStore:
+    """Per-row chunk metadata with vectorized filtering."""
+
+    def __init__(
+        self,
+        sources: List[str],
+        source_codes: np.ndarray,
+        dates: np.ndarray,
+        category_names: List[str],
+        category_bits: np.ndarray
+    ):
+        """
+        Initialize the store from aligned arrays.
+
+        Args:
+            sources: Source names; ``source_codes`` index into this list
+            source_codes: int32 source code per row
+            dates: int32 YYYYMMDD date per row (0 if unknown)
+            category_names: Category names; bit i of ``category_bits`` is category i
+            category_bits: uint32 category bitmask per row
+        """
+        self.sources = list(sources)
+        self.source_codes = np.asarray(source_codes, dtype=np.int32)
+        self.dates = np.asarray(dates, dtype=np.int32)
+        self.category_names = list(category_names)
+        self.category_bits = np.asarray(category_bits, dtype=np.uint32)
+        self._source_lookup = {source: code for code, source in enumerate(self.sources)}
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "MetadataStore":
+        """
+        Build the store from per-row records.
+
+        Args:
+            records: One dict per row id with "source", "date" and "content"
+
+        Returns:
+            MetadataStore: The store
+        """
+        from src.pipeline.query_processing import QueryProcessor
+
+        processor = QueryProcessor()
+        category_names = list(dict.fromkeys(processor.preventive_categories))
+        category_lookup = {name: bit for bit, name in enumerate(category_names)}
+
+        sources: Dict[str, int] = {}
+        source_codes = np.zeros(len(records), dtype=np.int32)
+        dates = np.zeros(len(records), dtype=np.int32)
+        category_bits = np.zeros(len(records), dtype=np.uint32)
+
+        for row, record in enumerate(records):
+            source_codes[row] = sources.setdefault(record.get("source", ""), len(sources))
+            dates[row] = parse_date(record.get("date"))
+            for category in categorize_text(record.get("content", ""), processor):
+                if category in category_lookup:
+                    category_bits[row] |= np.uint32(1 << category_lookup[category])
+
+        return cls(list(sources), source_codes, dates, category_names, category_bits)
+
+    def __len__(self) -> int:
+        return len(self.source_codes)
+
+    def save(self, path: str) -> None:
+        """
+        Write the store as an uncompressed .npz file.
+
+        Args:
+            path: Output file path
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                sources=np.array(self.sources),
+                source_codes=self.source_codes,
+                dates=self.dates,
+                category_names=np.array(self.category_names),
+                category_bits=self.category_bits
+            )
+        logger.info(f"Saved metadata for {len(self)} rows to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataStore":
+        """
+        Load a store written by ``save``.
+
+        Args:
+            path: Path of the .npz file
+
+        Returns:
+            MetadataStore: The store
+        """
+        with np.load(path) as data:
+            store = cls(
+                data["sources"].tolist(),
+                data["source_codes"],
+                data["dates"],
+                data["category_names"].tolist(),
+                data["category_bits"]
+            )
+        logger.info(f"Loaded metadata for {len(store)} rows from {path}")
+        return store
+
+    def select(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Evaluate a filter over all rows.
+
+        Args:
+            filters: Any of "sources" (list of source names), "date_from" and
+                "date_to" (ISO dates, inclusive; rows without a date are
+                excluded), and "categories" (rows matching any category)
+
+        Returns:
+            numpy.ndarray: Boolean mask over row ids
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        sources = filters.get("sources")
+        if sources:
+            codes = [self._source_lookup[source] for source in sources if source in self._source_lookup]
+            mask &= np.isin(self.source_codes, codes)
+
+        date_from, date_to = parse_date(filters.get("date_from")), parse_date(filters.get("date_to"))
+        if date_from:
+            mask &= self.dates >= date_from
+        if date_to:
+            mask &= (self.dates <= date_to) & (self.dates > 0)
+
+        categories = filters.get("categories")
+        if categories:
+            wanted = 0
+            for category in categories:
+                if category in self.category_names:
+                    wanted |= 1 << self.category_names.index(category)
+            mask &= (self.category_bits & np.uint32(wanted)) != 0
+
+        return mask
+
+    def search_parameters(self, mask: np.ndarray):
+        """
+        Turn a row mask into FAISS search parameters that restrict the search.
+
+        Args:
+            mask: Boolean mask over row ids, as returned by ``select``
+
+        Returns:
+            faiss.SearchParameters: Parameters to pass to ``index.search``
+        """
+        import faiss
+
+        if mask.sum() <= SPARSE_SELECTION_FRACTION * len(mask):
+            selector = faiss.IDSelectorBatch(np.flatnonzero(mask).astype("int64"))
+        else:
+            selector = faiss.IDSelectorBitmap(np.packbits(mask, bitorder="little"))
+        return faiss.SearchParameters(sel=selector)
@@ -41,10 +41,10 @@ def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     try:
         # In production, this would query a database
         if user_id in DEMO_PROFILES:
-            logger.info(f"Retrieved profile for user: {user_id}")
+            logger.info("Retrieved profile for user: %s", user_id)
             return DEMO_PROFILES[user_id]
         
-        logger.info(f"No profile found for user: {user_id}")
+        logger.info("No profile found for user: %s", user_id)
         return None
         
     except Exception as e:
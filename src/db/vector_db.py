@@ -1 +1,321 @@
-# vector db client
+"""
+Sharded FAISS vector index with parallel fan-out search.
+
+Vectors are split across several shards by document source or by a hash of
+the document ID. Every vector keeps its global row id (its position in the
+retriever's ID map), so shard results can be merged back into a single
+global top-k. A search runs on all shards at once in a thread pool (FAISS
+releases the GIL while searching) and the per-shard result lists, which
+are already sorted, are merged with a k-way heap merge.
+
+Vectors can be stored as float32, float16 or scalar-quantized int8 codes
+(2x and 4x smaller than float32); ``build_storage_index`` creates the
+matching FAISS index for both single and sharded layouts.
+"""
+import os
+import json
+import heapq
+import zlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+SHARD_BY_HASH = "hash"
+SHARD_BY_SOURCE = "source"
+
+METRIC_L2 = "l2"
+METRIC_INNER_PRODUCT = "ip"
+
+STORAGE_FLOAT32 = "float32"
+STORAGE_FLOAT16 = "float16"
+STORAGE_INT8 = "int8"
+
+def build_storage_index(dimension: int, storage: str = STORAGE_FLOAT32, metric: str = METRIC_L2):
+    """
+    Create an empty exhaustive-search index with the given vector storage.
+
+    int8 storage learns per-dimension value ranges and must be trained
+    (``index.train``) on sample vectors before vectors are added.
+
+    Args:
+        dimension: Vector dimension
+        storage: "float32", "float16" or "int8"
+        metric: "l2" or "ip"
+
+    Returns:
+        faiss.Index: The empty index
+    """
+    import faiss
+
+    if metric not in (METRIC_L2, METRIC_INNER_PRODUCT):
+        raise ValueError(f"Unknown metric: {metric}")
+    if storage == STORAGE_FLOAT32:
+        return faiss.IndexFlatL2(dimension) if metric == METRIC_L2 else faiss.IndexFlatIP(dimension)
+
+    quantizer_types = {
+        STORAGE_FLOAT16: faiss.ScalarQuantizer.QT_fp16,
+        STORAGE_INT8: faiss.ScalarQuantizer.QT_8bit
+    }
+    if storage not in quantizer_types:
+        raise ValueError(f"Unknown storage: {storage}")
+    metric_type = faiss.METRIC_L2 if metric == METRIC_L2 else faiss.METRIC_INNER_PRODUCT
+    return faiss.IndexScalarQuantizer(dimension, quantizer_types[storage], metric_type)
+
+def document_source(doc_id: str) -> str:
+    """Return the source document of a chunk ID of the form ``<source>#<index>``."""
+    return doc_id.rsplit("#", 1)[0]
+
+class ShardedIndex:
+    """A set of FAISS shards searched in parallel and merged into one result."""
+
+    def __init__(
+        self,
+        dimension: int,
+        num_shards: int = 4,
+        shard_by: str = SHARD_BY_HASH,
+        metric: str = METRIC_L2,
+        max_workers: Optional[int] = None,
+        storage: str = STORAGE_FLOAT32
+    ):
+        """
+        Initialize empty shards.
+
+        Args:
+            dimension: Vector dimension
+            num_shards: Number of shards
+            shard_by: "hash" (spread chunks evenly) or "source" (keep each
+                document's chunks together so it can be rebuilt alone)
+            metric: "l2" (lower is better) or "ip" (inner product, higher is better)
+            max_workers: Threads used for fan-out search (defaults to one per
+                shard, capped at the CPU count)
+            storage: "float32", "float16" or "int8" vector storage; int8
+                shards must be trained with ``train`` before adding vectors
+        """
+        if shard_by not in (SHARD_BY_HASH, SHARD_BY_SOURCE):
+            raise ValueError(f"Unknown shard_by: {shard_by}")
+
+        self.dimension = dimension
+        self.num_shards = num_shards
+        self.shard_by = shard_by
+        self.metric = metric
+        self.storage = storage
+        # Empty (trained) storage index cloned for every new shard
+        self._template = build_storage_index(dimension, storage, metric)
+        self.shards = [self._new_shard() for _ in range(num_shards)]
+
+        self._lock = threading.Lock()
+        workers = max_workers or min(num_shards, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-search") \
+            if num_shards > 1 and workers > 1 else None
+
+    def _new_shard(self):
+        """Create an empty shard that stores global row ids."""
+        import faiss
+
+        return faiss.IndexIDMap2(faiss.clone_index(self._template))
+
+    @property
+    def is_trained(self) -> bool:
+        """Whether vectors can be added (only int8 storage needs training)."""
+        return self._template.is_trained
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Train the storage quantizer shared by all shards.
+
+        Args:
+            vectors: 2D float32 array of sample vectors
+        """
+        if self.ntotal:
+            raise ValueError("Shards must be trained before vectors are added")
+        self._template.train(np.ascontiguousarray(vectors, dtype="float32"))
+        self.shards = [self._new_shard() for _ in range(self.num_shards)]
+
+    @property
+    def ntotal(self) -> int:
+        """Total number of vectors across all shards."""
+        return sum(shard.ntotal for shard in self.shards)
+
+    def shard_for(self, doc_id: str) -> int:
+        """
+        Choose the shard of a document chunk.
+
+        Args:
+            doc_id: Chunk ID
+
+        Returns:
+            int: Shard number
+        """
+        key = document_source(doc_id) if self.shard_by == SHARD_BY_SOURCE else doc_id
+        return zlib.crc32(key.encode("utf-8")) % self.num_shards
+
+    def add(self, vectors: np.ndarray, row_ids: np.ndarray, doc_ids: List[str]) -> None:
+        """
+        Add vectors to their shards.
+
+        Meant for building an index; a live index is replaced by loading a
+        newly saved one, so searches never see a shard being modified.
+
+        Args:
+            vectors: 2D float32 array of vectors
+            row_ids: Global row id of each vector
+            doc_ids: Chunk ID of each vector, used to choose its shard
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        row_ids = np.asarray(row_ids, dtype="int64")
+        assignment = np.fromiter((self.shard_for(doc_id) for doc_id in doc_ids), dtype="int64", count=len(doc_ids))
+
+        with self._lock:
+            for shard_no in range(self.num_shards):
+                mask = assignment == shard_no
+                if mask.any():
+                    self.shards[shard_no].add_with_ids(vectors[mask], row_ids[mask])
+
+    def search(self, queries: np.ndarray, k: int, params: Any = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search all shards and merge their results into a global top-k.
+
+        Has the same signature and result layout as a FAISS index search, so
+        it can be used in place of one.
+
+        Args:
+            queries: 2D float32 array of query vectors
+            k: Number of results per query
+            params: Optional faiss.SearchParameters (e.g. an ID selector over
+                global row ids), applied to every shard
+
+        Returns:
+            Tuple of (distances, row ids), each of shape (len(queries), k);
+            missing results have row id -1
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        shards = self.shards
+
+        if self._pool:
+            partial = list(self._pool.map(lambda shard: shard.search(queries, k, params=params), shards))
+        else:
+            partial = [shard.search(queries, k, params=params) for shard in shards]
+
+        distances = np.full((len(queries), k), np.inf if self.metric == METRIC_L2 else -np.inf, dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        sign = 1.0 if self.metric == METRIC_L2 else -1.0
+
+        for q in range(len(queries)):
+            # Each shard's list is sorted best-first, so a k-way merge suffices
+            ranked = [
+                [(sign * float(d), int(i)) for d, i in zip(shard_d[q], shard_i[q]) if i >= 0]
+                for shard_d, shard_i in partial
+            ]
+            for rank, (score, row_id) in enumerate(islice(heapq.merge(*ranked), k)):
+                distances[q, rank] = sign * score
+                ids[q, rank] = row_id
+
+        return distances, ids
+
+    def reconstruct_batch(self, row_ids: np.ndarray) -> np.ndarray:
+        """
+        Return the stored vectors of the given global row ids.
+
+        Args:
+            row_ids: Global row ids
+
+        Returns:
+            numpy.ndarray: float32 array of shape (len(row_ids), dimension)
+        """
+        shards = self.shards
+        vectors = np.empty((len(row_ids), self.dimension), dtype="float32")
+        for position, row_id in enumerate(row_ids):
+            for shard in shards:
+                try:
+                    vectors[position] = shard.reconstruct(int(row_id))
+                    break
+                except RuntimeError:
+                    continue  # Not stored in this shard
+            else:
+                raise KeyError(f"Row {row_id} is not in any shard")
+        return vectors
+
+    def save(self, directory: str) -> None:
+        """
+        Write every shard and a manifest describing the layout.
+
+        Args:
+            directory: Output directory
+        """
+        import faiss
+
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for shard_no, shard in enumerate(self.shards):
+            file_name = f"shard_{shard_no:03d}.index"
+            tmp_path = os.path.join(directory, f"{file_name}.tmp")
+            faiss.write_index(shard, tmp_path)
+            os.replace(tmp_path, os.path.join(directory, file_name))
+            entries.append({"file": file_name, "ntotal": int(shard.ntotal)})
+
+        manifest = {
+            "dimension": self.dimension,
+            "num_shards": self.num_shards,
+            "shard_by": self.shard_by,
+            "metric": self.metric,
+            "storage": self.storage,
+            "shards": entries
+        }
+        with open(os.path.join(directory, MANIFEST_FILENAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        logger.info(f"Saved {self.num_shards} shards with {self.ntotal} vectors to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, max_workers: Optional[int] = None) -> "ShardedIndex":
+        """
+        Load shards written by ``save``.
+
+        Args:
+            directory: Directory holding the manifest and shard files
+            max_workers: Threads used for fan-out search
+
+        Returns:
+            ShardedIndex: The loaded index
+        """
+        import faiss
+
+        with open(os.path.join(directory, MANIFEST_FILENAME), "r") as f:
+            manifest = json.load(f)
+
+        index = cls(
+            manifest["dimension"],
+            num_shards=manifest["num_shards"],
+            shard_by=manifest["shard_by"],
+            metric=manifest["metric"],
+            max_workers=max_workers,
+            storage=manifest.get("storage", STORAGE_FLOAT32)
+        )
+        index.shards = [faiss.read_index(os.path.join(directory, entry["file"])) for entry in manifest["shards"]]
+        # New shards reuse the trained quantizer of the stored ones
+        template = faiss.clone_index(faiss.downcast_index(index.shards[0].index))
+        template.reset()
+        index._template = template
+        logger.info(f"Loaded {index.num_shards} shards with {index.ntotal} vectors from {directory}")
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        """Vector counts per shard, for monitoring shard balance."""
+        return {
+            "num_shards": self.num_shards,
+            "shard_by": self.shard_by,
+            "storage": self.storage,
+            "ntotal": self.ntotal,
+            "shard_sizes": [int(shard.ntotal) for shard in self.shards]
+        }
+
+def has_sharded_index(directory: Optional[str]) -> bool:
+    """Whether a directory holds a sharded index manifest."""
+    return bool(directory) and os.path.exists(os.path.join(directory, MANIFEST_FILENAME))
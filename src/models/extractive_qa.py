@@ -0,0 +1,150 @@
+"""
+Extractive answers from retrieved chunks with the PubMedBERT QA head.
+
+Factual lookups ("at what age ...", "how often ...") are usually answered
+verbatim by one retrieved chunk. ``ExtractiveAnswerer`` scores answer spans
+in all retrieved chunks with a single batched forward pass of the
+question-answering model; when the best span is confident enough the API
+returns it with its source instead of running free-text generation.
+"""
+import re
+import logging
+from typing import List, Dict, Any, Optional
+
+from src.models.pubmedbert.pytorch_model import DEFAULT_QA_MODEL_ID, load_qa_model
+
+logger = logging.getLogger(__name__)
+
+# Questions asking for a fact that a single span can answer
+FACTUAL_QUESTION_PATTERN = re.compile(
+    r"^(?:what|when|which|who|where|at what|how (?:often|many|much|old|long|frequently)|is there|are there)\b"
+)
+
+def is_factual_question(query: str, intent: str) -> bool:
+    """
+    Whether a query asks for a fact rather than advice or an explanation.
+
+    Args:
+        query: The cleaned query (see ``QueryProcessor._clean_query``)
+        intent: Intent from ``QueryProcessor._detect_intent``
+
+    Returns:
+        bool: True for factual questions
+    """
+    return intent == "question" and bool(FACTUAL_QUESTION_PATTERN.search(query))
+
+class ExtractiveAnswerer:
+    """Finds the most likely answer span for a question across retrieved chunks."""
+
+    def __init__(
+        self,
+        model_id: str = DEFAULT_QA_MODEL_ID,
+        min_score: float = 0.5,
+        max_answer_tokens: int = 40,
+        max_seq_length: int = 384,
+        doc_stride: int = 128
+    ):
+        """
+        Load the question-answering model.
+
+        Args:
+            model_id: HuggingFace identifier of a checkpoint fine-tuned for
+                extractive QA
+            min_score: Span probability required to answer without the generator
+            max_answer_tokens: Longest span considered, in tokens
+            max_seq_length: Tokens per question and chunk window
+            doc_stride: Tokens shared by consecutive windows of a long chunk
+        """
+        self.tokenizer, self.model = load_qa_model(model_id)
+        self.min_score = min_score
+        self.max_answer_tokens = max_answer_tokens
+        self.max_seq_length = max_seq_length
+        self.doc_stride = doc_stride
+
+    def answer(self, question: str, documents: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Find the best answer span in the documents.
+
+        Span probabilities are normalised over the [CLS] position too, which
+        QA heads use to mean "no answer here", so windows without an answer
+        score low.
+
+        Args:
+            question: The user question
+            documents: Retrieved documents with "content"
+
+        Returns:
+            Dict with "answer", "score" and "document" (index into
+            ``documents``), or None when no document has text
+        """
+        import torch
+
+        contexts = [doc.get("content") or "" for doc in documents]
+        if not any(contexts):
+            return None
+
+        encoded = self.tokenizer(
+            [question] * len(contexts),
+            contexts,
+            truncation="only_second",
+            max_length=self.max_seq_length,
+            stride=self.doc_stride,
+            return_overflowing_tokens=True,
+            return_offsets_mapping=True,
+            padding=True,
+            return_tensors="pt"
+        )
+        offsets = encoded.pop("offset_mapping")
+        window_documents = encoded.pop("overflow_to_sample_mapping")
+
+        with torch.no_grad():
+            outputs = self.model(**encoded)
+
+        # Only context tokens can start or end a span; [CLS] stays in the
+        # normalisation as the no-answer option
+        context_mask = torch.tensor(
+            [[sequence_id == 1 for sequence_id in encoded.sequence_ids(i)] for i in range(len(offsets))]
+        )
+        allowed = context_mask.clone()
+        allowed[:, 0] = True
+        start_log_probs = outputs.start_logits.masked_fill(~allowed, float("-inf")).log_softmax(dim=-1)
+        end_log_probs = outputs.end_logits.masked_fill(~allowed, float("-inf")).log_softmax(dim=-1)
+
+        # Score every (start, end) pair in one tensor: end after start, bounded length
+        length = start_log_probs.shape[1]
+        positions = torch.arange(length)
+        span_lengths = positions[None, :] - positions[:, None]
+        valid = (span_lengths >= 0) & (span_lengths < self.max_answer_tokens)
+        valid = valid[None] & context_mask[:, :, None] & context_mask[:, None, :]
+        scores = (start_log_probs[:, :, None] + end_log_probs[:, None, :]).masked_fill(~valid, float("-inf"))
+
+        best = int(scores.view(-1).argmax())
+        window, start, end = best // (length * length), (best // length) % length, best % length
+        score = float(scores[window, start, end].exp())
+        if score == 0.0:
+            return None
+
+        document = int(window_documents[window])
+        text = contexts[document][int(offsets[window, start, 0]):int(offsets[window, end, 1])].strip()
+        if not text:
+            return None
+        return {"answer": text, "score": score, "document": document}
+
+def format_extractive_answer(result: Dict[str, Any], document: Dict[str, Any]) -> str:
+    """
+    Present an extracted span as a cited answer.
+
+    Args:
+        result: Output of ``ExtractiveAnswerer.answer``
+        document: The document the span was taken from
+
+    Returns:
+        str: Answer text with its source and the medical disclaimer
+    """
+    from src.models.generation import DISCLAIMER
+
+    answer = result["answer"]
+    if answer and answer[-1] not in ".!?":
+        answer += "."
+    source = document.get("metadata", {}).get("source", "Unknown")
+    return f"{answer[0].upper()}{answer[1:]}\n\nSource: {source}\n\n{DISCLAIMER}"
@@ -5,101 +5,192 @@ Response generation module for the Preventive Healthcare Chatbot.
 import os
 import logging
 import json
+import time
+import threading
 from typing import List, Dict, Any, Optional
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+
+from src.models.generation_policy import GenerationPolicy
+from src.monitoring.metrics import record_generation, record_speculation
 
 logger = logging.getLogger(__name__)
 
-class ResponseGenerator:
-    """Generates responses using a language model based on retrieved documents."""
+DISCLAIMER = "Note: This information is not a substitute for professional medical advice. Always consult with your healthcare provider."
+
+class GenerationTimer:
+    """
+    Stopping criterion that never stops generation but timestamps decode steps.
+
+    ``generate`` evaluates stopping criteria after every new token, so the first
+    call marks the end of the prefill pass (prompt encoding plus first token) and
+    the last call marks the end of decoding. It is passed to ``generate`` inside
+    a ``StoppingCriteriaList``, which only requires it to be callable.
+    """
     
-    def __init__(
-        self,
-        model_name: str = "google/flan-t5-large",  # Using a smaller model for demonstration
-        max_new_tokens: int = 512,
-        temperature: float = 0.7,
-        model_device: str = "cpu"  # Switch to "cuda" if GPU is available
-    ):
+    def __init__(self):
+        """Initialize the timer; call ``start`` right before ``generate``."""
+        self.started_at = None
+        self.first_token_at = None
+        self.last_token_at = None
+    
+    def start(self) -> None:
+        """Mark the start of a generation call."""
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.last_token_at = None
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        return input_ids.new_zeros(input_ids.shape[0]).bool()
+    
+    @property
+    def prefill_seconds(self) -> float:
+        """Time from the start of the call until the first new token."""
+        if self.started_at is None or self.first_token_at is None:
+            return 0.0
+        return self.first_token_at - self.started_at
+    
+    @property
+    def decode_seconds(self) -> float:
+        """Time spent producing the tokens after the first one."""
+        if self.first_token_at is None:
+            return 0.0
+        return self.last_token_at - self.first_token_at
+
+class ForwardCounter:
+    """
+    Counts forward passes of a model, separately for each calling thread.
+
+    Assisted generation runs one forward pass of the main model per
+    verification step and one of the draft model per proposed token, so the
+    counts of one ``generate`` call give its draft acceptance rate. Counts are
+    thread-local because concurrent requests share the models.
+    """
+    
+    def __init__(self, model):
+        """Attach the counter to ``model`` for its lifetime."""
+        self._local = threading.local()
+        model.register_forward_hook(self._hook)
+    
+    def _hook(self, module, args, output):
+        self._local.count = getattr(self._local, "count", 0) + 1
+    
+    def reset(self) -> None:
+        """Start counting for a new call in this thread."""
+        self._local.count = 0
+    
+    @property
+    def count(self) -> int:
+        """Forward passes in this thread since the last reset."""
+        return getattr(self._local, "count", 0)
+
+class RepetitionStopper:
+    """
+    Stopping criterion that ends generation once the output starts repeating.
+
+    After every step the last ``ngram`` generated tokens are compared with
+    all earlier n-grams in the most recent ``window`` tokens; a match means
+    the model is looping, so generation stops and ``cut`` marks where the
+    repeated stretch begins.
+    """
+    
+    def __init__(self, prompt_length: int, ngram: int, window: int = 64):
         """
-        Initialize the response generator.
+        Initialize the criterion.
         
         Args:
-            model_name: HuggingFace model identifier
-            max_new_tokens: Maximum number of tokens to generate
-            temperature: Sampling temperature (higher = more random)
-            model_device: Device to run the model on ("cpu" or "cuda")
+            prompt_length: Leading positions of ``input_ids`` that are not output
+            ngram: Length of the repeated stretch that stops generation
+            window: Recent output tokens searched for an earlier occurrence
         """
-        logger.info(f"Initializing response generator with model: {model_name}")
-        try:
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            
-            # Move model to appropriate device
-            self.device = model_device if torch.cuda.is_available() and model_device == "cuda" else "cpu"
-            self.model.to(self.device)
-            
-            self.max_new_tokens = max_new_tokens
-            self.temperature = temperature
-            
-            logger.info(f"Response generator initialized on {self.device}")
-        except Exception as e:
-            logger.error(f"Error initializing response generator: {str(e)}")
-            raise
+        self.prompt_length = prompt_length
+        self.ngram = ngram
+        self.window = window
+        self.cut: Optional[int] = None
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        stop = input_ids.new_zeros(input_ids.shape[0]).bool()
+        generated = input_ids[0, self.prompt_length:]
+        recent = generated[-self.window:]
+        if len(recent) < 2 * self.ngram:
+            return stop
+        
+        tail = recent[-self.ngram:]
+        earlier = recent[:-self.ngram].unfold(0, self.ngram, 1)
+        if (earlier == tail).all(dim=1).any():
+            self.cut = len(generated) - self.ngram
+            stop[:] = True
+        return stop
+
+class StopSequenceStopper:
+    """
+    Stopping criterion that ends generation once the output contains a stop sequence.
+
+    Only the last ``lookback`` tokens are decoded per step, which is enough
+    to see any stop sequence that was just completed.
+    """
+    
+    def __init__(self, tokenizer, prompt_length: int, stop_sequences: List[str], lookback: int = 16):
+        """
+        Initialize the criterion.
+        
+        Args:
+            tokenizer: Tokenizer of the generating model
+            prompt_length: Leading positions of ``input_ids`` that are not output
+            stop_sequences: Strings that end generation
+            lookback: Recent tokens decoded per step
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stop_sequences = stop_sequences
+        self.lookback = lookback
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        stop = input_ids.new_zeros(input_ids.shape[0]).bool()
+        tail = self.tokenizer.decode(input_ids[0, self.prompt_length:][-self.lookback:], skip_special_tokens=True)
+        if any(sequence in tail for sequence in self.stop_sequences):
+            stop[:] = True
+        return stop
+
+class BaseGenerator:
+    """
+    Interface shared by all response generators.
+
+    Providers implement ``generate``; prompt formatting and the medical
+    disclaimer are common so every backend answers from the same prompt.
+    """
     
     def generate(
         self,
         query: str,
         retrieved_documents: List[Dict[str, Any]],
         chat_history: Optional[List[Dict[str, str]]] = None,
-        user_profile: Optional[Dict[str, Any]] = None
+        user_profile: Optional[Dict[str, Any]] = None,
+        policy: Optional[GenerationPolicy] = None
     ) -> str:
-        """
-        Generate a response based on the query and retrieved documents.
-        
-        Args:
-            query: The user query
-            retrieved_documents: List of retrieved documents
-            chat_history: Optional list of previous chat messages
-            user_profile: Optional user profile information
-            
-        Returns:
-            str: The generated response
-        """
-        try:
-            # Prepare context from retrieved documents
-            context = self._prepare_context(retrieved_documents)
-            
-            # Format the prompt with query and context
-            prompt = self._format_prompt(query, context, chat_history, user_profile)
-            
-            # Generate response using the model
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                generated_ids = self.model.generate(
-                    inputs.input_ids,
-                    max_new_tokens=self.max_new_tokens,
-                    temperature=self.temperature,
-                    top_p=0.95,
-                    do_sample=True
-                )
-                
-            response = self.tokenizer.decode(generated_ids[0], skip_special_tokens=True)
-            
-            # Extract just the generated response (not the prompt)
-            response = response[len(prompt):].strip()
-            
-            # Add disclaimer if not already present
-            if "not a substitute for professional medical advice" not in response.lower():
-                response += "\n\nNote: This information is not a substitute for professional medical advice. Always consult with your healthcare provider."
-            
-            logger.info(f"Generated response for query: {query[:50]}...")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
+        """Generate a response, within the limits of ``policy`` when given."""
+        raise NotImplementedError
+    
+    def warm_up(self) -> None:
+        """Pay first-call costs before serving; nothing to do by default."""
+    
+    @staticmethod
+    def _apply_stop_sequences(response: str, stop_sequences: List[str]) -> str:
+        """Cut a response at the first stop sequence it contains."""
+        for stop in stop_sequences:
+            position = response.find(stop)
+            if position != -1:
+                response = response[:position]
+        return response.strip()
+    
+    @staticmethod
+    def _add_disclaimer(response: str) -> str:
+        """Append the medical disclaimer if the response lacks one."""
+        if "not a substitute for professional medical advice" not in response.lower():
+            response += f"\n\n{DISCLAIMER}"
+        return response
     
     def _prepare_context(self, retrieved_documents: List[Dict[str, Any]]) -> str:
         """
@@ -133,19 +224,23 @@ class ResponseGenerator:
         Args:
             query: The user query
             context: Context from retrieved documents
-            chat_history: Optional list of previous chat messages
+            chat_history: Optional list of previous chat messages, possibly
+                starting with a "summary" message of older turns
             user_profile: Optional user profile information
             
         Returns:
             str: The formatted prompt
         """
-        # Format chat history if provided
+        # Format chat history if provided; callers bound its size
         history_text = ""
         if chat_history:
-            for message in chat_history[-3:]:  # Include only the last 3 messages for context
+            for message in chat_history:
                 role = message.get("role", "")
                 content = message.get("content", "")
-                history_text += f"{role.capitalize()}: {content}\n"
+                if role == "summary":
+                    history_text += f"Summary of earlier conversation:\n{content}\n"
+                else:
+                    history_text += f"{role.capitalize()}: {content}\n"
         
         # Include relevant user profile info if available
         profile_text = ""
@@ -180,12 +275,228 @@ Base your responses on the provided context documents when available."""
         
         return prompt
 
+class ResponseGenerator(BaseGenerator):
+    """Generates responses with a local HuggingFace model based on retrieved documents."""
+    
+    def __init__(
+        self,
+        model_name: str = "google/flan-t5-large",  # Using a smaller model for demonstration
+        max_new_tokens: int = 512,
+        temperature: float = 0.7,
+        model_device: str = "cpu",  # Switch to "cuda" if GPU is available
+        shared_weights_dir: Optional[str] = None,
+        draft_model_name: Optional[str] = None,
+        num_draft_tokens: int = 5
+    ):
+        """
+        Initialize the response generator.
+        
+        Args:
+            model_name: HuggingFace model identifier
+            max_new_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature (higher = more random)
+            model_device: Device to run the model on ("cpu" or "cuda")
+            shared_weights_dir: Optional directory of exported memory-mapped weights
+                that worker processes share instead of loading private copies
+            draft_model_name: Optional small model of the same family that
+                proposes tokens for the main model to verify (speculative
+                decoding); the output distribution is unchanged
+            num_draft_tokens: Initial number of tokens proposed per step
+        """
+        import torch
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
+        from src.models.shared_weights import shared_weights_available, load_shared_model
+
+        logger.info(f"Initializing response generator with model: {model_name}")
+        try:
+            use_shared = shared_weights_available(shared_weights_dir)
+            source = shared_weights_dir if use_shared else model_name
+            self.tokenizer = AutoTokenizer.from_pretrained(source)
+            
+            # Encoder-decoder checkpoints such as flan-t5 need the seq2seq head
+            config = AutoConfig.from_pretrained(source)
+            model_class = AutoModelForSeq2SeqLM if config.is_encoder_decoder else AutoModelForCausalLM
+            if use_shared:
+                self.model = load_shared_model(model_class, shared_weights_dir)
+            else:
+                self.model = model_class.from_pretrained(model_name)
+                self.model.eval()
+            
+            # Move model to appropriate device
+            self.device = model_device if torch.cuda.is_available() and model_device == "cuda" else "cpu"
+            self.model.to(self.device)
+            
+            self.max_new_tokens = max_new_tokens
+            self.temperature = temperature
+            
+            self.draft_model = None
+            self.draft_tokenizer = None
+            if draft_model_name:
+                self._load_draft_model(draft_model_name, num_draft_tokens)
+            
+            logger.info(f"Response generator initialized on {self.device}")
+        except Exception as e:
+            logger.error(f"Error initializing response generator: {str(e)}")
+            raise
+    
+    def _load_draft_model(self, draft_model_name: str, num_draft_tokens: int) -> None:
+        """Load the draft model for speculative decoding; decoding stays standard if it fails."""
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
+
+        try:
+            config = AutoConfig.from_pretrained(draft_model_name)
+            if config.is_encoder_decoder != self.model.config.is_encoder_decoder:
+                raise ValueError("draft and main models must both be encoder-decoder or both decoder-only")
+            model_class = AutoModelForSeq2SeqLM if config.is_encoder_decoder else AutoModelForCausalLM
+            draft_model = model_class.from_pretrained(draft_model_name)
+            draft_model.eval()
+            draft_model.to(self.device)
+            draft_model.generation_config.num_assistant_tokens = num_draft_tokens
+            
+            # Drafts from a model with another vocabulary are re-tokenized
+            # for the main model (universal assisted decoding)
+            draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name)
+            if draft_tokenizer.get_vocab() != self.tokenizer.get_vocab():
+                self.draft_tokenizer = draft_tokenizer
+            
+            self.draft_model = draft_model
+            self._main_forwards = ForwardCounter(self.model)
+            self._draft_forwards = ForwardCounter(draft_model)
+            logger.info(f"Speculative decoding enabled with draft model: {draft_model_name}")
+        except Exception as e:
+            logger.warning(f"Speculative decoding disabled, draft model failed to load: {str(e)}")
+    
+    def _speculative_kwargs(self) -> Dict[str, Any]:
+        """Arguments routing ``generate`` through the draft model, if one is loaded."""
+        if self.draft_model is None:
+            return {}
+        kwargs = {"assistant_model": self.draft_model}
+        if self.draft_tokenizer is not None:
+            kwargs.update(tokenizer=self.tokenizer, assistant_tokenizer=self.draft_tokenizer)
+        return kwargs
+    
+    def warm_up(self) -> None:
+        """Run one tiny generation, through the draft model too, to pay first-call costs."""
+        import torch
+
+        inputs = self.tokenizer("warm-up", return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            self.model.generate(
+                inputs.input_ids,
+                attention_mask=inputs.attention_mask,
+                max_new_tokens=2,
+                do_sample=False,
+                **self._speculative_kwargs()
+            )
+    
+    def generate(
+        self,
+        query: str,
+        retrieved_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_profile: Optional[Dict[str, Any]] = None,
+        policy: Optional[GenerationPolicy] = None
+    ) -> str:
+        """
+        Generate a response based on the query and retrieved documents.
+        
+        Args:
+            query: The user query
+            retrieved_documents: List of retrieved documents
+            chat_history: Optional list of previous chat messages
+            user_profile: Optional user profile information
+            policy: Optional decoding limits for this request; the generator's
+                own settings are used without one
+            
+        Returns:
+            str: The generated response
+        """
+        import torch
+        from transformers import StoppingCriteriaList
+
+        try:
+            # Prepare context from retrieved documents
+            context = self._prepare_context(retrieved_documents)
+            
+            # Format the prompt with query and context
+            prompt = self._format_prompt(query, context, chat_history, user_profile)
+            
+            # Generate response using the model
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+            policy = policy or GenerationPolicy("default", self.max_new_tokens)
+            
+            generate_kwargs = {}
+            if policy.do_sample:
+                generate_kwargs.update(temperature=policy.temperature or self.temperature, top_p=0.95)
+            generate_kwargs.update(self._speculative_kwargs())
+            if self.draft_model is not None:
+                self._main_forwards.reset()
+                self._draft_forwards.reset()
+            
+            timer = GenerationTimer()
+            stopping_criteria = StoppingCriteriaList([timer])
+            # Decoder-only models continue the prompt, encoder-decoder outputs
+            # start after a single decoder start token
+            prompt_length = 1 if self.model.config.is_encoder_decoder else inputs.input_ids.shape[1]
+            if policy.stop_sequences:
+                stopping_criteria.append(StopSequenceStopper(self.tokenizer, prompt_length, policy.stop_sequences))
+            repetition = None
+            if policy.repetition_ngram:
+                repetition = RepetitionStopper(prompt_length, policy.repetition_ngram, policy.repetition_window)
+                stopping_criteria.append(repetition)
+            
+            timer.start()
+            with torch.no_grad():
+                generated_ids = self.model.generate(
+                    inputs.input_ids,
+                    attention_mask=inputs.attention_mask,
+                    max_new_tokens=policy.max_new_tokens,
+                    do_sample=policy.do_sample,
+                    stopping_criteria=stopping_criteria,
+                    **generate_kwargs
+                )
+            
+            # Decoder-only models echo the prompt, encoder-decoder models start
+            # with a single decoder start token instead
+            if self.model.config.is_encoder_decoder:
+                new_token_ids = generated_ids[0][1:]
+            else:
+                new_token_ids = generated_ids[0][inputs.input_ids.shape[1]:]
+            
+            record_generation(
+                timer.prefill_seconds, timer.decode_seconds, len(new_token_ids),
+                decoding="speculative" if self.draft_model is not None else "standard"
+            )
+            if self.draft_model is not None:
+                # Every verification step yields its accepted drafts plus one
+                # token from the main model
+                accepted = max(len(new_token_ids) - self._main_forwards.count, 0)
+                record_speculation(self._draft_forwards.count, accepted)
+                
+            # Extract just the generated response (not the prompt), without
+            # the repeated stretch or stop sequence that ended it
+            if repetition is not None and repetition.cut is not None:
+                new_token_ids = new_token_ids[:repetition.cut]
+            response = self.tokenizer.decode(new_token_ids, skip_special_tokens=True)
+            response = self._apply_stop_sequences(response, policy.stop_sequences)
+            
+            # Add disclaimer if not already present
+            response = self._add_disclaimer(response)
+            
+            logger.info("Generated %d tokens with policy %s for query: %.50s...", len(new_token_ids), policy.name, query)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
+
 def generate_response(
     user_message: str,
     retrieved_documents: List[Dict[str, Any]],
     chat_history: Optional[List[Dict[str, str]]] = None,
     user_profile: Optional[Dict[str, Any]] = None,
-    generator: Optional[ResponseGenerator] = None
+    generator: Optional[BaseGenerator] = None,
+    policy: Optional[GenerationPolicy] = None
 ) -> str:
     """
     Wrapper function to generate a response for a user message.
@@ -196,19 +507,23 @@ def generate_response(
         chat_history: Optional list of previous chat messages
         user_profile: Optional user profile information
         generator: Optional pre-initialized generator (for efficiency in repeated calls)
+        policy: Optional decoding limits chosen for this request
         
     Returns:
         str: The generated response
     """
     try:
         if not generator:
-            generator = ResponseGenerator()
+            # Fall back to the shared, warmed-up generator
+            from src.models.loader import get_model_registry
+            generator = get_model_registry().get_generator()
             
         return generator.generate(
             query=user_message,
             retrieved_documents=retrieved_documents,
             chat_history=chat_history,
-            user_profile=user_profile
+            user_profile=user_profile,
+            policy=policy
         )
     except Exception as e:
         logger.error(f"Error in generate_response: {str(e)}")
@@ -0,0 +1,130 @@
+"""
+Per-request decoding limits chosen from the query's intent and categories.
+
+Most of the generation latency on CPU is decode steps, and a one-line
+factual lookup needs a fraction of the 512 tokens an explanation may use.
+``GenerationPolicySelector`` maps what ``QueryProcessor`` detected about a
+query to a ``GenerationPolicy`` (token cap, greedy or sampled decoding, stop
+sequences and repetition-based early stopping) configured under
+``generation`` in ``config/app_config.yaml``.
+"""
+import re
+import logging
+from typing import List, Dict, Any, Optional
+
+from src.models.extractive_qa import is_factual_question
+
+logger = logging.getLogger(__name__)
+
+POLICY_FACTUAL = "factual"
+POLICY_ADVICE = "advice"
+POLICY_STANDARD = "standard"
+
+# Intents asking what to do rather than for a fact
+ADVICE_INTENTS = ("recommendation", "symptom_check")
+
+# Questions asking what the user should do, which _detect_intent reports as "question"
+ADVICE_QUESTION_PATTERN = re.compile(r"^(?:should i|do i need|can i|is it safe)\b")
+
+# Categories whose "what ..." questions need an explanation, not a lookup
+EXPLANATORY_CATEGORIES = ("lifestyle", "nutrition", "exercise", "prevention", "risk factor")
+
+# Built-in policies; the configuration overrides their fields
+DEFAULT_POLICIES = {
+    POLICY_FACTUAL: {"max_new_tokens": 96, "do_sample": False},
+    POLICY_ADVICE: {"max_new_tokens": 320},
+    POLICY_STANDARD: {"max_new_tokens": 512}
+}
+
+class GenerationPolicy:
+    """Decoding limits for one generation call."""
+
+    def __init__(
+        self,
+        name: str,
+        max_new_tokens: int = 512,
+        do_sample: bool = True,
+        temperature: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        repetition_ngram: int = 0,
+        repetition_window: int = 64
+    ):
+        """
+        Initialize a policy.
+
+        Args:
+            name: Policy name, used in logs and metrics
+            max_new_tokens: Maximum number of tokens to generate
+            do_sample: Sample (True) or decode greedily, which makes answers
+                deterministic and therefore shareable
+            temperature: Sampling temperature; the generator's own when None
+            stop_sequences: Strings that end generation; they are removed
+                from the response
+            repetition_ngram: Stop once the last this-many tokens repeat an
+                earlier stretch of the output (0 disables)
+            repetition_window: Recent tokens searched for a repeat
+        """
+        self.name = name
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.stop_sequences = list(stop_sequences or [])
+        self.repetition_ngram = repetition_ngram
+        self.repetition_window = repetition_window
+
+    def describe(self) -> Dict[str, Any]:
+        """Policy fields for logging."""
+        return {
+            "name": self.name,
+            "max_new_tokens": self.max_new_tokens,
+            "do_sample": self.do_sample,
+            "stop_sequences": len(self.stop_sequences),
+            "repetition_ngram": self.repetition_ngram
+        }
+
+class GenerationPolicySelector:
+    """Chooses the generation policy of a query from its intent and categories."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Build the configured policies.
+
+        Args:
+            settings: The ``generation`` configuration: ``policies`` (fields
+                per policy name), and ``stop_sequences`` and ``repetition``
+                applied to every policy
+        """
+        settings = settings or {}
+        repetition = settings.get("repetition", {})
+        configured = settings.get("policies", {})
+
+        self.policies: Dict[str, GenerationPolicy] = {}
+        for name in set(DEFAULT_POLICIES) | set(configured):
+            fields = {
+                "stop_sequences": settings.get("stop_sequences"),
+                "repetition_ngram": repetition.get("ngram_size", 0),
+                "repetition_window": repetition.get("window", 64)
+            }
+            fields.update(DEFAULT_POLICIES.get(name, {}))
+            fields.update(configured.get(name) or {})
+            self.policies[name] = GenerationPolicy(name, **fields)
+
+    def select(self, query: str, intent: str, categories: List[str]) -> GenerationPolicy:
+        """
+        Choose the policy for a query.
+
+        Args:
+            query: The cleaned query
+            intent: Intent from ``QueryProcessor._detect_intent``
+            categories: Categories from ``QueryProcessor._categorize_query``
+
+        Returns:
+            GenerationPolicy: The policy to generate with
+        """
+        if is_factual_question(query, intent) and not set(categories) & set(EXPLANATORY_CATEGORIES):
+            name = POLICY_FACTUAL
+        elif intent in ADVICE_INTENTS or ADVICE_QUESTION_PATTERN.search(query):
+            name = POLICY_ADVICE
+        else:
+            name = POLICY_STANDARD
+        return self.policies[name]
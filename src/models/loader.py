@@ -0,0 +1,252 @@
+"""
+Shared model loading with background warm-up and readiness tracking.
+
+Importing the API must stay fast, so models are never loaded at import time.
+The application starts a warm-up thread that loads the embedding model,
+retriever and generator and runs one small inference through each; endpoints
+that need the models check ``is_ready`` and return 503 until warm-up is done.
+"""
+import os
+import math
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Warm-up modes, selected by models.loading.warmup or the MODEL_WARMUP env var
+WARMUP_BACKGROUND = "background"  # load in a daemon thread at startup
+WARMUP_BLOCKING = "blocking"      # load before the app starts serving
+WARMUP_NONE = "none"              # load when first requested
+
+# Delay before retrying a failed load, doubled per consecutive failure
+RETRY_BACKOFF_SECONDS = 5
+MAX_RETRY_BACKOFF_SECONDS = 300
+
+class ModelsNotReadyError(RuntimeError):
+    """Raised when models are requested before warm-up has completed."""
+
+class ModelRegistry:
+    """Owns the process-wide model instances and their loading state."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize an empty registry.
+
+        Args:
+            config: Application configuration (``config/app_config.yaml``)
+        """
+        self.config = config or {}
+        self.embedding_model = None
+        self.retriever = None
+        self.generator = None
+        self.answerer = None
+
+        self.state = "cold"  # cold, loading, ready, failed
+        self.error = None
+        self.load_seconds = None
+        self.failures = 0
+        self._retry_at = 0.0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def warmup_mode(self) -> str:
+        """Configured warm-up mode, overridable with MODEL_WARMUP."""
+        loading = self.config.get("models", {}).get("loading", {})
+        return os.getenv("MODEL_WARMUP", loading.get("warmup", WARMUP_BACKGROUND))
+
+    @property
+    def shared_weights_dir(self) -> Optional[str]:
+        """Directory of memory-mapped weights exported by scripts/export_shared_weights.py."""
+        loading = self.config.get("models", {}).get("loading", {})
+        return os.getenv("SHARED_WEIGHTS_DIR", loading.get("shared_weights_dir"))
+
+    def start(self) -> None:
+        """Start loading models according to the configured warm-up mode."""
+        mode = self.warmup_mode
+        if mode == WARMUP_BACKGROUND:
+            self.start_warmup()
+        elif mode == WARMUP_BLOCKING:
+            self.load()
+        else:
+            logger.info("Model warm-up deferred; models load when first requested")
+
+    def start_warmup(self) -> bool:
+        """
+        Load models in a background daemon thread (idempotent).
+
+        After a failed load a new attempt starts once the retry backoff has
+        passed.
+
+        Returns:
+            bool: True if a loading attempt was started
+        """
+        with self._lock:
+            if self.state in ("loading", "ready") or self.retry_in() > 0:
+                return False
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self.load, name="model-warmup", daemon=True)
+            self._thread.start()
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until a failed load may be retried (0 when not failed)."""
+        if self.state != "failed":
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def load(self) -> None:
+        """Load and warm up all models in the calling thread."""
+        with self._lock:
+            if self.state in ("loading", "ready"):
+                already_loading = True
+            elif self.retry_in() > 0:
+                return
+            else:
+                already_loading = False
+                self.state = "loading"
+                self._ready.clear()
+
+        if already_loading:
+            self._ready.wait()
+            return
+
+        start = time.perf_counter()
+        try:
+            from src.models.retrieval import DocumentRetriever
+            from src.models.providers import create_generator, create_embedding_model
+
+            model_config = self.config.get("models", {})
+            weights_dir = self.shared_weights_dir
+            self.embedding_model = create_embedding_model(
+                model_config.get("embedding"),
+                shared_weights_dir=os.path.join(weights_dir, "embedding") if weights_dir else None
+            )
+            mmr = self.config.get("retrieval", {}).get("mmr", {})
+            priors = self.config.get("retrieval", {}).get("feedback_priors", {})
+            self.retriever = DocumentRetriever(
+                self.embedding_model,
+                mmr_lambda=mmr.get("lambda", 0.5) if mmr.get("enabled") else None,
+                mmr_fetch_k=mmr.get("fetch_k", 20),
+                prior_weight=priors.get("weight", 0.1) if priors.get("enabled") else None
+            )
+            speculative = model_config.get("speculative_decoding", {})
+            self.generator = create_generator(
+                model_config.get("llm"),
+                shared_weights_dir=os.path.join(weights_dir, "generator") if weights_dir else None,
+                draft_model_name=speculative.get("draft_model") if speculative.get("enabled") else None,
+                num_draft_tokens=speculative.get("num_draft_tokens", 5)
+            )
+            self._load_answerer()
+            self._warm_up()
+
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.failures = 0
+            self.error = None
+            self.state = "ready"
+            logger.info(f"Models loaded and warmed up in {self.load_seconds}s")
+        except Exception as e:
+            self.error = str(e)
+            self.failures += 1
+            backoff = min(RETRY_BACKOFF_SECONDS * 2 ** (self.failures - 1), MAX_RETRY_BACKOFF_SECONDS)
+            self._retry_at = time.monotonic() + backoff
+            self.state = "failed"
+            logger.error(f"Model warm-up failed (attempt {self.failures}, retrying in {backoff}s): {str(e)}",
+                         exc_info=True)
+        finally:
+            self._ready.set()
+
+    def _load_answerer(self) -> None:
+        """Load the extractive QA fast path if enabled; answers fall back to the generator without it."""
+        settings = self.config.get("models", {}).get("extractive_qa", {})
+        if not settings.get("enabled"):
+            return
+        try:
+            from src.models.extractive_qa import ExtractiveAnswerer
+
+            self.answerer = ExtractiveAnswerer(
+                **{key: value for key, value in settings.items() if key != "enabled"}
+            )
+        except Exception as e:
+            logger.warning(f"Extractive QA disabled, model failed to load: {str(e)}")
+
+    def _warm_up(self) -> None:
+        """Run one small inference through each model to pay first-call costs."""
+        try:
+            self.embedding_model.embed_text("warm-up query")
+            self.generator.warm_up()
+            if self.answerer is not None:
+                self.answerer.answer("warm-up query", [{"content": "warm-up document"}])
+        except Exception as e:
+            logger.warning(f"Warm-up inference failed: {str(e)}")
+
+    def is_ready(self) -> bool:
+        """Whether all models are loaded and warmed up."""
+        return self.state == "ready"
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until warm-up finishes.
+
+        Args:
+            timeout: Maximum time to wait in seconds (None waits forever)
+
+        Returns:
+            bool: True if the models are ready
+        """
+        self._ready.wait(timeout)
+        return self.is_ready()
+
+    def status(self) -> Dict[str, Any]:
+        """Loading state for health and readiness endpoints."""
+        status = {"state": self.state, "load_seconds": self.load_seconds}
+        if self.error:
+            status["error"] = self.error
+        if self.state == "failed":
+            status["failures"] = self.failures
+            status["retry_in"] = math.ceil(self.retry_in())
+        return status
+
+    def _require_ready(self) -> None:
+        """Load on demand if warm-up never started or is due a retry, else wait for it."""
+        if self.state in ("cold", "failed"):
+            self.load()
+        elif self.state == "loading":
+            self._ready.wait()
+
+        if not self.is_ready():
+            raise ModelsNotReadyError(f"Models are not available (state: {self.state})")
+
+    def get_retriever(self):
+        """Return the shared DocumentRetriever, loading it if necessary."""
+        self._require_ready()
+        return self.retriever
+
+    def get_generator(self):
+        """Return the shared response generator, loading it if necessary."""
+        self._require_ready()
+        return self.generator
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry(config: Optional[Dict[str, Any]] = None) -> ModelRegistry:
+    """
+    Return the process-wide model registry, creating it on first call.
+
+    Args:
+        config: Application configuration used when the registry is created
+
+    Returns:
+        ModelRegistry: The shared registry
+    """
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(config)
+        return _registry
@@ -0,0 +1,118 @@
+"""
+Dimensionality reduction for stored and query embeddings.
+
+A PCA or OPQ projection is trained on the corpus embeddings when the index
+is built and saved next to it. ``EmbeddingModel`` applies the same projection
+to every embedding it produces, so queries and stored chunks always live in
+the same reduced space.
+"""
+import os
+import logging
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECTION_PATH = "data/embeddings/projection.vt"
+
+PROJECTION_NONE = "none"
+PROJECTION_PCA = "pca"
+PROJECTION_OPQ = "opq"
+
+# OPQ trains a product quantizer with 256 centroids per sub-space
+OPQ_MIN_TRAINING_POINTS = 9984
+
+def train_projection(vectors: np.ndarray, method: str, dimensions: int) -> Optional[Any]:
+    """
+    Train a projection on a sample of corpus embeddings.
+
+    Args:
+        vectors: 2D array of training vectors
+        method: "pca", "opq" or "none"
+        dimensions: Output dimension
+
+    Returns:
+        faiss.VectorTransform, or None when method is "none"
+    """
+    import faiss
+
+    if method == PROJECTION_NONE:
+        return None
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    input_dimensions = vectors.shape[1]
+    if dimensions > input_dimensions:
+        raise ValueError(f"Cannot project {input_dimensions}-d vectors up to {dimensions} dimensions")
+
+    if method == PROJECTION_PCA:
+        if len(vectors) < input_dimensions:
+            logger.warning(f"Training PCA on {len(vectors)} vectors; at least {input_dimensions} are recommended")
+        transform = faiss.PCAMatrix(input_dimensions, dimensions)
+    elif method == PROJECTION_OPQ:
+        if len(vectors) < OPQ_MIN_TRAINING_POINTS:
+            logger.warning(f"Training OPQ on {len(vectors)} vectors; at least {OPQ_MIN_TRAINING_POINTS} are recommended")
+        # Sub-spaces of 8 dimensions, as for an 8-byte-per-sub-space PQ code
+        subspaces = max(1, dimensions // 8)
+        while dimensions % subspaces:
+            subspaces -= 1
+        transform = faiss.OPQMatrix(input_dimensions, subspaces, dimensions)
+    else:
+        raise ValueError(f"Unknown projection method: {method}")
+
+    transform.train(vectors)
+    logger.info(f"Trained {method} projection {input_dimensions} -> {dimensions} on {len(vectors)} vectors")
+    return transform
+
+def apply_projection(transform: Optional[Any], vectors: np.ndarray) -> np.ndarray:
+    """
+    Project vectors, or return them unchanged when there is no projection.
+
+    Args:
+        transform: faiss.VectorTransform or None
+        vectors: 2D array of vectors
+
+    Returns:
+        numpy.ndarray: float32 projected vectors
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if transform is None:
+        return vectors
+    return transform.apply(vectors)
+
+def save_projection(transform: Optional[Any], path: str = DEFAULT_PROJECTION_PATH) -> None:
+    """
+    Save a trained projection, or remove a stale one when there is none.
+
+    Args:
+        transform: faiss.VectorTransform or None
+        path: Output file path
+    """
+    import faiss
+
+    if transform is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = f"{path}.tmp"
+    faiss.write_VectorTransform(transform, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved projection to {path}")
+
+def load_projection(path: Optional[str] = DEFAULT_PROJECTION_PATH) -> Optional[Any]:
+    """
+    Load a projection saved by ``save_projection``.
+
+    Args:
+        path: Projection file path
+
+    Returns:
+        faiss.VectorTransform, or None if the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    import faiss
+
+    transform = faiss.read_VectorTransform(path)
+    logger.info(f"Loaded projection {transform.d_in} -> {transform.d_out} from {path}")
+    return transform
@@ -0,0 +1,439 @@
+"""
+Model backends selected by configuration.
+
+``models.llm.provider`` and ``models.embedding.provider`` in
+``config/app_config.yaml`` (or the LLM_PROVIDER and EMBEDDING_PROVIDER
+environment variables) choose between:
+
+- ``huggingface``: local transformers models (``ResponseGenerator`` and
+  ``EmbeddingModel``)
+- ``mock``: deterministic stand-ins with a fixed latency, seeded text and
+  hash-based embeddings, so the serving stack can be load-tested without
+  loading any model
+- ``openai``: any server speaking the OpenAI chat completions and embeddings
+  APIs, called over pooled keep-alive connections
+
+All generators share the ``BaseGenerator`` prompt, and all embedding models
+expose ``embed_text`` and ``embed_batch``.
+"""
+import os
+import re
+import time
+import zlib
+import random
+import asyncio
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.models.generation import BaseGenerator
+from src.models.generation_policy import GenerationPolicy
+from src.models.projection import DEFAULT_PROJECTION_PATH, load_projection, apply_projection
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_HUGGINGFACE = "huggingface"
+PROVIDER_MOCK = "mock"
+PROVIDER_OPENAI = "openai"
+
+# Accepted spellings of the provider names
+PROVIDER_ALIASES = {
+    "hf": PROVIDER_HUGGINGFACE,
+    "transformers": PROVIDER_HUGGINGFACE,
+    "openai_compatible": PROVIDER_OPENAI
+}
+
+ERROR_RESPONSE = "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
+
+def _resolve_provider(configured: Optional[str], env_var: str) -> str:
+    """Provider name from the environment or configuration, defaulting to HuggingFace."""
+    provider = (os.getenv(env_var) or configured or PROVIDER_HUGGINGFACE).lower()
+    return PROVIDER_ALIASES.get(provider, provider)
+
+def _stable_hash(text: str) -> int:
+    """Hash that, unlike ``hash``, is the same in every process."""
+    return zlib.crc32(text.encode("utf-8"))
+
+class MockGenerator(BaseGenerator):
+    """Deterministic generator: seeded text from the retrieved documents after a fixed delay."""
+
+    TEMPLATES = (
+        "Based on the available guidance, {fact}",
+        "According to {source}, {fact}",
+        "Here is what the retrieved information says: {fact}",
+        "In summary, {fact}"
+    )
+
+    def __init__(self, latency_ms: float = 50.0, seed: int = 0, max_tokens: int = 512):
+        """
+        Initialize the mock generator.
+
+        Args:
+            latency_ms: Time every call takes, standing in for model latency
+            seed: Seed mixed into the per-query text choice
+            max_tokens: Maximum words in a response
+        """
+        self.latency = latency_ms / 1000.0
+        self.seed = seed
+        self.max_tokens = max_tokens
+
+    def generate(
+        self,
+        query: str,
+        retrieved_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_profile: Optional[Dict[str, Any]] = None,
+        policy: Optional[GenerationPolicy] = None
+    ) -> str:
+        """Return the same response for the same query and documents."""
+        start = time.perf_counter()
+        # Build the real prompt so its cost is part of the measurement
+        prompt = self._format_prompt(query, self._prepare_context(retrieved_documents), chat_history, user_profile)
+
+        rng = random.Random(self.seed ^ _stable_hash(prompt))
+        if retrieved_documents:
+            document = retrieved_documents[rng.randrange(len(retrieved_documents))]
+            fact = re.split(r"(?<=[.!?])\s+", document.get("content", "").strip(), maxsplit=1)[0]
+            source = document.get("metadata", {}).get("source", "the retrieved sources")
+        else:
+            fact = "I could not find documents about this topic, so please ask your healthcare provider."
+            source = "general guidance"
+        words = rng.choice(self.TEMPLATES).format(fact=fact or "no details were found.", source=source).split()
+        response = " ".join(words[:policy.max_new_tokens if policy else self.max_tokens])
+
+        remaining = self.latency - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+        return self._add_disclaimer(response)
+
+class MockEmbeddingModel:
+    """Deterministic bag-of-words embeddings built by feature hashing."""
+
+    def __init__(
+        self,
+        dimensions: int = 384,
+        latency_ms: float = 0.0,
+        projection_path: Optional[str] = DEFAULT_PROJECTION_PATH
+    ):
+        """
+        Initialize the mock embedding model.
+
+        Texts sharing words get similar vectors, so retrieval over an index
+        built with this model returns plausible results.
+
+        Args:
+            dimensions: Embedding dimension
+            latency_ms: Time every call takes
+            projection_path: Projection trained when the index was built
+        """
+        self.dimensions = dimensions
+        self.latency = latency_ms / 1000.0
+        self.projection = load_projection(projection_path)
+
+    @property
+    def dimension(self) -> int:
+        """Dimension of the returned vectors."""
+        return self.projection.d_out if self.projection is not None else self.dimensions
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Embed one text as a unit vector."""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a 2D array of unit vectors."""
+        if not texts:
+            return np.array([])
+        if self.latency:
+            time.sleep(self.latency)
+
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                hashed = _stable_hash(token)
+                rows.append(row)
+                columns.append(hashed % self.dimensions)
+                signs.append(1.0 if hashed & 0x80000000 else -1.0)
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return apply_projection(self.projection, vectors / np.where(norms > 0, norms, 1.0))
+
+class OpenAICompatibleClient:
+    """Pooled HTTP connections to an OpenAI-compatible server."""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000/v1",
+        api_key_env: str = "OPENAI_API_KEY",
+        pool_size: int = 32,
+        timeout: float = 60.0,
+        max_retries: int = 2
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API root, e.g. "https://api.openai.com/v1"
+            api_key_env: Environment variable holding the API key
+            pool_size: Keep-alive connections kept open per client
+            timeout: Seconds to wait for a response
+            max_retries: Retries of requests that failed to connect or were
+                rejected with 429/503
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        api_key = os.getenv(api_key_env, "")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+        # One session is shared by all request threads
+        retry = Retry(
+            total=max_retries, read=0, status_forcelist=(429, 503),
+            allowed_methods=frozenset({"POST"}), backoff_factor=0.5, respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+
+        self._async_clients: Dict[int, Any] = {}
+        self._async_lock = threading.Lock()
+
+    def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a JSON request.
+
+        Raises:
+            requests.RequestException: If the request fails or is rejected
+        """
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def apost(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a JSON request from async code (e.g. the FastAPI app).
+
+        Raises:
+            httpx.HTTPError: If the request fails or is rejected
+        """
+        response = await self._async_client().post(f"{self.base_url}{path}", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _async_client(self):
+        """Connection pool for the running event loop; async clients cannot be shared across loops."""
+        import httpx
+
+        loop_id = id(asyncio.get_running_loop())
+        with self._async_lock:
+            client = self._async_clients.get(loop_id)
+            if client is None:
+                client = self._async_clients[loop_id] = httpx.AsyncClient(
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+                )
+            return client
+
+class OpenAICompatibleGenerator(BaseGenerator):
+    """Generates responses with an OpenAI-compatible chat completions API."""
+
+    def __init__(
+        self,
+        model_name: str,
+        temperature: float = 0.7,
+        max_tokens: int = 512,
+        client: Optional[OpenAICompatibleClient] = None
+    ):
+        """
+        Initialize the generator.
+
+        Args:
+            model_name: Model served by the API
+            temperature: Sampling temperature
+            max_tokens: Maximum number of tokens to generate
+            client: Connection pool to the server
+        """
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.client = client or OpenAICompatibleClient()
+
+    def _request(self, query, retrieved_documents, chat_history, user_profile, policy) -> Dict[str, Any]:
+        prompt = self._format_prompt(query, self._prepare_context(retrieved_documents), chat_history, user_profile)
+        request = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if policy is not None:
+            request["max_tokens"] = policy.max_new_tokens
+            # Temperature 0 is the API's greedy decoding
+            request["temperature"] = (policy.temperature or self.temperature) if policy.do_sample else 0.0
+            if policy.stop_sequences:
+                request["stop"] = policy.stop_sequences[:4]  # the API accepts up to four
+        return request
+
+    def generate(
+        self,
+        query: str,
+        retrieved_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_profile: Optional[Dict[str, Any]] = None,
+        policy: Optional[GenerationPolicy] = None
+    ) -> str:
+        """Generate a response; failures return an apology like the local generator."""
+        try:
+            result = self.client.post("/chat/completions", self._request(query, retrieved_documents, chat_history, user_profile, policy))
+            return self._add_disclaimer(result["choices"][0]["message"]["content"].strip())
+        except Exception as e:
+            logger.error(f"Error generating response with {self.client.base_url}: {str(e)}")
+            return ERROR_RESPONSE
+
+    async def agenerate(
+        self,
+        query: str,
+        retrieved_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_profile: Optional[Dict[str, Any]] = None,
+        policy: Optional[GenerationPolicy] = None
+    ) -> str:
+        """Async variant of ``generate`` for event-loop servers."""
+        try:
+            result = await self.client.apost("/chat/completions", self._request(query, retrieved_documents, chat_history, user_profile, policy))
+            return self._add_disclaimer(result["choices"][0]["message"]["content"].strip())
+        except Exception as e:
+            logger.error(f"Error generating response with {self.client.base_url}: {str(e)}")
+            return ERROR_RESPONSE
+
+class OpenAICompatibleEmbeddingModel:
+    """Embeds texts with an OpenAI-compatible embeddings API."""
+
+    def __init__(
+        self,
+        model_name: str,
+        dimensions: Optional[int] = None,
+        client: Optional[OpenAICompatibleClient] = None,
+        projection_path: Optional[str] = DEFAULT_PROJECTION_PATH
+    ):
+        """
+        Initialize the embedding model.
+
+        Args:
+            model_name: Model served by the API
+            dimensions: Requested output dimension, for models that support it
+            client: Connection pool to the server
+            projection_path: Projection trained when the index was built
+        """
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.client = client or OpenAICompatibleClient()
+        self.projection = load_projection(projection_path)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimension of the returned vectors, or None until the server is asked."""
+        return self.projection.d_out if self.projection is not None else self.dimensions
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Embed one text."""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in one request as a 2D array."""
+        if not texts:
+            return np.array([])
+        payload = {"model": self.model_name, "input": texts}
+        if self.dimensions:
+            payload["dimensions"] = self.dimensions
+        data = sorted(self.client.post("/embeddings", payload)["data"], key=lambda item: item["index"])
+        return apply_projection(self.projection, np.asarray([item["embedding"] for item in data], dtype=np.float32))
+
+def create_generator(settings: Optional[Dict[str, Any]] = None, **huggingface_kwargs) -> BaseGenerator:
+    """
+    Create the response generator configured by ``models.llm``.
+
+    Args:
+        settings: The ``models.llm`` configuration
+        **huggingface_kwargs: Extra ``ResponseGenerator`` arguments (shared
+            weights, draft model) used by the HuggingFace provider
+
+    Returns:
+        BaseGenerator: The generator
+    """
+    settings = settings or {}
+    provider = _resolve_provider(settings.get("provider"), "LLM_PROVIDER")
+    logger.info(f"Using {provider} LLM provider")
+
+    if provider == PROVIDER_MOCK:
+        return MockGenerator(max_tokens=settings.get("max_tokens", 512), **settings.get("mock", {}))
+    if provider == PROVIDER_OPENAI:
+        return OpenAICompatibleGenerator(
+            settings["model_name"],
+            temperature=settings.get("temperature", 0.7),
+            max_tokens=settings.get("max_tokens", 512),
+            client=OpenAICompatibleClient(**settings.get("openai", {}))
+        )
+    if provider == PROVIDER_HUGGINGFACE:
+        from src.models.generation import ResponseGenerator
+
+        return ResponseGenerator(
+            model_name=settings.get("model_name", "google/flan-t5-large"),
+            max_new_tokens=settings.get("max_tokens", 512),
+            temperature=settings.get("temperature", 0.7),
+            **huggingface_kwargs
+        )
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+def create_embedding_model(
+    settings: Optional[Dict[str, Any]] = None,
+    projection_path: Optional[str] = DEFAULT_PROJECTION_PATH,
+    **huggingface_kwargs
+):
+    """
+    Create the embedding model configured by ``models.embedding``.
+
+    Args:
+        settings: The ``models.embedding`` configuration
+        projection_path: Projection applied to every output so queries match
+            the index; None returns unprojected vectors (for building it)
+        **huggingface_kwargs: Extra ``EmbeddingModel`` arguments (shared
+            weights) used by the HuggingFace provider
+
+    Returns:
+        An embedding model with ``embed_text`` and ``embed_batch``
+    """
+    settings = settings or {}
+    provider = _resolve_provider(settings.get("provider"), "EMBEDDING_PROVIDER")
+    logger.info(f"Using {provider} embedding provider")
+
+    if provider == PROVIDER_MOCK:
+        return MockEmbeddingModel(
+            dimensions=settings.get("dimensions", 384),
+            projection_path=projection_path,
+            **settings.get("mock", {})
+        )
+    if provider == PROVIDER_OPENAI:
+        return OpenAICompatibleEmbeddingModel(
+            settings["model_name"],
+            dimensions=settings.get("dimensions"),
+            client=OpenAICompatibleClient(**settings.get("openai", {})),
+            projection_path=projection_path
+        )
+    if provider == PROVIDER_HUGGINGFACE:
+        from src.models.embedding import EmbeddingModel
+
+        if settings.get("model_name"):
+            huggingface_kwargs["model_name"] = settings["model_name"]
+        return EmbeddingModel(projection_path=projection_path, **huggingface_kwargs)
+    raise ValueError(f"Unknown embedding provider: {provider}")
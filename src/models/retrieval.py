@@ -1,14 +1,16 @@
-
-
-
+"""
+Document retrieval over a FAISS index of embedded document chunks.
+"""
 import os
 import logging
 import numpy as np
-import faiss
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 
-from src.models.embedding import EmbeddingModel
+from src.models.embedding import EmbeddingModel, open_embeddings
+from src.monitoring.metrics import track_stage
+from src.pipeline.reranking import mmr_select
+from src.pipeline.feedback_loop import DEFAULT_PRIORS_PATH, load_priors, apply_priors
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,14 @@ class DocumentRetriever:
         embedding_model: EmbeddingModel,
         index_path: str = "data/embeddings/faiss_index.index",
         id_map_path: str = "data/embeddings/id_map.json",
-        content_path: str = "data/processed/document_content.json"
+        content_path: str = "data/processed/document_content.json",
+        shard_dir: str = "data/embeddings/shards",
+        metadata_path: str = "data/embeddings/metadata.npz",
+        embeddings_path: str = "data/embeddings/embeddings.emb",
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 20,
+        priors_path: str = DEFAULT_PRIORS_PATH,
+        prior_weight: Optional[float] = None
     ):
         """
         Initialize the document retriever.
@@ -30,12 +39,30 @@ class DocumentRetriever:
             index_path: Path to the FAISS index file
             id_map_path: Path to the document ID mapping file
             content_path: Path to the document content file
+            shard_dir: Directory of a sharded index; used instead of
+                ``index_path`` when it holds a manifest
+            metadata_path: Path to the chunk metadata used for filtered search
+            embeddings_path: Path to the memory-mapped embedding file, used as
+                a vector cache when re-ranking
+            mmr_lambda: Enables maximal-marginal-relevance re-ranking when set
+                (1.0 = relevance only, 0.0 = diversity only)
+            mmr_fetch_k: Candidates fetched from the index for re-ranking
+            priors_path: Path to per-chunk feedback priors
+            prior_weight: Enables re-scoring candidates with their feedback
+                priors when set (0.1 = up to 10% closer for the best-rated)
         """
+        import faiss
+        from src.db.vector_db import ShardedIndex, has_sharded_index
+        from src.db.metadata_store import MetadataStore
+
         self.embedding_model = embedding_model
         
         # Load the FAISS index
         try:
-            if os.path.exists(index_path):
+            if has_sharded_index(shard_dir):
+                # Searched like a single index, fanned out across shards
+                self.index = ShardedIndex.load(shard_dir)
+            elif os.path.exists(index_path):
                 self.index = faiss.read_index(index_path)
                 logger.info(f"Loaded FAISS index from {index_path}")
             else:
@@ -45,6 +72,15 @@ class DocumentRetriever:
             logger.error(f"Error loading FAISS index: {str(e)}")
             self.index = None
         
+        # A query embedding of another size fails every search, so refuse to start
+        index_dimension = getattr(self.index, "d", getattr(self.index, "dimension", None))
+        query_dimension = getattr(embedding_model, "dimension", None)
+        if index_dimension is not None and query_dimension is not None and index_dimension != query_dimension:
+            raise ValueError(
+                f"Embedding model returns {query_dimension}-d vectors but the index holds {index_dimension}-d "
+                f"vectors; rebuild the index with the configured embedding provider"
+            )
+        
         # Load the document ID mapping
         try:
             if os.path.exists(id_map_path):
@@ -70,11 +106,48 @@ class DocumentRetriever:
         except Exception as e:
             logger.error(f"Error loading document content: {str(e)}")
             self.document_content = {}
+        
+        # Load the metadata used for filtered search
+        try:
+            if metadata_path and os.path.exists(metadata_path):
+                self.metadata = MetadataStore.load(metadata_path)
+            else:
+                self.metadata = None
+        except Exception as e:
+            logger.error(f"Error loading metadata store: {str(e)}")
+            self.metadata = None
+        
+        # Map the stored embeddings so re-ranking can read candidate vectors
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_k = mmr_fetch_k
+        self.vectors = None
+        try:
+            if mmr_lambda is not None and embeddings_path and os.path.exists(embeddings_path):
+                embeddings = open_embeddings(embeddings_path)
+                if embeddings.ids != self.id_map:
+                    logger.warning("Embedding file does not match the ID map; re-ranking will use the index")
+                elif embeddings.dimension != index_dimension:
+                    # The index holds projected vectors; re-rank in the same space
+                    logger.info("Embedding file is not projected; re-ranking will use the index")
+                else:
+                    self.vectors = embeddings.vectors
+        except Exception as e:
+            logger.error(f"Error loading embedding file: {str(e)}")
+        
+        # Load the feedback priors, aligned with the index rows
+        self.prior_weight = prior_weight
+        self.priors = None
+        try:
+            if prior_weight:
+                self.priors = load_priors(priors_path, self.id_map)
+        except Exception as e:
+            logger.error(f"Error loading chunk priors: {str(e)}")
     
     def retrieve_documents(
         self, 
         query: str, 
-        top_k: int = 3
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve the most relevant documents for a query.
@@ -82,6 +155,8 @@ class DocumentRetriever:
         Args:
             query: The user query
             top_k: Number of top documents to retrieve
+            filters: Optional metadata filter with "sources", "date_from",
+                "date_to" and/or "categories"; applied inside the index search
             
         Returns:
             List of retrieved documents with their content and metadata
@@ -92,43 +167,101 @@ class DocumentRetriever:
         
         try:
             # Embed the query
-            query_embedding = self.embedding_model.embed_text(query)
+            with track_stage("retrieve_embed"):
+                query_embedding = self.embedding_model.embed_text(query)
             
             # Reshape for FAISS
             query_embedding_reshaped = np.reshape(query_embedding, (1, -1)).astype('float32')
             
+            # Restrict the search to chunks matching the filter
+            params = None
+            available = len(self.id_map)
+            if filters:
+                if self.metadata is None:
+                    logger.warning("Metadata filters requested but no metadata store is loaded")
+                else:
+                    mask = self.metadata.select(filters)
+                    available = int(mask.sum())
+                    if available == 0:
+                        return []
+                    params = self.metadata.search_parameters(mask)
+            k = min(top_k, available)
+            
+            # Fetch a larger candidate pool when re-ranking
+            reranking = self.mmr_lambda is not None or self.priors is not None
+            fetch_k = min(max(self.mmr_fetch_k, k), available) if reranking else k
+            
             # Search the index
-            distances, indices = self.index.search(query_embedding_reshaped, min(top_k, len(self.id_map)))
+            with track_stage("retrieve_search"):
+                distances, indices = self.index.search(query_embedding_reshaped, fetch_k, params=params)
+            
+            # FAISS can return -1 if fewer than fetch_k items are found
+            hits = [
+                (int(idx), float(distances[0][i])) for i, idx in enumerate(indices[0])
+                if 0 <= idx < len(self.id_map)
+            ]
+            if len(hits) > k:
+                with track_stage("retrieve_rerank"):
+                    hits = self._rerank(query_embedding_reshaped[0], hits, k)
             
             # Get the documents
             retrieved_docs = []
-            for i, idx in enumerate(indices[0]):
-                if idx < 0 or idx >= len(self.id_map):  # FAISS can return -1 if fewer than top_k items are found
-                    continue
-                    
+            for idx, distance in hits:
                 doc_id = self.id_map[idx]
                 if doc_id in self.document_content:
                     retrieved_docs.append({
                         "id": doc_id,
                         "content": self.document_content[doc_id].get("content", ""),
                         "metadata": {
+                            "id": doc_id,
                             "source": self.document_content[doc_id].get("source", ""),
-                            "score": float(distances[0][i]),
+                            "score": distance,
                             "date": self.document_content[doc_id].get("date", "")
                         }
                     })
             
-            logger.info(f"Retrieved {len(retrieved_docs)} documents for query: {query[:50]}...")
+            logger.info("Retrieved %d documents for query: %.50s...", len(retrieved_docs), query)
             return retrieved_docs
             
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             return []
+    
+    def _rerank(self, query_embedding: np.ndarray, hits: List[Tuple[int, float]], k: int) -> List[Tuple[int, float]]:
+        """
+        Pick the top-k from the candidate pool using feedback priors and/or MMR.
+        
+        Args:
+            query_embedding: Query vector
+            hits: Candidate (row id, distance) pairs, best first
+            k: Number of documents to keep
+            
+        Returns:
+            The selected (row id, distance) pairs
+        """
+        rows = np.array([idx for idx, _ in hits], dtype="int64")
+        if self.mmr_lambda is None:
+            # Priors only: re-sort by the adjusted distances
+            adjusted = apply_priors(rows, [distance for _, distance in hits], self.priors, self.prior_weight)
+            return [hits[i] for i in np.argsort(adjusted, kind="stable")[:k]]
+        
+        try:
+            if self.vectors is not None:
+                vectors = np.asarray(self.vectors[rows], dtype="float32")
+            else:
+                vectors = self.index.reconstruct_batch(rows)
+        except Exception as e:
+            logger.warning(f"Candidate vectors unavailable, keeping relevance order: {str(e)}")
+            return hits[:k]
+        
+        boost = self.prior_weight * self.priors[rows] if self.priors is not None else None
+        return [hits[i] for i in mmr_select(query_embedding, vectors, k, self.mmr_lambda, boost=boost)]
 
 def retrieve_documents(
     query: str, 
     top_k: int = 3,
-    retriever: Optional[DocumentRetriever] = None
+    retriever: Optional[DocumentRetriever] = None,
+    filters: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Wrapper function to retrieve documents for a query.
@@ -137,18 +270,18 @@ def retrieve_documents(
         query: The user query
         top_k: Number of top documents to retrieve
         retriever: Optional pre-initialized retriever (for efficiency in repeated calls)
+        filters: Optional metadata filter (see DocumentRetriever.retrieve_documents)
         
     Returns:
         List of retrieved documents
     """
     try:
         if not retriever:
-            # Initialize embedding model and retriever
-            from backend.models.embedding import EmbeddingModel
-            embedding_model = EmbeddingModel()
-            retriever = DocumentRetriever(embedding_model)
+            # Fall back to the shared, warmed-up retriever
+            from src.models.loader import get_model_registry
+            retriever = get_model_registry().get_retriever()
         
-        return retriever.retrieve_documents(query, top_k)
+        return retriever.retrieve_documents(query, top_k, filters=filters)
     except Exception as e:
         logger.error(f"Error in retrieve_documents: {str(e)}")
         return []
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Memory-mapped model weights shared between worker processes.
+
+``from_pretrained`` copies every weight into memory owned by the process, so
+each gunicorn/uvicorn worker holds a private copy of every model. Here weights
+are exported once to a ``model.safetensors`` file and loaded with
+``safetensors.torch.load_file``, which maps the file instead of reading it.
+The mapped tensors are assigned directly as module parameters
+(``load_state_dict(assign=True)``), so all workers on a host read the same
+page-cache pages and the weights count once towards host memory.
+
+Shared weights are read-only; nothing in inference writes to them.
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_FILENAME = "model.safetensors"
+
+def shared_weights_available(model_dir: Optional[str]) -> bool:
+    """
+    Check whether a directory holds exported shared weights.
+
+    Args:
+        model_dir: Directory produced by ``export_shared_weights``
+
+    Returns:
+        bool: True if the weights file and config are present
+    """
+    return bool(model_dir) and os.path.exists(os.path.join(model_dir, WEIGHTS_FILENAME)) \
+        and os.path.exists(os.path.join(model_dir, "config.json"))
+
+def export_shared_weights(model: Any, tokenizer: Any, model_dir: str) -> str:
+    """
+    Export a model's config, tokenizer and weights for memory-mapped loading.
+
+    Args:
+        model: A loaded transformers model
+        tokenizer: The model's tokenizer
+        model_dir: Output directory
+
+    Returns:
+        str: Path of the written weights file
+    """
+    from safetensors.torch import save_file
+
+    os.makedirs(model_dir, exist_ok=True)
+    model.config.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+
+    # Tied weights (e.g. input embeddings and LM head) are stored once; the
+    # other names are recorded as aliases and re-linked when loading
+    tensors: Dict[str, Any] = {}
+    aliases: Dict[str, str] = {}
+    stored_by_pointer: Dict[int, str] = {}
+    for name, tensor in model.state_dict().items():
+        pointer = tensor.data_ptr()
+        if pointer in stored_by_pointer and tensors[stored_by_pointer[pointer]].shape == tensor.shape:
+            aliases[name] = stored_by_pointer[pointer]
+            continue
+        stored_by_pointer[pointer] = name
+        tensors[name] = tensor.detach().contiguous().clone()
+
+    weights_path = os.path.join(model_dir, WEIGHTS_FILENAME)
+    save_file(tensors, weights_path, metadata={"aliases": json.dumps(aliases)})
+    logger.info(f"Exported {len(tensors)} tensors ({len(aliases)} tied aliases) to {weights_path}")
+    return weights_path
+
+def load_shared_model(model_class: Any, model_dir: str) -> Any:
+    """
+    Build a model whose parameters are backed by a memory-mapped weights file.
+
+    Args:
+        model_class: transformers auto class, e.g. ``AutoModel``
+        model_dir: Directory produced by ``export_shared_weights``
+
+    Returns:
+        The model in eval mode
+    """
+    from safetensors import safe_open
+    from safetensors.torch import load_file
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(model_dir)
+    model = model_class.from_config(config)
+
+    weights_path = os.path.join(model_dir, WEIGHTS_FILENAME)
+    with safe_open(weights_path, framework="pt") as f:
+        aliases = json.loads((f.metadata() or {}).get("aliases", "{}"))
+
+    # Replace the freshly initialised parameters with views of the mapped file
+    state_dict = load_file(weights_path)
+    for alias, name in aliases.items():
+        state_dict[alias] = state_dict[name]
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+
+    if result.unexpected_keys:
+        logger.warning(f"Unexpected keys in shared weights: {result.unexpected_keys[:5]}")
+    if result.missing_keys:
+        # Missing weights would silently keep their random initialisation
+        raise ValueError(f"Shared weights in {model_dir} are missing parameters: {result.missing_keys[:5]}")
+
+    model.eval()
+    logger.info(f"Loaded memory-mapped weights from {model_dir}")
+    return model
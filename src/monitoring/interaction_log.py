@@ -0,0 +1,271 @@
+"""
+Append-only columnar log of chat interactions for offline analysis.
+
+The request path only puts a dict on a queue. A background thread collects
+records into batches, writes each batch as a row group to a compressed
+Parquet file, and rotates files by row count, size and age. Files are laid
+out in ``date=YYYY-MM-DD`` directories and carry an ``.inprogress`` suffix
+until they are closed, so readers only ever see complete files and can skip
+whole days by path.
+"""
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = "data/interactions"
+IN_PROGRESS_SUFFIX = ".inprogress"
+
+def interaction_schema():
+    """Arrow schema of the interaction log."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("timestamp", pa.timestamp("ms")),
+        ("request_id", pa.string()),
+        ("user_id", pa.string()),
+        ("status", pa.int16()),
+        ("query", pa.string()),
+        ("processed_query", pa.string()),
+        ("categories", pa.list_(pa.string())),
+        ("filters", pa.string()),
+        ("retrieved_ids", pa.list_(pa.string())),
+        ("retrieved_scores", pa.list_(pa.float32())),
+        ("stage_ms", pa.map_(pa.string(), pa.float32())),
+        ("total_ms", pa.float32()),
+        ("response_chars", pa.int32()),
+        ("input_valid", pa.bool_()),
+        ("output_valid", pa.bool_()),
+        ("validation_reason", pa.string())
+    ])
+
+class InteractionLogger:
+    """Batches interaction records into rotated, compressed Parquet files."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIRECTORY,
+        batch_size: int = 500,
+        flush_interval: float = 10.0,
+        max_rows_per_file: int = 200000,
+        max_bytes_per_file: int = 64 * 1024 * 1024,
+        max_file_age: float = 3600.0,
+        compression: str = "zstd",
+        max_queue: int = 10000
+    ):
+        """
+        Initialize the logger and start its writer thread.
+
+        Args:
+            directory: Root directory of the log
+            batch_size: Records per row group
+            flush_interval: Seconds after which a partial batch is written
+            max_rows_per_file: Rows after which a file is closed
+            max_bytes_per_file: Size after which a file is closed
+            max_file_age: Seconds after which a file is closed
+            compression: Parquet compression codec
+            max_queue: Records held in memory before new ones are dropped
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows_per_file = max_rows_per_file
+        self.max_bytes_per_file = max_bytes_per_file
+        self.max_file_age = max_file_age
+        self.compression = compression
+        self.schema = interaction_schema()
+        self.dropped = 0
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._path: Optional[str] = None
+        self._file_rows = 0
+        self._file_opened = 0.0
+        self._file_day: Optional[str] = None
+        self._sequence = 0
+        self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict[str, Any]) -> None:
+        """
+        Queue one interaction record; never blocks the caller.
+
+        Args:
+            record: Interaction fields (see ``interaction_schema``); missing
+                fields are stored as nulls
+        """
+        record.setdefault("timestamp", datetime.now())
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("Interaction log queue is full; %d records dropped so far", self.dropped)
+
+    def close(self) -> None:
+        """Write all queued records and close the current file."""
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+
+    def _run(self) -> None:
+        """Writer thread: collect batches and write them until closed."""
+        from src.pipeline.query_processing import QueryProcessor
+
+        processor = QueryProcessor()
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+
+        while not stopping:
+            try:
+                record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if record is None:
+                    stopping = True
+                else:
+                    batch.append(self._prepare(record, processor))
+            except queue.Empty:
+                pass
+
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+                # Close idle files once they are too old
+                if self._writer is not None and time.time() - self._file_opened >= self.max_file_age:
+                    self._close_file()
+
+        self._close_file()
+
+    @staticmethod
+    def _prepare(record: Dict[str, Any], processor: Any) -> Dict[str, Any]:
+        """Derive the analysis-only fields off the request path."""
+        query = record.get("query") or ""
+        if "processed_query" not in record:
+            record["processed_query"] = processor._clean_query(query)
+        if "categories" not in record:
+            record["categories"] = processor._categorize_query(record["processed_query"])
+        if isinstance(record.get("filters"), dict):
+            record["filters"] = json.dumps(record["filters"], sort_keys=True)
+        if isinstance(record.get("stage_ms"), dict):
+            record["stage_ms"] = list(record["stage_ms"].items())
+        return record
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Write one row group, opening or rotating the file as needed."""
+        import pyarrow as pa
+
+        try:
+            columns = {name: [record.get(name) for record in batch] for name in self.schema.names}
+            table = pa.Table.from_pydict(columns, schema=self.schema)
+
+            day = datetime.now().date().isoformat()
+            if self._writer is not None and day != self._file_day:
+                self._close_file()
+            if self._writer is None:
+                self._open_file(day)
+
+            self._writer.write_table(table)
+            self._file_rows += len(batch)
+            if (self._file_rows >= self.max_rows_per_file
+                    or os.path.getsize(self._path + IN_PROGRESS_SUFFIX) >= self.max_bytes_per_file
+                    or time.time() - self._file_opened >= self.max_file_age):
+                self._close_file()
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} interaction records: {str(e)}")
+
+    def _open_file(self, day: str) -> None:
+        import pyarrow.parquet as pq
+
+        partition = os.path.join(self.directory, f"date={day}")
+        os.makedirs(partition, exist_ok=True)
+        self._sequence += 1
+        # Several worker processes may log into the same partition
+        name = f"interactions-{datetime.now().strftime('%H%M%S')}-{os.getpid()}-{self._sequence:04d}.parquet"
+        self._path = os.path.join(partition, name)
+        self._writer = pq.ParquetWriter(self._path + IN_PROGRESS_SUFFIX, self.schema, compression=self.compression)
+        self._file_rows = 0
+        self._file_opened = time.time()
+        self._file_day = day
+
+    def _close_file(self) -> None:
+        """Finish the current file and make it visible to readers."""
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+            os.replace(self._path + IN_PROGRESS_SUFFIX, self._path)
+            logger.info("Closed interaction log %s with %d rows", self._path, self._file_rows)
+        except Exception as e:
+            logger.error(f"Error closing interaction log {self._path}: {str(e)}")
+        self._writer = None
+
+def read_interactions(
+    directory: str = DEFAULT_DIRECTORY,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    columns: Optional[List[str]] = None
+):
+    """
+    Load logged interactions into a pandas DataFrame.
+
+    Only files in the requested date partitions are opened, and only the
+    requested columns are decoded.
+
+    Args:
+        directory: Root directory of the log
+        date_from: First day to include (YYYY-MM-DD)
+        date_to: Last day to include (YYYY-MM-DD)
+        columns: Columns to load (defaults to all)
+
+    Returns:
+        pandas.DataFrame: The interactions
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(
+        directory,
+        format="parquet",
+        partitioning=ds.partitioning(flavor="hive"),
+        exclude_invalid_files=False,
+        ignore_prefixes=[".", "_"]
+    )
+    files = [path for path in dataset.files if not path.endswith(IN_PROGRESS_SUFFIX)]
+    dataset = ds.dataset(files, format="parquet", partitioning=ds.partitioning(flavor="hive"), partition_base_dir=directory)
+
+    expression = None
+    if date_from:
+        expression = ds.field("date") >= date_from
+    if date_to:
+        upper = ds.field("date") <= date_to
+        expression = upper if expression is None else expression & upper
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+_interaction_logger = None
+_interaction_logger_lock = threading.Lock()
+
+def get_interaction_logger(settings: Optional[Dict[str, Any]] = None) -> InteractionLogger:
+    """
+    Return the process-wide interaction logger.
+
+    Args:
+        settings: Optional keyword arguments for ``InteractionLogger``, used
+            when the logger is first created
+
+    Returns:
+        InteractionLogger: The shared logger
+    """
+    global _interaction_logger
+
+    with _interaction_logger_lock:
+        if _interaction_logger is None:
+            _interaction_logger = InteractionLogger(**(settings or {}))
+            atexit.register(_interaction_logger.close)
+        return _interaction_logger
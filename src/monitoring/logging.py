@@ -1,50 +1,220 @@
 # logging setup
 """
 Logging configuration for the application.
+
+Handlers declared in ``config/logging.yaml`` are not called from the request
+thread. Instead each configured logger gets a ``QueueHandler`` that enqueues
+records, and a single ``QueueListener`` thread writes them to the real console
+and file handlers. Records carry the id of the request that produced them and
+can be written as structured JSON.
 """
 import os
+import copy
+import json
+import atexit
+import queue
 import logging
 import logging.config
+import logging.handlers
+import contextvars
+import uuid
 import yaml
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Request id of the request being served by the current thread or task
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "queue_route"
+}
+
+_listener = None
+
+def set_request_id(request_id: Optional[str] = None) -> str:
+    """
+    Set the request id for log records emitted by the current context.
+
+    Args:
+        request_id (str): Incoming request id, or None to generate one
+
+    Returns:
+        str: The request id in effect
+    """
+    request_id = request_id or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    return request_id
+
+def get_request_id() -> str:
+    """Return the request id of the current context ("-" outside requests)."""
+    return request_id_var.get()
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to records that do not have one yet."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName
+        }
+
+        # Keep structured fields passed through ``extra=``
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _RoutingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that tags records with the handler set they belong to."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, route: str):
+        super().__init__(log_queue)
+        self.route = route
+        self.addFilter(RequestIdFilter())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now, while args and exc_info are
+        # still valid, but leave layout to the formatters on the listener side
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.queue_route = self.route
+        return record
+
+class _RoutingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that dispatches each record to its logger's handlers."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, routes: Dict[str, List[logging.Handler]]):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.routes = routes
+
+    def handle(self, record: logging.LogRecord) -> None:
+        record = self.prepare(record)
+        for handler in self.routes.get(getattr(record, "queue_route", ""), []):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+def _install_queue_handlers(logger_names: List[Optional[str]]) -> None:
+    """
+    Move the handlers of the given loggers behind a background queue listener.
+
+    Args:
+        logger_names (list): Logger names to rewire (None for the root logger)
+    """
+    global _listener
+
+    log_queue = queue.SimpleQueue()
+    routes: Dict[str, List[logging.Handler]] = {}
+    queue_handlers: Dict[str, logging.Handler] = {}
+
+    for name in logger_names:
+        target = logging.getLogger(name)
+        handlers = list(target.handlers)
+        if not handlers:
+            continue
+
+        # Loggers sharing the same handlers share one queue handler and route
+        route = ",".join(str(id(handler)) for handler in handlers)
+        routes[route] = handlers
+        if route not in queue_handlers:
+            queue_handlers[route] = _RoutingQueueHandler(log_queue, route)
+            # Do not enqueue records that none of the handlers would emit
+            queue_handlers[route].setLevel(min(handler.level for handler in handlers))
+
+        for handler in handlers:
+            target.removeHandler(handler)
+        target.addHandler(queue_handlers[route])
+
+    _listener = _RoutingQueueListener(log_queue, routes)
+    _listener.start()
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background logging thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
 
 def setup_logging(config_path='config/logging.yaml', default_level=logging.INFO):
     """
     Set up logging configuration
-    
+
     Args:
         config_path (str): Path to the logging configuration file
         default_level (int): Default logging level
     """
+    # Drain and stop any listener from a previous call before reconfiguring
+    stop_logging()
+
     # Create logs directory if it doesn't exist
     if not os.path.exists('logs'):
         os.makedirs('logs')
-    
+
     # Generate log filename with timestamp
     timestamp = datetime.now().strftime('%Y%m%d')
     log_filename = f'logs/app_{timestamp}.log'
-    
+
     if os.path.exists(config_path):
         with open(config_path, 'r') as f:
             try:
                 config = yaml.safe_load(f)
+                use_queue = config.pop('queue_handlers', True)
+
                 # Update log filename in configuration
                 for handler in config.get('handlers', {}).values():
                     if 'filename' in handler:
-                        handler['filename'] = log_filename
-                
+                        handler['filename'] = handler['filename'].replace('{date}', timestamp)
+
                 logging.config.dictConfig(config)
+
+                if use_queue:
+                    _install_queue_handlers([None] + list(config.get('loggers', {}).keys()))
                 return
             except Exception as e:
                 print(f"Error in logging configuration: {e}")
                 print("Using default logging configuration")
-    
+
     # Default configuration if file not found or error occurred
     logging.basicConfig(
         level=default_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
         handlers=[
             logging.FileHandler(log_filename),
             logging.StreamHandler()
         ]
-    )
\ No newline at end of file
+    )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(RequestIdFilter())
+    _install_queue_handlers([None])
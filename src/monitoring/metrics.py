@@ -1 +1,679 @@
 # metrics collection
+"""
+Metrics collection for the chatbot pipeline.
+
+Stage latencies are recorded into fixed-bucket histograms, exported in the
+Prometheus text exposition format for scraping, and into a bounded window of
+recent samples that is summarised as JSON percentiles for the dashboard.
+
+Each process records into its own registry. When the API is served by several
+worker processes (see gunicorn.conf.py), ``enable_multiprocess`` makes every
+worker write snapshots of its series to a shared directory, and both exports
+merge the snapshots of all workers, so a scrape that lands on any worker sees
+the whole server.
+"""
+import os
+import glob
+import json
+import atexit
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "healthbridge"
+
+# Latency buckets in seconds, spanning cheap regex checks to slow CPU decoding
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Throughput buckets in generated tokens per second
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Buckets for ratios such as the draft token acceptance rate
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# Number of recent samples kept per series for percentile summaries
+SAMPLE_WINDOW = 2048
+
+# Shared snapshot directory of a multi-process server
+MULTIPROCESS_DIR_ENV = "METRICS_MULTIPROC_DIR"
+
+# Seconds between snapshots written by each worker
+SNAPSHOT_INTERVAL = 5.0
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Compute a percentile with linear interpolation.
+
+    Args:
+        sorted_values: Values sorted in ascending order
+        q: Percentile in the range [0, 100]
+
+    Returns:
+        float: The interpolated percentile, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+
+    rank = (len(sorted_values) - 1) * q / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = rank - lower
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction)
+
+
+class Histogram:
+    """A thread-safe cumulative histogram with a window of recent samples."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = SAMPLE_WINDOW):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Sorted upper bounds of the histogram buckets
+            window: Number of recent samples kept for percentile summaries
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._bucket_counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Record a single observation.
+
+        Args:
+            value: The observed value
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self._bucket_counts):
+                self._bucket_counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._recent.append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Take a consistent copy of the histogram state.
+
+        Returns:
+            Dict with cumulative bucket counts, count, sum and recent samples
+        """
+        with self._lock:
+            bucket_counts = list(self._bucket_counts)
+            count = self._count
+            total = self._sum
+            recent = list(self._recent)
+
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+
+        return {
+            "buckets": cumulative,
+            "count": count,
+            "sum": total,
+            "recent": recent
+        }
+
+    def export_state(self) -> Dict[str, Any]:
+        """Raw state for merging across processes."""
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "bucket_counts": list(self._bucket_counts),
+                "count": self._count,
+                "sum": self._sum,
+                "recent": list(self._recent)
+            }
+
+    def merge_state(self, state: Dict[str, Any]) -> None:
+        """
+        Add the state exported by a histogram with the same buckets.
+
+        Args:
+            state: Output of ``export_state``
+        """
+        with self._lock:
+            for index, bucket_count in enumerate(state["bucket_counts"][:len(self._bucket_counts)]):
+                self._bucket_counts[index] += bucket_count
+            self._count += state["count"]
+            self._sum += state["sum"]
+            if len(self._recent) + len(state["recent"]) > self._recent.maxlen:
+                self._recent = deque(self._recent, maxlen=len(self._recent) + len(state["recent"]))
+            self._recent.extend(state["recent"])
+
+
+class Counter:
+    """A thread-safe monotonically increasing counter."""
+
+    def __init__(self):
+        """Initialize the counter at zero."""
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increment the counter.
+
+        Args:
+            amount: Amount to add (must be non-negative)
+        """
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Current counter value."""
+        with self._lock:
+            return self._value
+
+
+class MetricsRegistry:
+    """Holds named, labelled metric series and renders them for export."""
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        """
+        Initialize an empty registry.
+
+        Args:
+            prefix: Prefix applied to every exported metric name
+        """
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], Counter]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drop all series, e.g. those a forked worker inherited from its parent."""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self.started_at = time.time()
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Export all series as JSON-serialisable data.
+
+        Returns:
+            Dict with the start time, help texts, counters and histograms
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            help_texts = dict(self._help)
+
+        return {
+            "started_at": self.started_at,
+            "help": help_texts,
+            "counters": {
+                name: [[list(key), counter.value] for key, counter in series.items()]
+                for name, series in counters.items()
+            },
+            "histograms": {
+                name: [[list(key), histogram.export_state()] for key, histogram in series.items()]
+                for name, series in histograms.items()
+            }
+        }
+
+    @classmethod
+    def merged(cls, states: List[Dict[str, Any]], prefix: str = METRIC_PREFIX) -> "MetricsRegistry":
+        """
+        Build a registry holding the sum of exported registry states.
+
+        Args:
+            states: Outputs of ``export_state``, one per process
+            prefix: Prefix applied to every exported metric name
+
+        Returns:
+            MetricsRegistry: Counters and histograms summed across the states
+        """
+        merged = cls(prefix)
+        if states:
+            merged.started_at = min(state["started_at"] for state in states)
+        for state in states:
+            merged._help.update(state["help"])
+            for name, series in state["counters"].items():
+                for key, value in series:
+                    merged.counter(name, labels=dict(key)).inc(value)
+            for name, series in state["histograms"].items():
+                for key, histogram_state in series:
+                    histogram = merged.histogram(name, labels=dict(key), buckets=tuple(histogram_state["buckets"]))
+                    histogram.merge_state(histogram_state)
+        return merged
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """
+        Get or create a histogram series.
+
+        Args:
+            name: Metric name (without prefix)
+            description: Help text for the metric family
+            labels: Optional label values identifying the series
+            buckets: Bucket bounds used when the series is first created
+
+        Returns:
+            Histogram: The histogram series
+        """
+        key = tuple(sorted((labels or {}).items()))
+        family = self._histograms.get(name)
+        if family is not None and key in family:
+            return family[key]
+
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            if key not in family:
+                family[key] = Histogram(buckets)
+                if description:
+                    self._help[name] = description
+            return family[key]
+
+    def counter(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None
+    ) -> Counter:
+        """
+        Get or create a counter series.
+
+        Args:
+            name: Metric name (without prefix)
+            description: Help text for the metric family
+            labels: Optional label values identifying the series
+
+        Returns:
+            Counter: The counter series
+        """
+        key = tuple(sorted((labels or {}).items()))
+        family = self._counters.get(name)
+        if family is not None and key in family:
+            return family[key]
+
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            if key not in family:
+                family[key] = Counter()
+                if description:
+                    self._help[name] = description
+            return family[key]
+
+    def render_prometheus(self) -> str:
+        """
+        Render all series in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text
+        """
+        lines = []
+
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        for name, series in sorted(counters.items()):
+            full_name = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} counter")
+            for key, counter in sorted(series.items()):
+                lines.append(f"{full_name}{_format_labels(key)} {counter.value}")
+
+        for name, series in sorted(histograms.items()):
+            full_name = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} histogram")
+            for key, histogram in sorted(series.items()):
+                snapshot = histogram.snapshot()
+                for bound, cumulative in snapshot["buckets"]:
+                    bucket_labels = key + (("le", _format_bound(bound)),)
+                    lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                inf_labels = key + (("le", "+Inf"),)
+                lines.append(f"{full_name}_bucket{_format_labels(inf_labels)} {snapshot['count']}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {snapshot['sum']}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {snapshot['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarise all series as JSON-serialisable percentiles and totals.
+
+        Returns:
+            Dict keyed by metric name, then by label string
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        result: Dict[str, Any] = {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "counters": {},
+            "histograms": {}
+        }
+
+        for name, series in counters.items():
+            result["counters"][name] = {
+                _label_string(key): counter.value for key, counter in series.items()
+            }
+
+        for name, series in histograms.items():
+            family = {}
+            for key, histogram in series.items():
+                snapshot = histogram.snapshot()
+                recent = sorted(snapshot["recent"])
+                family[_label_string(key)] = {
+                    "count": snapshot["count"],
+                    "sum": round(snapshot["sum"], 6),
+                    "mean": round(snapshot["sum"] / snapshot["count"], 6) if snapshot["count"] else 0.0,
+                    "p50": round(percentile(recent, 50), 6),
+                    "p95": round(percentile(recent, 95), 6),
+                    "p99": round(percentile(recent, 99), 6)
+                }
+            result["histograms"][name] = family
+
+        return result
+
+
+def _format_bound(bound: float) -> str:
+    """Format a bucket bound the way Prometheus clients do."""
+    return repr(float(bound))
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the exposition format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+    """Format a label tuple as {name="value",...}."""
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in key) + "}"
+
+
+def _label_string(key: Tuple[Tuple[str, str], ...]) -> str:
+    """Format a label tuple as a compact JSON key."""
+    if not key:
+        return "_"
+    return ",".join(f"{name}={value}" for name, value in key)
+
+
+# Process-wide registry used by the API and pipeline components
+registry = MetricsRegistry()
+
+STAGE_LATENCY = "stage_duration_seconds"
+GENERATION_TOKENS_PER_SECOND = "generation_tokens_per_second"
+GENERATED_TOKENS = "generated_tokens_total"
+REQUESTS = "requests_total"
+COALESCED_REQUESTS = "coalesced_requests_total"
+GENERATION_POLICIES = "generation_policy_total"
+DRAFT_TOKENS = "draft_tokens_total"
+ACCEPTED_DRAFT_TOKENS = "accepted_draft_tokens_total"
+DRAFT_ACCEPTANCE_RATE = "draft_acceptance_rate"
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record the duration of a pipeline stage.
+
+    Args:
+        stage: Stage name, e.g. "retrieve_documents"
+        seconds: Duration in seconds
+    """
+    registry.histogram(
+        STAGE_LATENCY,
+        "Duration of chat pipeline stages in seconds",
+        labels={"stage": stage}
+    ).observe(seconds)
+
+
+@contextmanager
+def track_stage(stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """
+    Time a block of code as a pipeline stage.
+
+    Args:
+        stage: Stage name recorded as the "stage" label
+        timings: Optional per-request dict that receives the duration in milliseconds
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_stage(stage, elapsed)
+        if timings is not None:
+            timings[stage] = round(elapsed * 1000.0, 3)
+
+
+def record_generation(
+    prefill_seconds: float,
+    decode_seconds: float,
+    new_tokens: int,
+    decoding: str = "standard"
+) -> None:
+    """
+    Record the prefill/decode split and throughput of one generation call.
+
+    Args:
+        prefill_seconds: Time until the first new token was produced
+        decode_seconds: Time spent producing the remaining tokens
+        new_tokens: Number of newly generated tokens
+        decoding: "standard" or "speculative", recorded as the throughput label
+    """
+    observe_stage("generate_prefill", prefill_seconds)
+    observe_stage("generate_decode", decode_seconds)
+    registry.counter(GENERATED_TOKENS, "Total number of generated tokens").inc(new_tokens)
+
+    # The first token is produced by the prefill pass, the rest by decode steps
+    decode_tokens = max(new_tokens - 1, 0)
+    if decode_seconds > 0 and decode_tokens:
+        registry.histogram(
+            GENERATION_TOKENS_PER_SECOND,
+            "Decode throughput in generated tokens per second",
+            labels={"decoding": decoding},
+            buckets=THROUGHPUT_BUCKETS
+        ).observe(decode_tokens / decode_seconds)
+
+
+def record_speculation(draft_tokens: int, accepted_tokens: int) -> None:
+    """
+    Record how many draft tokens one speculative generation call accepted.
+
+    Args:
+        draft_tokens: Tokens proposed by the draft model
+        accepted_tokens: Proposed tokens the main model kept
+    """
+    registry.counter(DRAFT_TOKENS, "Total number of tokens proposed by the draft model").inc(draft_tokens)
+    registry.counter(ACCEPTED_DRAFT_TOKENS, "Total number of draft tokens accepted by the main model").inc(accepted_tokens)
+    if draft_tokens:
+        registry.histogram(
+            DRAFT_ACCEPTANCE_RATE,
+            "Fraction of draft tokens accepted per generation call",
+            buckets=RATIO_BUCKETS
+        ).observe(min(accepted_tokens / draft_tokens, 1.0))
+
+
+def count_request(endpoint: str, status: int) -> None:
+    """
+    Count a served request by endpoint and HTTP status code.
+
+    Args:
+        endpoint: Endpoint name
+        status: HTTP status code returned
+    """
+    registry.counter(
+        REQUESTS,
+        "Number of API requests served",
+        labels={"endpoint": endpoint, "status": str(status)}
+    ).inc()
+
+
+def count_coalesced(endpoint: str) -> None:
+    """
+    Count a request answered by sharing another in-flight request's result.
+
+    Args:
+        endpoint: Endpoint name
+    """
+    registry.counter(
+        COALESCED_REQUESTS,
+        "Number of requests that shared an identical in-flight request's result",
+        labels={"endpoint": endpoint}
+    ).inc()
+
+
+def count_generation_policy(policy: str) -> None:
+    """
+    Count a generation call by the policy chosen for it.
+
+    Args:
+        policy: Policy name
+    """
+    registry.counter(
+        GENERATION_POLICIES,
+        "Number of generation calls per generation policy",
+        labels={"policy": policy}
+    ).inc()
+
+
+_multiprocess_dir = None
+_snapshot_thread = None
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    """Snapshot file of one worker process."""
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _write_snapshot() -> None:
+    """Write this process's series to its snapshot file, replacing it atomically."""
+    path = _snapshot_path(_multiprocess_dir, os.getpid())
+    tmp_path = f"{path}.tmp"
+    try:
+        with _snapshot_lock:
+            with open(tmp_path, "w") as f:
+                json.dump(registry.export_state(), f)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Error writing metrics snapshot {path}: {str(e)}")
+
+
+def _snapshot_loop(interval: float) -> None:
+    """Write snapshots periodically for as long as the process runs."""
+    while True:
+        time.sleep(interval)
+        _write_snapshot()
+
+
+def enable_multiprocess(directory: Optional[str] = None, interval: float = SNAPSHOT_INTERVAL) -> bool:
+    """
+    Share this process's metrics with the other workers of the server.
+
+    Call once in every worker after it is forked (gunicorn ``post_fork``).
+    Series inherited from the parent are dropped, since every worker would
+    otherwise report them again.
+
+    Args:
+        directory: Snapshot directory shared by the workers; defaults to the
+            METRICS_MULTIPROC_DIR environment variable
+        interval: Seconds between snapshots
+
+    Returns:
+        bool: True if multi-process export is enabled
+    """
+    global _multiprocess_dir, _snapshot_thread
+
+    directory = directory or os.getenv(MULTIPROCESS_DIR_ENV)
+    if not directory:
+        return False
+    os.makedirs(directory, exist_ok=True)
+
+    registry.clear()
+    _multiprocess_dir = directory
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, args=(interval,), name="metrics-snapshot", daemon=True)
+    _snapshot_thread.start()
+    atexit.register(_write_snapshot)
+    logger.info(f"Sharing metrics through {directory}")
+    return True
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None) -> None:
+    """
+    Keep an exited worker's totals but drop its recent samples from percentiles.
+
+    Call from the gunicorn ``child_exit`` hook. Counters and histogram buckets
+    stay, so exported totals never decrease when a worker is replaced.
+
+    Args:
+        pid: Process id of the exited worker
+        directory: Snapshot directory; defaults to METRICS_MULTIPROC_DIR
+    """
+    directory = directory or os.getenv(MULTIPROCESS_DIR_ENV)
+    if not directory:
+        return
+    path = _snapshot_path(directory, pid)
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        for series in state["histograms"].values():
+            for _, histogram_state in series:
+                histogram_state["recent"] = []
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not retire metrics snapshot {path}: {str(e)}")
+
+
+def _collect() -> MetricsRegistry:
+    """The registry to export: this process's, or the merge of all workers'."""
+    if _multiprocess_dir is None:
+        return registry
+
+    _write_snapshot()
+    states = []
+    for path in glob.glob(_snapshot_path(_multiprocess_dir, "*")):
+        try:
+            with open(path) as f:
+                states.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics snapshot {path}: {str(e)}")
+    return MetricsRegistry.merged(states, registry.prefix)
+
+
+def render_prometheus() -> str:
+    """Render the server's metrics in the Prometheus text format."""
+    return _collect().render_prometheus()
+
+
+def get_metrics_summary() -> Dict[str, Any]:
+    """Summarise the server's metrics as JSON-serialisable data."""
+    return _collect().summary()
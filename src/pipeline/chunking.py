@@ -0,0 +1,470 @@
+"""
+Token-aware, streaming document chunking.
+
+Documents are read as a stream of blocks (paragraphs and headings; PDFs page
+by page), split into sentences, and packed into chunks measured in tokens of
+the embedding model's tokenizer. Chunk sizes are capped below PubMedBERT's
+512-token limit so nothing is silently truncated at embedding time. A chunk
+never crosses a section heading and records the section title and page range
+it came from.
+
+Chunks are written as JSON lines (one chunk object per line), which cannot
+collide with document text the way a plain-text separator can.
+"""
+import os
+import re
+import json
+import math
+import logging
+from typing import Iterator, Iterable, List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKENIZER = "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract-fulltext"
+MODEL_MAX_TOKENS = 512  # Includes the [CLS] and [SEP] special tokens
+SPECIAL_TOKENS = 2
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 32
+
+# Paragraphs longer than this are handed on before a blank line is seen, so a
+# file without paragraph breaks is still processed in bounded memory
+MAX_BLOCK_CHARS = 4000
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+
+SENTENCE_BOUNDARY = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]]))\s+(?=["(\[]?[A-Z0-9])')
+ABBREVIATIONS = {
+    "dr", "mr", "mrs", "ms", "prof", "st", "vs", "etc", "e.g", "i.e", "fig",
+    "no", "approx", "dept", "inc", "jan", "feb", "mar", "apr", "jun", "jul",
+    "aug", "sep", "sept", "oct", "nov", "dec"
+}
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.+)$')
+NUMBERED_HEADING = re.compile(r'^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^.!?:;]*$')
+UPPERCASE_HEADING = re.compile(r'^[A-Z][A-Z0-9 ,&/()\'-]{2,}$')
+PAGE_NUMBER = re.compile(r'^(?:\d{1,4}|[ivxlc]{1,6})$', re.IGNORECASE)
+WORD_PIECES = re.compile(r'\w+|[^\w\s]')
+
+class TokenCounter:
+    """
+    Counts tokens with the embedding model's tokenizer.
+
+    Without a tokenizer, counts are estimated conservatively (at least as many
+    tokens as WordPiece produces for ordinary English and medical text), so
+    chunks stay within the budget either way.
+    """
+
+    def __init__(self, tokenizer: Any = None):
+        """
+        Initialize the counter.
+
+        Args:
+            tokenizer: A HuggingFace tokenizer, or None to estimate counts
+        """
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def from_pretrained(cls, model_name: str = DEFAULT_TOKENIZER) -> "TokenCounter":
+        """
+        Create a counter from a pretrained tokenizer, falling back to estimates.
+
+        Args:
+            model_name: HuggingFace model identifier or local directory
+
+        Returns:
+            TokenCounter: The counter
+        """
+        try:
+            from transformers import AutoTokenizer
+            return cls(AutoTokenizer.from_pretrained(model_name))
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {model_name}, estimating token counts: {str(e)}")
+            return cls()
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count tokens (excluding special tokens) for several texts.
+
+        Args:
+            texts: Texts to measure
+
+        Returns:
+            List of token counts, one per text
+        """
+        if not texts:
+            return []
+        if self.tokenizer is not None:
+            encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+            return [len(ids) for ids in encoded]
+        return [
+            sum(max(1, math.ceil(len(piece) / 4)) for piece in WORD_PIECES.findall(text))
+            for text in texts
+        ]
+
+    def count(self, text: str) -> int:
+        """Count tokens (excluding special tokens) in one text."""
+        return self.count_batch([text])[0]
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation.
+
+    Args:
+        text: Paragraph text
+
+    Returns:
+        List of sentences
+    """
+    sentences = []
+    for piece in SENTENCE_BOUNDARY.split(text.strip()):
+        piece = piece.strip()
+        if not piece:
+            continue
+        # Re-join splits made after abbreviations such as "Dr." or "e.g."
+        if sentences:
+            last_word = sentences[-1].rsplit(None, 1)[-1].rstrip(".").lower()
+            if last_word in ABBREVIATIONS:
+                sentences[-1] = f"{sentences[-1]} {piece}"
+                continue
+        sentences.append(piece)
+    return sentences
+
+def _heading_text(line: str) -> Optional[str]:
+    """Return the heading title if a line looks like a section heading."""
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1).strip()
+    if len(line) > 80 or len(line.split()) > 12:
+        return None
+    if UPPERCASE_HEADING.match(line):
+        return line
+    if NUMBERED_HEADING.match(line):
+        # Numbered titles are title case; numbered list items are sentences
+        words = [word for word in line.split()[1:] if len(word) > 3]
+        if words and sum(word[0].isupper() for word in words) >= 0.6 * len(words):
+            return line
+    return None
+
+def _iter_text_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page, line) pairs from a text file; form feeds start a new page."""
+    page = 1
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parts = line.split("\f")
+            for i, part in enumerate(parts):
+                if i:
+                    page += 1
+                yield page, part
+
+def _iter_pdf_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page, line) pairs from a PDF, extracting one page at a time."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Chunking PDF files requires the pypdf package") from e
+
+    reader = PdfReader(path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        for line in (page.extract_text() or "").splitlines():
+            yield page_number, line
+
+def document_date(path: str) -> str:
+    """
+    Return the creation date of a PDF as YYYY-MM-DD, or "" if unknown.
+
+    Args:
+        path: Document path
+
+    Returns:
+        str: ISO date or empty string
+    """
+    if not path.lower().endswith(".pdf"):
+        return ""
+    try:
+        from pypdf import PdfReader
+        created = PdfReader(path).metadata.creation_date
+        return created.strftime("%Y-%m-%d") if created else ""
+    except Exception as e:
+        logger.debug("No creation date for %s: %s", path, e)
+        return ""
+
+def iter_blocks(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a document as heading and paragraph blocks.
+
+    Args:
+        path: Path of a .txt, .md or .pdf file
+
+    Returns:
+        Iterator of blocks with "kind" ("heading" or "paragraph"), "text",
+        "page", and "continues" (True if the paragraph was cut before its end)
+    """
+    lines = _iter_pdf_lines(path) if path.lower().endswith(".pdf") else _iter_text_lines(path)
+
+    buffer: List[str] = []
+    buffer_chars = 0
+    buffer_page = None
+
+    def flush(continues: bool = False):
+        nonlocal buffer, buffer_chars
+        block = {"kind": "paragraph", "text": " ".join(buffer), "page": buffer_page, "continues": continues}
+        buffer, buffer_chars = [], 0
+        return block
+
+    for page, raw_line in lines:
+        line = raw_line.strip()
+
+        if buffer and page != buffer_page:
+            # A sentence may run on across the page break
+            yield flush(continues=True)
+
+        if not line:
+            if buffer:
+                yield flush()
+            continue
+        if PAGE_NUMBER.match(line):
+            continue
+
+        heading = _heading_text(line)
+        if heading:
+            if buffer:
+                yield flush()
+            yield {"kind": "heading", "text": heading, "page": page, "continues": False}
+            continue
+
+        if not buffer:
+            buffer_page = page
+        if buffer and re.search(r'[a-z]-$', buffer[-1]) and line[0].islower():
+            # Re-join words hyphenated across a line break
+            buffer[-1] = buffer[-1][:-1] + line
+        else:
+            buffer.append(line)
+        buffer_chars += len(line)
+
+        if buffer_chars >= MAX_BLOCK_CHARS:
+            yield flush(continues=True)
+
+    if buffer:
+        yield flush()
+
+class _ChunkPacker:
+    """Accumulates sentences of one document and closes chunks at the budget."""
+
+    def __init__(self, source: str, max_tokens: int, overlap_tokens: int, date: str = ""):
+        self.source = source
+        self.date = date
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.section = None
+        self.sentences: List[Tuple[str, int, int]] = []  # (sentence, tokens, page)
+        self.tokens = 0
+        self.fresh = False  # Whether the open chunk holds more than overlap
+        self.index = 0
+
+    def _emit(self, sentences: List[Tuple[str, int, int]]) -> Dict[str, Any]:
+        chunk = {
+            "id": f"{self.source}#{self.index}",
+            "source": self.source,
+            "chunk_index": self.index,
+            "section": self.section,
+            "date": self.date,
+            "page_start": sentences[0][2],
+            "page_end": sentences[-1][2],
+            # WordPiece splits on whitespace first, so the counts of
+            # space-joined sentences add up exactly
+            "n_tokens": sum(tokens for _, tokens, _ in sentences),
+            "text": " ".join(sentence for sentence, _, _ in sentences)
+        }
+        self.index += 1
+        return chunk
+
+    def close(self, keep_overlap: bool = False) -> List[Dict[str, Any]]:
+        """Close the open chunk, optionally keeping trailing sentences as overlap."""
+        chunks = [self._emit(self.sentences)] if self.sentences and self.fresh else []
+
+        carried: List[Tuple[str, int, int]] = []
+        if keep_overlap:
+            total = 0
+            for item in reversed(self.sentences):
+                if total + item[1] > self.overlap_tokens:
+                    break
+                carried.insert(0, item)
+                total += item[1]
+
+        self.sentences = carried
+        self.tokens = sum(item[1] for item in carried)
+        self.fresh = False
+        return chunks
+
+    def add(self, sentence: str, tokens: int, page: int) -> List[Dict[str, Any]]:
+        """Add a sentence that fits the budget, closing the open chunk if it is full."""
+        chunks = []
+        if self.tokens + tokens > self.max_tokens:
+            chunks = self.close(keep_overlap=True)
+            # Drop overlap that would leave no room for the new sentence
+            while self.sentences and self.tokens + tokens > self.max_tokens:
+                self.tokens -= self.sentences.pop(0)[1]
+
+        self.sentences.append((sentence, tokens, page))
+        self.tokens += tokens
+        self.fresh = True
+        return chunks
+
+    def add_pieces(self, pieces: List[Tuple[str, int]], page: int) -> List[Dict[str, Any]]:
+        """Emit the pieces of an over-long sentence as chunks of their own."""
+        chunks = self.close()
+        for piece, tokens in pieces:
+            chunks.append(self._emit([(piece, tokens, page)]))
+        return chunks
+
+class DocumentChunker:
+    """Packs sentences into chunks sized in embedding-model tokens."""
+
+    def __init__(
+        self,
+        token_counter: Optional[TokenCounter] = None,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS
+    ):
+        """
+        Initialize the chunker.
+
+        Args:
+            token_counter: Counter for the embedding model's tokenizer
+            max_tokens: Maximum tokens per chunk, excluding special tokens
+            overlap_tokens: Tokens of trailing sentences repeated at the start
+                of the next chunk in the same section
+
+        Raises:
+            ValueError: If the budget does not fit the model or the overlap
+                leaves no room for new text
+        """
+        if max_tokens > MODEL_MAX_TOKENS - SPECIAL_TOKENS:
+            raise ValueError(f"max_tokens must be at most {MODEL_MAX_TOKENS - SPECIAL_TOKENS}")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be non-negative and smaller than max_tokens")
+
+        self.token_counter = token_counter or TokenCounter()
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def chunk_file(self, path: str, source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the chunks of one document.
+
+        Args:
+            path: Path of a .txt, .md or .pdf file
+            source: Source name stored with each chunk (defaults to the file name)
+
+        Returns:
+            Iterator of chunk dicts
+        """
+        return self.chunk_blocks(iter_blocks(path), source or os.path.basename(path), document_date(path))
+
+    def chunk_blocks(
+        self,
+        blocks: Iterable[Dict[str, Any]],
+        source: str,
+        date: str = ""
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pack a stream of blocks into chunks.
+
+        Args:
+            blocks: Blocks as produced by ``iter_blocks``
+            source: Source name stored with each chunk
+            date: Document date (YYYY-MM-DD) stored with each chunk
+
+        Returns:
+            Iterator of chunk dicts with id, source, chunk_index, section, date,
+            page_start, page_end, n_tokens and text
+        """
+        packer = _ChunkPacker(source, self.max_tokens, self.overlap_tokens, date)
+        pending = None  # Unfinished sentence (text, page) carried over from a cut block
+
+        for block in blocks:
+            if block["kind"] == "heading":
+                if pending:
+                    yield from self._add_sentences(packer, [pending])
+                    pending = None
+                yield from packer.close()
+                packer.section = block["text"]
+                continue
+
+            if pending:
+                sentences = split_sentences(f"{pending[0]} {block['text']}")
+                first_page = pending[1]
+            else:
+                sentences = split_sentences(block["text"])
+                first_page = block["page"]
+            pages = [first_page] + [block["page"]] * (len(sentences) - 1)
+            items = list(zip(sentences, pages))
+
+            pending = items.pop() if block["continues"] and items else None
+            yield from self._add_sentences(packer, items)
+
+        if pending:
+            yield from self._add_sentences(packer, [pending])
+        yield from packer.close()
+
+    def _add_sentences(self, packer: _ChunkPacker, items: List[Tuple[str, int]]) -> Iterator[Dict[str, Any]]:
+        """Measure a block's sentences in one tokenizer call and pack them."""
+        counts = self.token_counter.count_batch([sentence for sentence, _ in items])
+        for (sentence, page), tokens in zip(items, counts):
+            if tokens > self.max_tokens:
+                yield from packer.add_pieces(self._split_long_sentence(sentence), page)
+            else:
+                yield from packer.add(sentence, tokens, page)
+
+    def _split_long_sentence(self, sentence: str) -> List[Tuple[str, int]]:
+        """Split a sentence longer than the budget at word boundaries."""
+        words = sentence.split()
+        counts = self.token_counter.count_batch(words)
+
+        pieces = []
+        piece_words: List[str] = []
+        piece_tokens = 0
+        for word, tokens in zip(words, counts):
+            if piece_words and piece_tokens + tokens > self.max_tokens:
+                pieces.append((" ".join(piece_words), piece_tokens))
+                piece_words, piece_tokens = [], 0
+            piece_words.append(word)
+            piece_tokens += tokens
+        if piece_words:
+            pieces.append((" ".join(piece_words), piece_tokens))
+        return pieces
+
+def write_chunks(chunks: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Stream chunks to a JSON lines file, replacing it only once complete.
+
+    Args:
+        chunks: Chunk dicts
+        path: Output file path
+
+    Returns:
+        int: Number of chunks written
+    """
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def read_chunks(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream chunks from a JSON lines file written by ``write_chunks``.
+
+    Args:
+        path: Chunk file path
+
+    Returns:
+        Iterator of chunk dicts
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
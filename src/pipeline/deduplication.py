@@ -0,0 +1,288 @@
+"""
+Near-duplicate chunk detection with MinHash and locality-sensitive hashing.
+
+Each chunk is reduced to a MinHash signature over word shingles, signatures
+are split into LSH bands so that only chunks sharing a band are compared, and
+candidate pairs whose estimated Jaccard similarity reaches the threshold are
+merged into clusters. One canonical chunk per cluster is kept; the others are
+recorded in its ``duplicates`` field so provenance is not lost.
+"""
+import re
+import zlib
+import logging
+from collections import defaultdict
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SHINGLE_SIZE = 5
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def shingle_hashes(text: str, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> np.ndarray:
+    """
+    Hash the word n-grams of a text.
+
+    Args:
+        text: Chunk text
+        shingle_size: Words per shingle
+
+    Returns:
+        numpy.ndarray: Unique 32-bit shingle hashes as uint64
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose the LSH band count and rows per band for a similarity threshold.
+
+    Minimises the sum of the false-positive area below the threshold and the
+    false-negative area above it of the banding S-curve.
+
+    Args:
+        threshold: Jaccard similarity at which chunks count as duplicates
+        num_perm: Signature length
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    grid = np.linspace(0.0, 1.0, 1001)
+    step = grid[1] - grid[0]
+    below, above = grid <= threshold, grid > threshold
+
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        candidate = 1.0 - (1.0 - grid ** rows) ** bands
+        error = step * (candidate[below].sum() + (1.0 - candidate[above]).sum())
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of permutations."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        """
+        Initialize the permutation family.
+
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            shingle_size: Words per shingle
+            seed: Seed for the permutation parameters; signatures are only
+                comparable between hashers with the same seed
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            numpy.ndarray: uint64 signature of length num_perm
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if hashes.size == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        return self.signature_of(hashes)
+
+    def signature_of(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Compute the MinHash signature of a non-empty set of shingle hashes.
+
+        Args:
+            hashes: Output of shingle_hashes
+
+        Returns:
+            numpy.ndarray: uint64 signature of length num_perm
+        """
+        # (a * h + b) mod p, truncated to 32 bits; uint64 overflow wraps as intended
+        permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+class _UnionFind:
+    """Disjoint sets over chunk positions."""
+
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+class ChunkDeduplicator:
+    """Clusters near-duplicate chunks as they are added."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE
+    ):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which chunks are merged
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+        self.chunks: List[Dict[str, Any]] = []
+        self.signatures: List[Optional[np.ndarray]] = []
+        self.clusters = _UnionFind()
+        self.comparisons = 0
+        self.unshingled = 0
+
+    def add(self, chunk: Dict[str, Any]) -> None:
+        """
+        Add a chunk and merge it with any near-duplicates seen so far.
+
+        Chunks whose text yields no shingles are kept as their own cluster.
+
+        Args:
+            chunk: Chunk dict with at least "id" and "text"
+        """
+        position = self.clusters.add()
+        self.chunks.append(chunk)
+        hashes = shingle_hashes(chunk["text"], self.hasher.shingle_size)
+        if hashes.size == 0:
+            # Empty or punctuation-only text would get the all-MAX_HASH
+            # signature and collide with every other such chunk, so it stays
+            # a singleton cluster and never enters the LSH buckets
+            self.signatures.append(None)
+            self.unshingled += 1
+            return
+
+        signature = self.hasher.signature_of(hashes)
+        self.signatures.append(signature)
+
+        candidates = set()
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            candidates.update(buckets[key])
+            buckets[key].append(position)
+
+        for other in candidates:
+            if self.clusters.find(other) == self.clusters.find(position):
+                continue
+            self.comparisons += 1
+            # The fraction of equal signature slots estimates Jaccard similarity
+            if np.mean(self.signatures[other] == signature) >= self.threshold:
+                self.clusters.union(position, other)
+
+    def add_all(self, chunks: Iterable[Dict[str, Any]]) -> None:
+        """Add a stream of chunks."""
+        for chunk in chunks:
+            self.add(chunk)
+
+    def results(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Select one canonical chunk per cluster and summarise the run.
+
+        The longest chunk of a cluster (the earliest on ties) is kept, with the
+        id, source, section and pages of the others in its ``duplicates`` list.
+
+        Returns:
+            Tuple of (canonical chunks in ingestion order, report dict)
+        """
+        members = defaultdict(list)
+        for position in range(len(self.chunks)):
+            members[self.clusters.find(position)].append(position)
+
+        kept = []
+        by_source = defaultdict(lambda: {"chunks_in": 0, "duplicates_removed": 0})
+        for group in members.values():
+            canonical = max(group, key=lambda p: (len(self.chunks[p]["text"]), -p))
+            chunk = dict(self.chunks[canonical])
+            duplicates = [
+                {
+                    key: self.chunks[p].get(key)
+                    for key in ("id", "source", "section", "page_start", "page_end")
+                }
+                for p in group if p != canonical
+            ]
+            if duplicates:
+                chunk["duplicates"] = duplicates
+            kept.append((canonical, chunk))
+
+            for p in group:
+                source = self.chunks[p].get("source")
+                by_source[source]["chunks_in"] += 1
+                if p != canonical:
+                    by_source[source]["duplicates_removed"] += 1
+
+        kept.sort(key=lambda item: item[0])
+        total = len(self.chunks)
+        removed = total - len(kept)
+        report = {
+            "chunks_in": total,
+            "chunks_out": len(kept),
+            "duplicates_removed": removed,
+            "dedup_ratio": round(removed / total, 4) if total else 0.0,
+            "duplicate_clusters": sum(1 for group in members.values() if len(group) > 1),
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+            "candidate_comparisons": self.comparisons,
+            "chunks_without_shingles": self.unshingled,
+            "by_source": dict(by_source)
+        }
+        logger.info(
+            "Deduplicated %d chunks to %d (ratio %.2f%%)",
+            total, len(kept), 100.0 * report["dedup_ratio"]
+        )
+        return [chunk for _, chunk in kept], report
+
+def deduplicate_chunks(
+    chunks: Iterable[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Wrapper function to remove near-duplicate chunks.
+
+    Args:
+        chunks: Chunk dicts with "id" and "text"
+        threshold: Estimated Jaccard similarity at which chunks are merged
+        num_perm: MinHash signature length
+
+    Returns:
+        Tuple of (canonical chunks, report dict)
+    """
+    deduplicator = ChunkDeduplicator(threshold=threshold, num_perm=num_perm)
+    deduplicator.add_all(chunks)
+    return deduplicator.results()
@@ -79,7 +79,7 @@ class QueryProcessor:
             "intent": intent
         }
         
-        logger.debug(f"Processed query: {result}")
+        logger.debug("Processed query: %s", result)
         return result
     
     def _clean_query(self, query: str) -> str:
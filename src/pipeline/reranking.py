@@ -1 +1,70 @@
-# reranking logic
+"""
+Re-ranking of retrieved chunks for diversity.
+
+Implements maximal marginal relevance (MMR): from a candidate pool larger
+than top_k, chunks are picked one at a time by trading off similarity to the
+query against similarity to the chunks already picked, so near-identical
+passages from overlapping guidelines do not fill the whole context.
+"""
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def mmr_select(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    boost: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    Select a diverse subset of candidates with maximal marginal relevance.
+
+    All similarities are computed up front as two matrix products; each of
+    the k selection steps is then a vectorized update over the pool.
+
+    Args:
+        query_vector: Query embedding of shape (dimension,)
+        candidate_vectors: Candidate embeddings of shape (n, dimension), best first
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+        boost: Optional per-candidate amount added to its query similarity
+            (e.g. a feedback prior)
+
+    Returns:
+        List of selected candidate positions, in selection order
+    """
+    n = len(candidate_vectors)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    candidates = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+    relevance = candidates @ query
+    if boost is not None:
+        relevance = relevance + np.asarray(boost, dtype=np.float32)
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
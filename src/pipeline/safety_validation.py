@@ -40,7 +40,7 @@ def validate_input(text: str) -> Dict[str, Any]:
     # Check for harmful patterns
     for pattern in HARMFUL_PATTERNS:
         if re.search(pattern, text, re.IGNORECASE):
-            logger.warning(f"Harmful content detected in input: {text[:50]}...")
+            logger.warning("Harmful content detected in input: %.50s...", text)
             return {
                 "valid": False,
                 "reason": "Input contains potentially harmful content"
@@ -78,7 +78,7 @@ def validate_output(text: str) -> Dict[str, Any]:
     # Check for harmful content patterns
     for pattern in HARMFUL_PATTERNS:
         if re.search(pattern, text, re.IGNORECASE):
-            logger.warning(f"Harmful content detected in output: {text[:50]}...")
+            logger.warning("Harmful content detected in output: %.50s...", text)
             return {
                 "valid": False,
                 "reason": "Output contains potentially harmful content"
@@ -41,7 +41,7 @@ def validate_api_key(api_key: Optional[str]) -> bool:
         if key_info["expires_at"] > current_time:
             return True
         else:
-            logger.warning(f"Expired API key used: {api_key[:5]}...")
+            logger.warning("Expired API key used: %.5s...", api_key)
             return False
     else:
         # For demo purposes, accept the DEFAULT_API_KEY from environment
@@ -49,7 +49,7 @@ def validate_api_key(api_key: Optional[str]) -> bool:
         if default_key and api_key == default_key:
             return True
             
-        logger.warning(f"Invalid API key used: {api_key[:5]}...")
+        logger.warning("Invalid API key used: %.5s...", api_key)
         return False
 
 def get_user_from_api_key(api_key: str) -> Optional[str]:
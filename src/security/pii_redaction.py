@@ -1 +1,241 @@
-# pii redaction utilities
+"""
+PII redaction for documents and chat inputs.
+
+All patterns are compiled once into a single alternation with one named group
+per category, so a text is scanned once regardless of how many categories are
+enabled. ``redact_stream`` handles text that arrives in pieces, and
+``redact_files`` spreads bulk corpus redaction over a process pool.
+"""
+import os
+import re
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Patterns in priority order; at a given position the first matching one wins.
+# Quantifiers are bounded, so every pattern has a longest possible match
+# (MAX_MATCH_CHARS); keep the two in step when editing a pattern.
+PII_PATTERNS = {
+    "EMAIL": r"[\w.+-]{1,64}@[\w-]{1,63}(?:\.[\w-]{1,63}){1,4}",
+    "MRN": r"(?i:\b(?:MRN|medical record (?:number|no\.?)|patient id|record (?:number|no\.?))"
+           r"\s{0,3}[:#]?\s{0,3}[A-Z0-9][A-Z0-9-]{3,19})\b",
+    "DOB": r"(?i:\b(?:DOB|D\.O\.B\.?|date of birth|born(?: on)?)\s{0,3}:?\s{0,3})"
+           r"(?:\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}|\d{4}-\d{2}-\d{2}"
+           r"|(?i:\d{1,2}\s[a-z]{3,9}\s\d{4}|[a-z]{3,9}\s\d{1,2},?\s\d{4}))",
+    "PHONE": r"(?<![\w+])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}(?!\w)",
+    "NAME": r"\b(?:(?:Dr|Mr|Mrs|Ms|Miss|Prof)\.?\s[A-Z][a-z]{1,30}(?:\s[A-Z][a-z]{1,30})?"
+            r"|(?i:my name is|i am called)\s[A-Z][a-z]{1,30}(?:\s[A-Z][a-z]{1,30})?)"
+}
+
+# Two or three capitalised words; catches most names in documents but also
+# title-case phrases, so it is only used for bulk corpus redaction
+AGGRESSIVE_NAME_PATTERN = r"\b[A-Z][a-z]{1,30}(?:\s[A-Z][a-z]{1,30}){1,2}\b"
+
+# Longest possible match per pattern, from its quantifier bounds
+MAX_MATCH_CHARS = {
+    "EMAIL": 64 + 1 + 63 + 4 * (1 + 63),
+    "MRN": len("medical record number") + 3 + 1 + 3 + 20,
+    "DOB": len("date of birth") + 3 + 1 + 3 + (9 + 1 + 2 + 1 + 1 + 4),
+    "PHONE": 4 + 1 + 5 + 1 + 3 + 1 + 4,
+    "NAME": len("i am called") + 2 * (1 + 31),
+    "AGGRESSIVE_NAME": 3 * 31 + 2
+}
+
+# Held back between stream pieces; a match this long is never split
+STREAM_CARRY_CHARS = max(MAX_MATCH_CHARS.values())
+
+@lru_cache(maxsize=None)
+def _compile(categories: Tuple[str, ...], aggressive_names: bool) -> "re.Pattern":
+    """Compile the enabled categories into one pattern (cached per configuration)."""
+    parts = []
+    for category in categories:
+        pattern = PII_PATTERNS[category]
+        if category == "NAME" and aggressive_names:
+            pattern = f"{pattern}|{AGGRESSIVE_NAME_PATTERN}"
+        parts.append(f"(?P<{category}>{pattern})")
+    return re.compile("|".join(parts))
+
+class PIIRedactor:
+    """Replaces personal identifiers with ``[REDACTED_<CATEGORY>]`` placeholders."""
+
+    def __init__(self, categories: Optional[List[str]] = None, aggressive_names: bool = False):
+        """
+        Initialize the redactor.
+
+        Args:
+            categories: Categories to redact (defaults to all of PII_PATTERNS)
+            aggressive_names: Also treat runs of capitalised words as names
+        """
+        categories = tuple(c for c in PII_PATTERNS if categories is None or c in categories)
+        self.pattern = _compile(categories, aggressive_names)
+
+    @staticmethod
+    def _placeholder(match: "re.Match") -> str:
+        return f"[REDACTED_{match.lastgroup}]"
+
+    def redact(self, text: str) -> str:
+        """
+        Redact PII from a text.
+
+        Args:
+            text: Text to redact
+
+        Returns:
+            str: Text with PII replaced by placeholders
+        """
+        return self.pattern.sub(self._placeholder, text)
+
+    def redact_with_counts(self, text: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Redact PII and count the replacements per category.
+
+        Args:
+            text: Text to redact
+
+        Returns:
+            Tuple of (redacted text, counts by category)
+        """
+        counts = Counter()
+
+        def replace(match):
+            counts[match.lastgroup] += 1
+            return f"[REDACTED_{match.lastgroup}]"
+
+        return self.pattern.sub(replace, text), dict(counts)
+
+    def redact_stream(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Redact text that arrives in pieces.
+
+        The last STREAM_CARRY_CHARS characters of each piece are held back
+        until the next piece arrives, so identifiers split across pieces are
+        still found.
+
+        Args:
+            pieces: Text pieces in order
+
+        Returns:
+            Iterator of redacted text pieces
+        """
+        carry = ""
+        for piece in pieces:
+            buffer = carry + piece
+            if len(buffer) <= STREAM_CARRY_CHARS:
+                carry = buffer
+                continue
+
+            cut = len(buffer) - STREAM_CARRY_CHARS
+            output = []
+            position = 0
+            for match in self.pattern.finditer(buffer):
+                if match.end() > cut:
+                    # Hold back any match reaching into the carried tail
+                    cut = min(cut, match.start())
+                    break
+                output.append(buffer[position:match.start()])
+                output.append(self._placeholder(match))
+                position = match.end()
+            output.append(buffer[position:cut])
+            carry = buffer[cut:]
+            yield "".join(output)
+
+        if carry:
+            yield self.redact(carry)
+
+_worker_redactor = None
+
+def _init_worker(aggressive_names: bool) -> None:
+    global _worker_redactor
+    _worker_redactor = PIIRedactor(aggressive_names=aggressive_names)
+
+def redact_file(input_path: str, output_path: str, redactor: Optional[PIIRedactor] = None) -> Dict[str, int]:
+    """
+    Redact a file without loading it into memory.
+
+    JSON lines chunk files have only their "text" field redacted so the
+    records stay valid JSON; other files are redacted as a text stream. The
+    output replaces ``output_path`` once complete, so input and output may be
+    the same file.
+
+    Args:
+        input_path: File to redact
+        output_path: Where to write the redacted file
+        redactor: Redactor to use (defaults to the process-pool worker's)
+
+    Returns:
+        Dict: Replacement counts by category
+    """
+    redactor = redactor or _worker_redactor or PIIRedactor()
+    counts = Counter()
+    tmp_path = f"{output_path}.tmp"
+
+    with open(input_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        if input_path.endswith(".jsonl"):
+            for line in src:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record["text"], found = redactor.redact_with_counts(record.get("text", ""))
+                counts.update(found)
+                dst.write(json.dumps(record, ensure_ascii=False))
+                dst.write("\n")
+        else:
+            for piece in redactor.redact_stream(src):
+                dst.write(piece)
+
+    os.replace(tmp_path, output_path)
+    return dict(counts)
+
+def redact_files(
+    jobs: List[Tuple[str, str]],
+    workers: Optional[int] = None,
+    aggressive_names: bool = False
+) -> Dict[str, Dict[str, int]]:
+    """
+    Redact many files in parallel, one file per task.
+
+    Args:
+        jobs: (input_path, output_path) pairs
+        workers: Number of worker processes (defaults to the CPU count)
+        aggressive_names: Also treat runs of capitalised words as names
+
+    Returns:
+        Dict mapping input path to replacement counts by category
+    """
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(aggressive_names,)
+    ) as pool:
+        futures = {pool.submit(redact_file, src, dst): src for src, dst in jobs}
+        for future, src in futures.items():
+            try:
+                results[src] = future.result()
+            except Exception as e:
+                logger.error(f"Error redacting {src}: {str(e)}")
+                results[src] = {"error": str(e)}
+    return results
+
+_default_redactor = None
+
+def redact_pii(text: str) -> str:
+    """
+    Wrapper function to redact PII from a chat input.
+
+    Args:
+        text: The text to redact
+
+    Returns:
+        str: Redacted text
+    """
+    global _default_redactor
+
+    if _default_redactor is None:
+        _default_redactor = PIIRedactor()
+    return _default_redactor.redact(text)
@@ -0,0 +1,6 @@
+# Make the repository packages (src, benchmarks, wallet) importable from tests
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,15 @@
+"""
+The API entry points must import without loading any model library.
+"""
+import pytest
+
+from benchmarks.import_time import HEAVY_MODULES, profile_imports, eager_heavy_modules
+from conftest import REPO_ROOT
+
+
+@pytest.mark.parametrize("module", ["app", "src.api.main"])
+def test_entry_point_imports_no_heavy_modules(module):
+    entries = profile_imports(module, REPO_ROOT)
+
+    assert any(entry["module"] == module for entry in entries)
+    assert eager_heavy_modules(entries) == [], f"{module} imports {HEAVY_MODULES} eagerly"
@@ -0,0 +1,30 @@
+import pytest
+
+from src.security.pii_redaction import PIIRedactor, STREAM_CARRY_CHARS
+
+TEXT = (
+    "Patient Dr. Alice Smith, MRN: AB-123456, DOB 04/12/1961, was seen today. "
+    "Contact her at alice.smith@example.org or (555) 123-4567. "
+    "Referral sent to " + "a" * 60 + "@" + "b" * 60 + ".example.co.uk for review. "
+    "Follow-up record no. 998877 is pending; mrn: ab123456 was merged into it."
+)
+
+
+def pieces_of(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, STREAM_CARRY_CHARS, STREAM_CARRY_CHARS + 1, len(TEXT)])
+def test_stream_matches_whole_text(size):
+    redactor = PIIRedactor()
+    assert "".join(redactor.redact_stream(pieces_of(TEXT, size))) == redactor.redact(TEXT)
+
+
+@pytest.mark.parametrize("text", [
+    "MRN: AB123456",
+    "mrn: ab123456",
+    "Medical Record Number # ab-1234-xy",
+    "patient id 00af12",
+])
+def test_mrn_identifier_is_case_insensitive(text):
+    assert PIIRedactor().redact(text) == "[REDACTED_MRN]"
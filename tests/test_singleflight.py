@@ -0,0 +1,98 @@
+import threading
+import time
+
+from src.core.singleflight import SingleFlight, chat_request_key
+
+CALLERS = 8
+
+
+def run_concurrently(flight, key, fn):
+    """Call flight.do from CALLERS threads; fn blocks until all of them have joined."""
+    outcomes = [None] * CALLERS
+
+    def caller(index):
+        try:
+            outcomes[index] = ("ok", flight.do(key, fn))
+        except Exception as e:
+            outcomes[index] = ("error", e)
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_for_waiters(flight, key, count, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters == count:
+                return
+        time.sleep(0.001)
+    raise AssertionError("Callers did not join the call in flight")
+
+
+def test_concurrent_callers_share_one_run():
+    flight, release, runs = SingleFlight(), threading.Event(), []
+
+    def fn():
+        runs.append(1)
+        release.wait(5)
+        return object()
+
+    threads, outcomes = run_concurrently(flight, "key", fn)
+    wait_for_waiters(flight, "key", CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(runs) == 1
+    results = [result for _, (result, _) in outcomes]
+    assert all(result is results[0] for result in results)
+    assert sorted(shared for _, (_, shared) in outcomes) == [False] + [True] * (CALLERS - 1)
+    assert flight.in_flight() == 0
+
+
+def test_exception_reaches_every_waiter():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("backend down")
+
+    threads, outcomes = run_concurrently(flight, "key", fn)
+    wait_for_waiters(flight, "key", CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(kind == "error" and str(error) == "backend down" for kind, error in outcomes)
+    assert flight.in_flight() == 0
+
+
+def test_call_after_completion_runs_again():
+    flight, runs = SingleFlight(), []
+
+    def fn():
+        runs.append(1)
+        return len(runs)
+
+    assert flight.do("key", fn) == (1, False)
+    assert flight.do("key", fn) == (2, False)
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: "a") == ("a", False)
+    assert flight.do("b", lambda: "b") == ("b", False)
+
+
+def test_chat_request_key_depends_on_intent():
+    # "screening?" and "screening" normalise to the same query but take
+    # different answer paths
+    assert chat_request_key("Colon cancer screening?", intent="question") != \
+        chat_request_key("colon cancer screening", intent="general")
+    assert chat_request_key("Colon cancer screening?", intent="question") == \
+        chat_request_key("colon cancer screening", intent="question")
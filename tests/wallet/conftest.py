@@ -0,0 +1,45 @@
+# The wallet backend imports its modules by bare name, as when run from wallet/backend
+import os
+import sys
+import importlib.util
+
+import pytest
+
+WALLET_BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "wallet", "backend")
+sys.path.insert(0, WALLET_BACKEND)
+
+import http_client
+import ipfs_utils
+import verbwire_utils
+import mock_services
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    server, base_url = mock_services.serve()
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def services(mock_server, monkeypatch):
+    """Point the IPFS and minting clients at the mock APIs, with short backoffs."""
+    mock_services.reset()
+    monkeypatch.setattr(ipfs_utils, "IPFS_UPLOAD_URL", f"{mock_server}/upload")
+    monkeypatch.setattr(verbwire_utils, "VERBWIRE_MINT_URL", f"{mock_server}/mint")
+    monkeypatch.setattr(ipfs_utils, "BACKOFF_FACTOR", 0.01)
+    monkeypatch.setattr(http_client, "BACKOFF_FACTOR", 0.01)
+    monkeypatch.setattr(http_client, "_sessions", {})
+    yield mock_services
+    mock_services.reset()
+
+
+@pytest.fixture
+def wallet_app(services):
+    """The wallet Flask app (loaded under its own name; the chatbot's is also "app")."""
+    pytest.importorskip("eth_account")
+    spec = importlib.util.spec_from_file_location("wallet_app", os.path.join(WALLET_BACKEND, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    module.jobs.executor.shutdown(wait=True)
@@ -0,0 +1,104 @@
+import io
+
+import pytest
+
+from encrypt_utils import (
+    CHUNK_SIZE, FRAME_LENGTH, HEADER, TAG_SIZE,
+    encrypt_bytes, encrypted_length, iter_decrypted, EncryptingReader
+)
+from ipfs_utils import UploadSizeError, upload_stream_to_ipfs
+
+KEY = "correct horse battery staple"
+SMALL_CHUNK = 1024
+
+
+def decrypt(ciphertext, key=KEY):
+    return b"".join(iter_decrypted(io.BytesIO(ciphertext), key))
+
+
+@pytest.mark.parametrize("size", [0, 1, SMALL_CHUNK - 1, SMALL_CHUNK, SMALL_CHUNK + 1, 3 * SMALL_CHUNK])
+def test_round_trip_and_exact_length(size):
+    plaintext = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    ciphertext = encrypt_bytes(plaintext, KEY, SMALL_CHUNK)
+
+    assert len(ciphertext) == encrypted_length(size, SMALL_CHUNK)
+    assert decrypt(ciphertext) == plaintext
+
+
+def test_reader_matches_one_shot_length():
+    plaintext = b"a" * (2 * CHUNK_SIZE + 5)
+    reader = EncryptingReader(io.BytesIO(plaintext), KEY)
+    pieces = iter(lambda: reader.read(4096), b"")
+
+    ciphertext = b"".join(pieces)
+    assert len(ciphertext) == encrypted_length(len(plaintext))
+    assert decrypt(ciphertext) == plaintext
+
+
+def frames(ciphertext):
+    """Split a ciphertext into its header and frames."""
+    header, position, parts = ciphertext[:HEADER.size], HEADER.size, []
+    while position < len(ciphertext):
+        (length,) = FRAME_LENGTH.unpack_from(ciphertext, position)
+        end = position + FRAME_LENGTH.size + (length & 0x7FFFFFFF) + TAG_SIZE
+        parts.append(ciphertext[position:end])
+        position = end
+    return header, parts
+
+
+@pytest.mark.parametrize("cut", [1, TAG_SIZE, SMALL_CHUNK + FRAME_LENGTH.size + TAG_SIZE])
+def test_truncated_stream_is_rejected(cut):
+    ciphertext = encrypt_bytes(b"y" * (2 * SMALL_CHUNK + 10), KEY, SMALL_CHUNK)
+
+    with pytest.raises(ValueError):
+        decrypt(ciphertext[:-cut])
+
+
+def test_dropping_the_final_frame_is_rejected():
+    header, parts = frames(encrypt_bytes(b"y" * (2 * SMALL_CHUNK + 10), KEY, SMALL_CHUNK))
+
+    with pytest.raises(ValueError):
+        decrypt(header + b"".join(parts[:-1]))
+
+
+def test_trailing_data_is_rejected():
+    ciphertext = encrypt_bytes(b"record", KEY, SMALL_CHUNK)
+
+    with pytest.raises(ValueError):
+        decrypt(ciphertext + b"\0")
+
+
+def test_reordered_frames_are_rejected():
+    header, parts = frames(encrypt_bytes(b"z" * (3 * SMALL_CHUNK), KEY, SMALL_CHUNK))
+    assert len(parts) == 3
+
+    with pytest.raises(ValueError):
+        decrypt(header + parts[1] + parts[0] + parts[2])
+
+
+def test_wrong_key_is_rejected():
+    ciphertext = encrypt_bytes(b"record", KEY, SMALL_CHUNK)
+
+    with pytest.raises(ValueError):
+        decrypt(ciphertext, "another key")
+
+
+def test_stream_upload_sends_the_whole_body_on_every_attempt(services):
+    plaintext = b"r" * (3 * CHUNK_SIZE + 17)
+    expected = encrypted_length(len(plaintext))
+    services.settings["fail_next"] = 1
+
+    link = upload_stream_to_ipfs(lambda: EncryptingReader(io.BytesIO(plaintext), KEY), expected_length=expected)
+
+    assert link.startswith("https://bafy")
+    assert services.received == [("/upload", expected), ("/upload", expected)]
+
+
+def test_stream_upload_of_unexpected_size_raises(services):
+    plaintext = b"record"
+
+    with pytest.raises(UploadSizeError):
+        upload_stream_to_ipfs(
+            lambda: EncryptingReader(io.BytesIO(plaintext), KEY),
+            expected_length=encrypted_length(len(plaintext)) + 1
+        )
@@ -0,0 +1,127 @@
+import io
+import time
+
+import pytest
+import requests
+
+from http_client import MAX_RETRIES
+from ipfs_utils import upload_to_ipfs, upload_stream_to_ipfs
+from jobs import JobQueue, QueueFullError
+from verbwire_utils import mint_soulbound_nft
+
+
+def wait_for_job(client, status_url, timeout=10):
+    """Poll a job until it finishes, returning every status seen."""
+    seen = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(status_url).get_json()
+        if not seen or seen[-1] != job["status"]:
+            seen.append(job["status"])
+        if job["status"] in ("succeeded", "failed"):
+            return seen, job
+        time.sleep(0.02)
+    raise AssertionError(f"Job did not finish, statuses seen: {seen}")
+
+
+def test_job_queue_runs_jobs_and_reports_failures():
+    queue = JobQueue(workers=1)
+    ok, broken = queue.submit(lambda x: x * 2, 21), queue.submit(lambda: 1 / 0)
+    queue.executor.shutdown(wait=True)
+
+    assert queue.get(ok)["status"] == "succeeded" and queue.get(ok)["result"] == 42
+    assert queue.get(broken)["status"] == "failed" and "division" in queue.get(broken)["error"]
+    assert queue.get("unknown") is None
+
+
+def test_job_queue_refuses_work_beyond_max_pending():
+    queue = JobQueue(workers=1, max_pending=1)
+    queue.submit(time.sleep, 0.2)
+
+    with pytest.raises(QueueFullError):
+        queue.submit(time.sleep, 0)
+    queue.executor.shutdown(wait=True)
+
+
+def test_upload_record_job_reports_progress_until_done(wallet_app, services):
+    services.settings["delay"] = 0.2
+    client = wallet_app.app.test_client()
+
+    response = client.post("/upload_record", json={"wallet": "0xabc", "record": "BP 120/80", "key": "k"})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["job_id"] and response.headers["Location"] == body["status_url"]
+
+    seen, job = wait_for_job(client, body["status_url"])
+    assert seen[0] in ("queued", "running") and seen[-1] == "succeeded"
+    assert job["result"]["quick_mint"]["recipientAddress"] == "0xabc"
+    assert [path for path, _ in services.received] == ["/upload", "/mint"]
+
+
+def test_unknown_job_is_404(wallet_app):
+    assert wallet_app.app.test_client().get("/jobs/missing").status_code == 404
+
+
+def test_full_queue_returns_503(wallet_app, services, monkeypatch):
+    services.settings["delay"] = 0.3
+    monkeypatch.setattr(wallet_app, "jobs", JobQueue(workers=1, max_pending=1))
+    client = wallet_app.app.test_client()
+    record = {"wallet": "0xabc", "record": "BP 120/80", "key": "k"}
+
+    assert client.post("/upload_record", json=record).status_code == 202
+    response = client.post("/upload_record", json=record)
+    assert response.status_code == 503
+    assert "queue is full" in response.get_json()["error"]
+    wallet_app.jobs.executor.shutdown(wait=True)
+
+
+def test_missing_fields_are_400(wallet_app):
+    client = wallet_app.app.test_client()
+
+    response = client.post("/upload_record", json={"wallet": "0xabc"})
+    assert response.status_code == 400
+    assert response.get_json()["missing"] == ["record", "key"]
+
+    response = client.post("/upload_records", json={"records": [{"record": "a"}], "key": "k"})
+    assert response.status_code == 400
+    assert response.get_json()["missing"] == {"0": ["wallet"]}
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_upload_retries_busy_responses(services, status):
+    services.settings.update(fail_next=2, fail_status=status)
+
+    link = upload_to_ipfs(b"record", "record.hwe")
+
+    assert link.endswith("/record.hwe")
+    assert services.received == [("/upload", services.received[0][1])] * 3
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_stream_upload_retries_busy_responses_with_backoff(services, status):
+    services.settings.update(fail_next=2, fail_status=status)
+    start = time.perf_counter()
+
+    upload_stream_to_ipfs(lambda: io.BytesIO(b"record"))
+
+    assert len(services.received) == 3
+    # Backoff of 0.01s, then 0.02s
+    assert time.perf_counter() - start >= 0.03
+
+
+def test_stream_upload_gives_up_after_max_retries(services):
+    services.settings.update(fail_next=MAX_RETRIES + 1)
+
+    with pytest.raises(requests.HTTPError):
+        upload_stream_to_ipfs(lambda: io.BytesIO(b"record"))
+    assert len(services.received) == MAX_RETRIES + 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_mint_retries_busy_responses(services, status):
+    services.settings.update(fail_next=1, fail_status=status)
+
+    nft = mint_soulbound_nft("0xabc", "https://cid.ipfs.nftstorage.link/record.hwe")
+
+    assert nft["quick_mint"]["status"] == "Sent"
+    assert len(services.received) == 2
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import requests
 
@@ -21,5 +22,12 @@ if st.button("Submit & Mint NFT"):
         "wallet": wallet,
         "record": record,
         "key": key
-    })
-    st.json(res.json())
\ No newline at end of file
+    }, timeout=10)
+    job = res.json()
+    if res.status_code == 202:
+        # Upload and minting run in the background; poll until they finish
+        with st.spinner("Uploading and minting..."):
+            while job["status"] in ("queued", "running"):
+                time.sleep(1)
+                job = requests.get(f"http://localhost:5000/jobs/{job['job_id']}", timeout=10).json()
+    st.json(job)
\ No newline at end of file
@@ -1,11 +1,60 @@
-from flask import Flask, request, jsonify
-from encrypt_utils import encrypt_data
-from ipfs_utils import upload_to_ipfs
+import io
+import os
+import shutil
+import tempfile
+import requests
+from flask import Flask, request, jsonify, url_for
+from werkzeug.utils import secure_filename
+from encrypt_utils import EncryptingReader, CHUNK_SIZE, encrypted_length
+from ipfs_utils import upload_stream_to_ipfs
 from verbwire_utils import mint_soulbound_nft
 from wallet_utils import generate_wallet
+from jobs import JobQueue, QueueFullError
+from batch_utils import process_batch, missing_fields
 
 app = Flask(__name__)
 
+# Uploads run on a few background threads, so a slow IPFS gateway or minting
+# API does not hold a Flask worker for the whole request
+ASYNC_UPLOADS = os.getenv("ASYNC_UPLOADS", "true").lower() == "true"
+jobs = JobQueue(
+    workers=int(os.getenv("UPLOAD_WORKERS", "4")),
+    max_pending=int(os.getenv("UPLOAD_MAX_PENDING", "100"))
+)
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "1000"))
+
+def process_record(wallet, raw_text, key):
+    # Encrypted frame by frame while the upload body is being sent; every
+    # upload attempt encrypts afresh
+    plaintext = raw_text.encode()
+    ipfs_link = upload_stream_to_ipfs(
+        lambda: EncryptingReader(io.BytesIO(plaintext), key),
+        expected_length=encrypted_length(len(plaintext))
+    )
+    return mint_soulbound_nft(wallet, metadata_url=ipfs_link)
+
+def process_attachment(wallet, encrypted_path, filename):
+    try:
+        ipfs_link = upload_stream_to_ipfs(
+            lambda: open(encrypted_path, "rb"),
+            filename=f"{filename}.hwe",
+            expected_length=os.path.getsize(encrypted_path)
+        )
+    finally:
+        os.remove(encrypted_path)
+    return mint_soulbound_nft(wallet, metadata_url=ipfs_link)
+
+def missing_fields_response(missing):
+    return jsonify({"error": f"Missing fields: {', '.join(missing)}", "missing": missing}), 400
+
+def enqueue(fn, *args):
+    try:
+        job_id = jobs.submit(fn, *args)
+    except QueueFullError:
+        return jsonify({"error": "Upload queue is full, try again later"}), 503
+    status_url = url_for("job_status", job_id=job_id)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
 @app.route("/generate_wallet", methods=["GET"])
 def create_wallet():
     wallet = generate_wallet()
@@ -13,16 +62,79 @@ def create_wallet():
 
 @app.route("/upload_record", methods=["POST"])
 def upload_record():
-    data = request.json
+    data = request.get_json(silent=True)
+    missing = missing_fields(data)
+    if missing:
+        return missing_fields_response(missing)
     wallet = data["wallet"]
     raw_text = data["record"]
     key = data["key"]
 
-    encrypted = encrypt_data(raw_text, key)
-    ipfs_link = upload_to_ipfs(encrypted.encode())
+    if not data.get("async", ASYNC_UPLOADS):
+        try:
+            return jsonify(process_record(wallet, raw_text, key))
+        except requests.RequestException as e:
+            return jsonify({"error": str(e)}), 502
+
+    return enqueue(process_record, wallet, raw_text, key)
+
+@app.route("/upload_records", methods=["POST"])
+def upload_records():
+    data = request.get_json(silent=True)
+    records = data.get("records") if isinstance(data, dict) else None
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a non-empty 'records' list"}), 400
+    if len(records) > BATCH_MAX_RECORDS:
+        return jsonify({"error": f"At most {BATCH_MAX_RECORDS} records per batch"}), 413
+
+    # Top-level "wallet" and "key" apply to records that do not set their own
+    defaults = {field: data[field] for field in ("wallet", "key") if field in data}
+    missing = {
+        index: missing_fields({**defaults, **record} if isinstance(record, dict) else None)
+        for index, record in enumerate(records)
+    }
+    missing = {index: fields for index, fields in missing.items() if fields}
+    if missing:
+        described = "; ".join(f"record {index}: {', '.join(fields)}" for index, fields in missing.items())
+        return jsonify({"error": f"Missing fields in {described}", "missing": missing}), 400
+    group_mints = data.get("group_mints", True)
+    if data.get("async", ASYNC_UPLOADS):
+        return enqueue(process_batch, records, defaults, group_mints)
+
+    summary = process_batch(records, defaults, group_mints)
+    return jsonify(summary), 207 if summary["failed"] else 200
+
+@app.route("/upload_attachment", methods=["POST"])
+def upload_attachment():
+    missing = missing_fields({**request.form, **request.files}, ("wallet", "key", "file"))
+    if missing:
+        return missing_fields_response(missing)
+    wallet = request.form["wallet"]
+    key = request.form["key"]
+    upload = request.files["file"]
+    filename = secure_filename(upload.filename or "") or "attachment"
+
+    # Encrypt the upload to a temporary file in fixed-size frames, so neither
+    # the plaintext on disk nor the whole file in memory is ever needed
+    # The queued job removes the file; every other outcome removes it here
+    fd, encrypted_path = tempfile.mkstemp(prefix="attachment-", suffix=".hwe")
+    queued = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(EncryptingReader(upload.stream, key), f, CHUNK_SIZE)
+        response = enqueue(process_attachment, wallet, encrypted_path, filename)
+        queued = response[1] == 202
+        return response
+    finally:
+        if not queued:
+            os.remove(encrypted_path)
 
-    nft = mint_soulbound_nft(wallet, metadata_url=ipfs_link)
-    return jsonify(nft)
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
 
 if __name__ == "__main__":
-    app.run(port=5000)
+    app.run(port=5000, threaded=True)
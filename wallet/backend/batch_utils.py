@@ -0,0 +1,96 @@
+import os
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from encrypt_utils import encrypt_bytes
+from ipfs_utils import upload_to_ipfs
+from verbwire_utils import mint_soulbound_nft
+
+# Key derivation and AES release the GIL, so threads encrypt in parallel
+ENCRYPT_WORKERS = int(os.getenv("BATCH_ENCRYPT_WORKERS", str(os.cpu_count() or 1)))
+# Concurrent calls to each backend; keep at or below HTTP_POOL_SIZE
+UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "8"))
+MINT_CONCURRENCY = int(os.getenv("BATCH_MINT_CONCURRENCY", "4"))
+
+REQUIRED_FIELDS = ("wallet", "record", "key")
+
+def missing_fields(record, required=REQUIRED_FIELDS):
+    """Names of required fields that are absent or empty (all of them for a non-object)."""
+    if not isinstance(record, dict):
+        return list(required)
+    return [field for field in required if not record.get(field)]
+
+def _encrypt_and_upload(upload_pool, record):
+    encrypted = encrypt_bytes(record["record"].encode(), record["key"])
+    return upload_pool.submit(upload_to_ipfs, encrypted, "health_record.hwe")
+
+def _mint_group(wallet, links):
+    # Several records for one wallet are minted once, from a manifest listing them
+    if len(links) == 1:
+        metadata_url = links[0]
+    else:
+        manifest = {"name": "Health Passport records", "records": links}
+        metadata_url = upload_to_ipfs(json.dumps(manifest).encode(), "health_records.json")
+    return mint_soulbound_nft(wallet, metadata_url=metadata_url)
+
+def process_batch(records, defaults=None, group_mints=True):
+    """Encrypt, upload and mint many records, reporting the outcome of each one."""
+    defaults = defaults or {}
+    results = []
+    pending = {}
+    for index, record in enumerate(records):
+        record = {**defaults, **record} if isinstance(record, dict) else {}
+        missing = missing_fields(record)
+        results.append({"index": index, "wallet": record.get("wallet"), "status": "pending"})
+        if missing:
+            results[index].update(status="failed", error=f"Missing fields: {', '.join(missing)}")
+        else:
+            pending[index] = record
+
+    def fail(index, error):
+        results[index].update(status="failed", error=str(error))
+
+    # Uploads start as soon as their record is encrypted
+    with ThreadPoolExecutor(ENCRYPT_WORKERS) as encrypt_pool, ThreadPoolExecutor(UPLOAD_CONCURRENCY) as upload_pool:
+        encrypting = {encrypt_pool.submit(_encrypt_and_upload, upload_pool, record): index for index, record in pending.items()}
+        uploading = {}
+        for future in as_completed(encrypting):
+            try:
+                uploading[future.result()] = encrypting[future]
+            except Exception as e:
+                fail(encrypting[future], e)
+        for future in as_completed(uploading):
+            try:
+                results[uploading[future]]["ipfs_link"] = future.result()
+            except Exception as e:
+                fail(uploading[future], e)
+
+    groups = defaultdict(list)
+    for index in pending:
+        if results[index]["status"] == "pending":
+            # Without grouping every record is minted on its own
+            groups[pending[index]["wallet"] if group_mints else index].append(index)
+
+    with ThreadPoolExecutor(MINT_CONCURRENCY) as mint_pool:
+        minting = {
+            mint_pool.submit(_mint_group, pending[indexes[0]]["wallet"], [results[i]["ipfs_link"] for i in indexes]): indexes
+            for indexes in groups.values()
+        }
+        for future in as_completed(minting):
+            try:
+                nft = future.result()
+            except Exception as e:
+                for index in minting[future]:
+                    fail(index, e)
+                continue
+            for index in minting[future]:
+                results[index].update(status="succeeded", nft=nft)
+
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "mint_calls": len(groups),
+        "results": results
+    }
@@ -1,6 +1,21 @@
 from Crypto.Cipher import AES
 import base64
+import hashlib
+import io
 import os
+import struct
+
+# Streaming format: a header, then frames of up to CHUNK_SIZE plaintext bytes,
+# each sealed with AES-GCM under its own nonce (nonce prefix + frame counter).
+# The header is authenticated with every frame and the last frame is flagged,
+# so reordered, truncated or extended ciphertexts fail to decrypt.
+MAGIC = b"HWE1"
+HEADER = struct.Struct(">4sI16s8s")  # magic, chunk size, KDF salt, nonce prefix
+FRAME_LENGTH = struct.Struct(">I")
+FINAL_FLAG = 0x80000000
+TAG_SIZE = 16
+CHUNK_SIZE = 64 * 1024
+KDF_ITERATIONS = 200_000
 
 def pad(s):
     return s + (16 - len(s) % 16) * chr(16 - len(s) % 16)
@@ -15,4 +30,111 @@ def decrypt_data(encrypted, key):
     key = key.ljust(32)[:32].encode()
     cipher = AES.new(key, AES.MODE_ECB)
     decrypted = cipher.decrypt(base64.b64decode(encrypted.encode()))
-    return decrypted.decode().rstrip('\x01-\x10')
\ No newline at end of file
+    return decrypted.decode().rstrip('\x01-\x10')
+
+def derive_key(key, salt):
+    return hashlib.pbkdf2_hmac("sha256", key.encode(), salt, KDF_ITERATIONS)
+
+def _frame_cipher(aes_key, nonce_prefix, counter, header, final):
+    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=nonce_prefix + struct.pack(">I", counter), mac_len=TAG_SIZE)
+    cipher.update(header + (b"\x01" if final else b"\x00"))
+    return cipher
+
+def _read_full(src, size):
+    # File-like objects such as pipes and sockets may return short reads
+    parts = []
+    while size:
+        part = src.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+def iter_encrypted(src, key, chunk_size=CHUNK_SIZE):
+    """Encrypt a binary file-like object, yielding the ciphertext piece by piece."""
+    salt, nonce_prefix = os.urandom(16), os.urandom(8)
+    aes_key = derive_key(key, salt)
+    header = HEADER.pack(MAGIC, chunk_size, salt, nonce_prefix)
+    yield header
+
+    counter = 0
+    chunk = _read_full(src, chunk_size)
+    while True:
+        # Read one chunk ahead so the last frame can be flagged as final
+        following = _read_full(src, chunk_size) if len(chunk) == chunk_size else b""
+        final = not following
+        ciphertext, tag = _frame_cipher(aes_key, nonce_prefix, counter, header, final).encrypt_and_digest(chunk)
+        yield FRAME_LENGTH.pack(len(chunk) | (FINAL_FLAG if final else 0)) + ciphertext + tag
+        if final:
+            return
+        chunk, counter = following, counter + 1
+
+def iter_decrypted(src, key):
+    """Decrypt a stream written by ``iter_encrypted``, yielding the plaintext piece by piece."""
+    header = _read_full(src, HEADER.size)
+    if len(header) != HEADER.size or header[:4] != MAGIC:
+        raise ValueError("Not an encrypted health record stream")
+    _, chunk_size, salt, nonce_prefix = HEADER.unpack(header)
+    aes_key = derive_key(key, salt)
+
+    counter = 0
+    while True:
+        prefix = _read_full(src, FRAME_LENGTH.size)
+        if len(prefix) != FRAME_LENGTH.size:
+            raise ValueError("Encrypted stream is truncated")
+        (length,) = FRAME_LENGTH.unpack(prefix)
+        final, length = bool(length & FINAL_FLAG), length & ~FINAL_FLAG
+        if length > chunk_size:
+            raise ValueError("Encrypted frame is larger than the chunk size")
+        frame = _read_full(src, length + TAG_SIZE)
+        if len(frame) != length + TAG_SIZE:
+            raise ValueError("Encrypted stream is truncated")
+        cipher = _frame_cipher(aes_key, nonce_prefix, counter, header, final)
+        # Raises ValueError if the frame or key is wrong
+        yield cipher.decrypt_and_verify(frame[:length], frame[length:])
+        if final:
+            if src.read(1):
+                raise ValueError("Unexpected data after the final frame")
+            return
+        counter += 1
+
+def encrypted_length(plain_length, chunk_size=CHUNK_SIZE):
+    """Size of the ``iter_encrypted`` output for ``plain_length`` bytes of input."""
+    frames = max(1, -(-plain_length // chunk_size))
+    return HEADER.size + frames * (FRAME_LENGTH.size + TAG_SIZE) + plain_length
+
+def encrypt_bytes(data, key, chunk_size=CHUNK_SIZE):
+    return b"".join(iter_encrypted(io.BytesIO(data), key, chunk_size))
+
+def encrypt_stream(src, dst, key, chunk_size=CHUNK_SIZE):
+    for piece in iter_encrypted(src, key, chunk_size):
+        dst.write(piece)
+
+def decrypt_stream(src, dst, key):
+    for piece in iter_decrypted(src, key):
+        dst.write(piece)
+
+class EncryptingReader:
+    """Read-only file-like view of the encrypted form of ``src``, for streaming uploads."""
+
+    def __init__(self, src, key, chunk_size=CHUNK_SIZE):
+        self._pieces = iter_encrypted(src, key, chunk_size)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            piece = next(self._pieces, None)
+            if piece is None:
+                break
+            self._buffer += piece
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def __iter__(self):
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b""
+        yield from self._pieces
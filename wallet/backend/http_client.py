@@ -0,0 +1,52 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds for every backend call
+TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+# Responses that mean the request was not processed and can be sent again
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+def _build_session(idempotent, streaming=False):
+    # Requests that were never sent (connect errors) are always safe to retry.
+    # Read timeouts are only retried for idempotent calls such as a
+    # content-addressed upload, never for a mint that may already have run.
+    # A streamed body is consumed by the first attempt, so streaming sessions
+    # retry nothing after sending has started; callers retry with a new stream.
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES if idempotent and not streaming else 0,
+        status=0 if streaming else MAX_RETRIES,
+        other=0 if streaming else None,
+        status_forcelist=RETRY_STATUSES if idempotent else (429, 503),
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session(idempotent=True, streaming=False):
+    """Shared keep-alive session; one per retry policy, reused by all threads."""
+    policy = (idempotent, streaming)
+    with _lock:
+        if policy not in _sessions:
+            _sessions[policy] = _build_session(idempotent, streaming)
+        return _sessions[policy]
@@ -1,9 +1,12 @@
-import requests
 import os
+import time
 from dotenv import load_dotenv
+from http_client import get_session, TIMEOUT, MAX_RETRIES, BACKOFF_FACTOR, RETRY_STATUSES
 
 load_dotenv()
 
+IPFS_UPLOAD_URL = os.getenv("IPFS_UPLOAD_URL", "https://api.nft.storage/upload")
+
 def upload_to_ipfs(file_bytes, filename="health_record.txt"):
     api_key = os.getenv("IPFS_API_KEY")
     headers = {
@@ -12,7 +15,46 @@ def upload_to_ipfs(file_bytes, filename="health_record.txt"):
     files = {
         'file': (filename, file_bytes)
     }
-    response = requests.post("https://api.nft.storage/upload", files=files, headers=headers)
+    # Uploads are content-addressed, so a retried upload cannot duplicate data
+    response = get_session(idempotent=True).post(IPFS_UPLOAD_URL, files=files, headers=headers, timeout=TIMEOUT)
     response.raise_for_status()
     cid = response.json()["value"]["cid"]
     return f"https://{cid}.ipfs.nftstorage.link/{filename}"
+
+class UploadSizeError(RuntimeError):
+    """The body sent was not the expected size, so the returned CID is not of the record."""
+
+def _counting(stream, sent):
+    # Chunked body that tallies the bytes actually handed to the connection
+    for piece in iter(lambda: stream.read(64 * 1024), b""):
+        sent[0] += len(piece)
+        yield piece
+
+def upload_stream_to_ipfs(open_stream, filename="health_record.hwe", expected_length=None):
+    # Sent as a chunked raw body, so the payload is never held in memory.
+    # A sent stream cannot be replayed, so the transport only retries
+    # connection errors and busy responses are retried here, each attempt
+    # with a fresh stream from open_stream().
+    api_key = os.getenv("IPFS_API_KEY")
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/octet-stream"
+    }
+    session = get_session(idempotent=True, streaming=True)
+    for attempt in range(MAX_RETRIES + 1):
+        stream, sent = open_stream(), [0]
+        try:
+            response = session.post(IPFS_UPLOAD_URL, data=_counting(stream, sent), headers=headers, timeout=TIMEOUT)
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+    response.raise_for_status()
+
+    if expected_length is not None and sent[0] != expected_length:
+        raise UploadSizeError(f"Uploaded {sent[0]} bytes, expected {expected_length}")
+    cid = response.json()["value"]["cid"]
+    return f"https://{cid}.ipfs.nftstorage.link/{filename}"
@@ -0,0 +1,63 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    pass
+
+class JobQueue:
+    """Runs slow backend work on a small thread pool and tracks its status."""
+
+    def __init__(self, workers=4, max_pending=100, ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload-job")
+        self.max_pending = max_pending
+        self.ttl = ttl  # Seconds a finished job stays queryable
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            self._prune()
+            pending = sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs are already pending")
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "created_at": now,
+                "updated_at": now,
+                "result": None,
+                "error": None
+            }
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields, updated_at=time.time())
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status="running")
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e))
+        else:
+            self._update(job_id, status="succeeded", result=result)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["status"] in ("succeeded", "failed") and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -0,0 +1,83 @@
+"""
+Local stand-ins for the IPFS upload and Verbwire minting APIs.
+
+Run this and point the backend at it to exercise uploads without API keys,
+including slow and failing backends:
+
+    python mock_services.py --delay 2 --fail-rate 0.3
+    IPFS_UPLOAD_URL=http://localhost:5055/upload \
+    VERBWIRE_MINT_URL=http://localhost:5055/mint python app.py
+
+Tests run it in-process (see serve()) and set ``fail_next`` to answer the
+next requests with ``fail_status``; every request is recorded in ``received``.
+"""
+import time
+import random
+import hashlib
+import argparse
+import threading
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+settings = {"delay": 0.0, "fail_rate": 0.0, "fail_next": 0, "fail_status": 503}
+received = []  # (path, body size) of every request, in arrival order
+_lock = threading.Lock()
+
+def reset():
+    with _lock:
+        settings.update(delay=0.0, fail_rate=0.0, fail_next=0, fail_status=503)
+        received.clear()
+
+def simulate_backend(size=0):
+    with _lock:
+        received.append((request.path, size))
+        forced = settings["fail_next"] > 0
+        if forced:
+            settings["fail_next"] -= 1
+    time.sleep(settings["delay"])
+    if forced:
+        return jsonify({"error": "Service unavailable"}), settings["fail_status"]
+    if random.random() < settings["fail_rate"]:
+        return jsonify({"error": "Service unavailable"}), 503
+    return None
+
+@app.route("/upload", methods=["POST"])
+def upload():
+    # Multipart file uploads and raw (possibly chunked) bodies are both accepted
+    content = request.files["file"].read() if "file" in request.files else request.get_data()
+    failure = simulate_backend(len(content))
+    if failure:
+        return failure
+    cid = "bafy" + hashlib.sha256(content).hexdigest()[:40]
+    return jsonify({"ok": True, "value": {"cid": cid, "size": len(content)}})
+
+@app.route("/mint", methods=["POST"])
+def mint():
+    failure = simulate_backend()
+    if failure:
+        return failure
+    return jsonify({
+        "quick_mint": {
+            "transactionID": hashlib.sha256(request.form["metadataUrl"].encode()).hexdigest(),
+            "status": "Sent",
+            "recipientAddress": request.form["recipientAddress"],
+            "metadataUrl": request.form["metadataUrl"]
+        }
+    })
+
+def serve(port=0):
+    """Start the mock APIs on a background thread; returns (server, base URL)."""
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="mock-services", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock IPFS and minting APIs")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+    settings.update(delay=args.delay, fail_rate=args.fail_rate)
+    app.run(port=args.port, threaded=True)
@@ -1,12 +1,13 @@
-import requests
 import os
 from dotenv import load_dotenv
+from http_client import get_session, TIMEOUT
 
 load_dotenv()
 
+VERBWIRE_MINT_URL = os.getenv("VERBWIRE_MINT_URL", "https://api.verbwire.com/v1/nft/mint/mintFromMetadataUrl")
+
 def mint_soulbound_nft(wallet_address, metadata_url):
     api_key = os.getenv("VERBWIRE_API_KEY")
-    url = "https://api.verbwire.com/v1/nft/mint/mintFromMetadataUrl"
     payload = {
         "allowPlatformToOperateToken": "true",
         "chain": "ethereumSepolia",
@@ -17,5 +18,6 @@ def mint_soulbound_nft(wallet_address, metadata_url):
     headers = {
         "X-API-Key": api_key
     }
-    response = requests.post(url, headers=headers, data=payload)
-    return response.json()
\ No newline at end of file
+    response = get_session(idempotent=False).post(VERBWIRE_MINT_URL, headers=headers, data=payload, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()